@@ -0,0 +1,190 @@
+"""
+Action-group definitions read from the CDK stack source.
+
+lib/ai-agent-stack.ts builds each action group's OpenAPI schema as a
+TypeScript object literal passed to JSON.stringify. This module evaluates
+those literals (strings, numbers, arrays, objects, shorthand properties,
+top-level consts and single-return helper functions such as
+batchPathSchema) without Node, and maps every action group to the Lambda
+asset directory that serves it.
+"""
+import os
+import re
+
+from _support import REPO_ROOT
+
+STACK_FILE = os.path.join(REPO_ROOT, 'lib', 'ai-agent-stack.ts')
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:\\.|[^'\\])*'|"(?:\\.|[^"\\])*"|`(?:\\.|[^`\\])*`)
+  | (?P<number>-?\d+(?:\.\d+)?)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<punct>[{}\[\](),:.])
+""", re.VERBOSE | re.DOTALL)
+
+class _Reference(str):
+    """An expression that cannot be evaluated offline (e.g. agent.attrAgentId)."""
+
+class _LiteralParser:
+    def __init__(self, source, position, consts, functions, scope=None):
+        self.source = source
+        self.position = position
+        self.consts = consts
+        self.functions = functions
+        self.scope = scope or {}
+
+    def token(self, advance=True):
+        while True:
+            match = _TOKEN.match(self.source, self.position)
+            if match is None:
+                raise ValueError(f'Cannot parse stack source at offset {self.position}')
+            if match.lastgroup != 'space':
+                break
+            self.position = match.end()
+        if advance:
+            self.position = match.end()
+        return match.lastgroup, match.group()
+
+    def expect(self, text):
+        kind, value = self.token()
+        if value != text:
+            raise ValueError(f'Expected {text!r} at offset {self.position}, found {value!r}')
+
+    def value(self):
+        kind, text = self.token()
+        if text == '{':
+            return self.object()
+        if text == '[':
+            return self.array()
+        if kind == 'string':
+            return re.sub(r'\\(.)', r'\1', text[1:-1])
+        if kind == 'number':
+            return float(text) if '.' in text else int(text)
+        if kind == 'name':
+            return self.expression(text)
+        raise ValueError(f'Unexpected {text!r} at offset {self.position}')
+
+    def expression(self, name):
+        if name in ('true', 'false'):
+            return name == 'true'
+        if name in ('null', 'undefined'):
+            return None
+        if name == 'new':
+            return self.expression(self.token()[1])
+        path = [name]
+        while self.token(advance=False)[1] == '.':
+            self.token()
+            path.append(self.token()[1])
+        dotted = '.'.join(path)
+        if self.token(advance=False)[1] == '(':
+            self.token()
+            args = self.arguments()
+            if dotted == 'JSON.stringify':
+                return args[0]
+            if dotted in self.functions:
+                return self.call(dotted, args)
+            # Keep the arguments and member accesses of calls that cannot be
+            # evaluated, e.g. executorFor(googleAdsFunction).functionArn
+            reference = f"{dotted}({', '.join(map(str, args))})"
+            while self.token(advance=False)[1] == '.':
+                self.token()
+                reference += '.' + self.token()[1]
+            return _Reference(reference)
+        if len(path) == 1 and name in self.scope:
+            return self.scope[name]
+        if len(path) == 1 and name in self.consts:
+            return self.const(name)
+        return _Reference(dotted)
+
+    def arguments(self):
+        args = []
+        while self.token(advance=False)[1] != ')':
+            args.append(self.value())
+            if self.token(advance=False)[1] == ',':
+                self.token()
+        self.token()
+        return args
+
+    def object(self):
+        result = {}
+        while True:
+            kind, key = self.token()
+            if key == '}':
+                return result
+            if key == ',':
+                continue
+            if kind == 'string':
+                key = key[1:-1]
+            if self.token(advance=False)[1] in (',', '}'):
+                # Shorthand property, e.g. { operationId }
+                result[key] = self.expression(key)
+                continue
+            self.expect(':')
+            result[key] = self.value()
+
+    def array(self):
+        items = []
+        while True:
+            if self.token(advance=False)[1] == ']':
+                self.token()
+                return items
+            items.append(self.value())
+            if self.token(advance=False)[1] == ',':
+                self.token()
+
+    def const(self, name):
+        return _LiteralParser(self.source, self.consts[name], self.consts, self.functions).value()
+
+    def call(self, name, args):
+        params, position = self.functions[name]
+        scope = dict(zip(params, args))
+        return _LiteralParser(self.source, position, self.consts, self.functions, scope).value()
+
+def _definitions(source):
+    consts = {m.group(1): m.end() - 1 for m in re.finditer(r'^const (\w+) = \{', source, re.MULTILINE)}
+    functions = {}
+    for match in re.finditer(r'^function (\w+)\(([^)]*)\)[^{]*\{\s*return\s+', source, re.MULTILINE):
+        params = [p.split(':')[0].strip() for p in match.group(2).split(',') if p.strip()]
+        functions[match.group(1)] = (params, match.end())
+    return consts, functions
+
+def _functions(source):
+    """Lambda construct variable -> (asset directory, timeout seconds)."""
+    functions = {}
+    for match in re.finditer(r"const (\w+) = new lambda\.Function\(this, '\w+', \{(.*?)\n    \}\);", source, re.DOTALL):
+        block = match.group(2)
+        asset = re.search(r"fromAsset\(path\.join\(__dirname, '\.\./lambda/([\w-]+)'\)\)", block)
+        timeout = re.search(r'timeout: cdk\.Duration\.seconds\((\d+)\)', block)
+        if asset:
+            functions[match.group(1)] = (asset.group(1), int(timeout.group(1)) if timeout else 3)
+    return functions
+
+def load_action_groups(stack_file=STACK_FILE):
+    """
+    Action groups defined in the stack, by name:
+    ``{'function', 'timeoutSeconds', 'schema', 'operations'}`` where
+    ``operations`` maps ``(METHOD, path)`` to the OpenAPI operation.
+    """
+    with open(stack_file) as f:
+        source = f.read()
+    consts, functions = _definitions(source)
+    lambdas = _functions(source)
+
+    groups = {}
+    for match in re.finditer(r"new bedrock\.CfnAgentActionGroup\(this, '\w+', \{", source):
+        props = _LiteralParser(source, match.end() - 1, consts, functions).value()
+        executor = next(name for name in re.findall(r'\w+', props['actionGroupExecutor']['lambda']) if name in lambdas)
+        function_name, timeout = lambdas[executor]
+        schema = props['apiSchema']['payload']
+        groups[props['actionGroupName']] = {
+            'function': function_name,
+            'timeoutSeconds': timeout,
+            'schema': schema,
+            'operations': {
+                (method.upper(), path): operation
+                for path, methods in schema['paths'].items()
+                for method, operation in methods.items()
+            }
+        }
+    return groups
@@ -0,0 +1,250 @@
+"""
+Helpers shared by the local benchmark scripts.
+Makes the agent_runtime layer importable, loads lambda/*/index.py
+modules by function name and either stands in for boto3 or switches
+the handlers to in-memory storage, so they run without deploying
+anything.
+"""
+import importlib.util
+import json
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(REPO_ROOT, 'lambda')
+SHARED_DIR = os.path.join(LAMBDA_DIR, 'shared', 'python')
+
+FUNCTIONS = ['google-ads', 'meta-ads', 'analytics', 'budget-optimizer', 'storage']
+
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+
+def load_handler_module(function_name):
+    """Import lambda/<function_name>/index.py under a unique module name."""
+    path = os.path.join(LAMBDA_DIR, function_name, 'index.py')
+    module_name = f"{function_name.replace('-', '_')}_index"
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def build_event(function_name, method, path, params, body):
+    """Bedrock action-group event for one route, as the agent would send it."""
+    event = {
+        'messageVersion': '1.0',
+        'actionGroup': f'{function_name}-actions',
+        'apiPath': path,
+        'httpMethod': method,
+        'parameters': [{'name': k, 'type': 'string', 'value': v} for k, v in params.items()],
+        'sessionAttributes': {},
+        'promptSessionAttributes': {}
+    }
+    if body is not None:
+        event['requestBody'] = {'content': {'application/json': json.dumps(body)}}
+    return event
+
+def metric_rows(campaign_id, rows_per_campaign=14, days=14):
+    """Deterministic metric rows for one campaign, spread over the last ``days`` days."""
+    import random
+    from decimal import Decimal
+
+    rng = random.Random(campaign_id)
+    now = int(time.time())
+    step = days * 86400 / rows_per_campaign
+    return [
+        {
+            'campaignId': campaign_id,
+            'timestamp': Decimal(now - int((rows_per_campaign - i) * step)),
+            'ttl': Decimal(now + 90 * 86400),
+            'impressions': Decimal(rng.randint(10000, 90000)),
+            'clicks': Decimal(rng.randint(300, 3000)),
+            'conversions': Decimal(rng.randint(10, 200)),
+            'cost': Decimal(str(round(rng.uniform(300, 2000), 2))),
+            'ctr': Decimal(str(round(rng.uniform(0.5, 5), 2))),
+            'cpa': Decimal(str(round(rng.uniform(5, 40), 2))),
+            'roas': Decimal(str(round(rng.uniform(0.5, 5), 2))),
+        }
+        for i in range(rows_per_campaign)
+    ]
+
+def use_memory_storage(campaign_ids=(), rows_per_campaign=14, latency_ms=0):
+    """
+    Switch agent_runtime to its in-memory storage backend and seed the
+    metrics table with ``rows_per_campaign`` rows per campaign. Returns the
+    storage registry. ``latency_ms`` simulates the round trip of each call.
+    """
+    from agent_runtime import storage
+
+    os.environ.setdefault('METRICS_TABLE', 'ad-optimizer-metrics')
+    os.environ.setdefault('BUCKET_NAME', 'ad-optimizer-bench')
+    storage.use('memory', latency_ms=latency_ms)
+    table = storage.table(os.environ['METRICS_TABLE'])
+    for campaign_id in campaign_ids:
+        table.load(metric_rows(campaign_id, rows_per_campaign))
+    return storage
+
+def install_stub_boto3(real_boto3=False, rows_per_campaign=14):
+    """
+    Put an in-process boto3 stand-in into sys.modules and return its S3 client.
+
+    The DynamoDB table generates ``rows_per_campaign`` metric rows per
+    campaign, spread over the last 14 days, the first time a campaign is read.
+    """
+    import types
+
+    class Events:
+        # The slice of botocore's event system the client registry hooks into
+        def __init__(self):
+            self.handlers = []
+
+        def register(self, event_name, handler):
+            self.handlers.append((event_name, handler))
+
+        def emit(self, event_name, **kwargs):
+            for registered, handler in self.handlers:
+                if event_name == registered or event_name.startswith(registered + '.'):
+                    handler(**kwargs)
+
+        def call(self, operation, parsed):
+            model = types.SimpleNamespace(name=operation)
+            context = {}
+            self.emit(f'before-call.{operation}', model=model, params={}, context=context)
+            self.emit(f'after-call.{operation}', model=model, parsed=parsed, context=context, http_response=None)
+            return parsed
+
+    def client_meta():
+        return types.SimpleNamespace(events=Events())
+
+    class Condition:
+        def __init__(self, name):
+            self.name = name
+            self.value = None
+            self.lower = None
+
+        def eq(self, value):
+            self.value = value
+            return self
+
+        def gte(self, value):
+            self.lower = value
+            return self
+
+        def __and__(self, other):
+            self.lower = other.lower
+            return self
+
+    class Table:
+        def __init__(self):
+            self.rows = {}
+
+        def _rows(self, campaign_id):
+            if campaign_id not in self.rows:
+                self.rows[campaign_id] = metric_rows(campaign_id, rows_per_campaign)
+            return self.rows[campaign_id]
+
+        def query(self, KeyConditionExpression=None, ScanIndexForward=True, Limit=None, **kwargs):
+            items = list(self._rows(KeyConditionExpression.value))
+            if KeyConditionExpression.lower is not None:
+                items = [item for item in items if item['timestamp'] >= KeyConditionExpression.lower]
+            if not ScanIndexForward:
+                items.reverse()
+            # Fresh dicts per call, as deserializing a real response would allocate
+            items = [dict(item) for item in (items[:Limit] if Limit else items)]
+            return self.events.call('Query', {'Items': items, 'Count': len(items)})
+
+        def put_item(self, Item, **kwargs):
+            self._rows(Item['campaignId']).append(Item)
+            return self.events.call('PutItem', {})
+
+    class ResourceClient:
+        def __init__(self, table):
+            self.meta = client_meta()
+            self.table = table
+
+        def batch_write_item(self, RequestItems, **kwargs):
+            for requests in RequestItems.values():
+                for request in requests:
+                    item = request['PutRequest']['Item']
+                    self.table._rows(item['campaignId']).append(item)
+            return self.meta.events.call('BatchWriteItem', {'UnprocessedItems': {}})
+
+    class Resource:
+        def __init__(self):
+            self.table = Table()
+            self.meta = types.SimpleNamespace(client=ResourceClient(self.table))
+            self.table.events = self.meta.client.meta.events
+
+        def Table(self, name):
+            return self.table
+
+    class NoSuchKey(Exception):
+        pass
+
+    class Body:
+        def __init__(self, data):
+            self.data = data
+
+        def read(self):
+            return self.data
+
+    class S3Client:
+        exceptions = types.SimpleNamespace(NoSuchKey=NoSuchKey)
+
+        def __init__(self):
+            self.meta = client_meta()
+            self.objects = {}
+
+        def put_object(self, Bucket, Key, Body, **kwargs):
+            self.objects[(Bucket, Key)] = Body.encode('utf-8') if isinstance(Body, str) else Body
+            return self.meta.events.call('PutObject', {})
+
+        def get_object(self, Bucket, Key):
+            if (Bucket, Key) not in self.objects:
+                raise NoSuchKey(Key)
+            return self.meta.events.call('GetObject', {'Body': Body(self.objects[(Bucket, Key)])})
+
+    s3 = S3Client()
+    resource = Resource()
+
+    def pay_real_cost(kind, name):
+        # Import real boto3 and build the real object so the first call pays
+        # the same loader cost as in Lambda, then hand back the stand-ins.
+        if real_boto3:
+            for module_name in stubs:
+                sys.modules.pop(module_name, None)
+            import boto3 as real
+            getattr(real, kind)(name)
+            sys.modules.update(stubs)
+
+    def client(name, **kwargs):
+        pay_real_cost('client', name)
+        return s3 if name == 's3' else types.SimpleNamespace(meta=client_meta())
+
+    def resource_factory(name, **kwargs):
+        pay_real_cost('resource', name)
+        return resource
+
+    stub = types.ModuleType('boto3')
+    stub.client = client
+    stub.resource = resource_factory
+    dynamodb = types.ModuleType('boto3.dynamodb')
+    conditions = types.ModuleType('boto3.dynamodb.conditions')
+    conditions.Key = Condition
+    conditions.Attr = Condition
+    stub.dynamodb = dynamodb
+    dynamodb.conditions = conditions
+    botocore = types.ModuleType('botocore')
+    config = types.ModuleType('botocore.config')
+    config.Config = types.SimpleNamespace
+    botocore.config = config
+    stubs = {
+        'boto3': stub,
+        'boto3.dynamodb': dynamodb,
+        'boto3.dynamodb.conditions': conditions,
+        'botocore': botocore,
+        'botocore.config': config
+    }
+    sys.modules.update(stubs)
+    return s3
+
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the Bedrock agent orchestrator.
+
+Replays scripted multi-turn tool-call plans against the action-group
+handlers in-process, with the in-memory storage backend, so complete
+flows such as "analyze, optimize, store" can be timed with no network and
+no deployed agent (test-agent.py and friends need a live one).
+
+Each step names an action group, method and path. It is checked against
+the OpenAPI schema that lib/ai-agent-stack.ts gives the agent (unknown
+operations, missing required parameters or body properties fail the
+plan), then sent to the handler as the Bedrock event the agent would
+send. Session attributes returned by one step are carried into the next,
+as Bedrock does within a session. Parameters and bodies can use earlier
+results: "${compare.bestPerformer}" is replaced by that step's value,
+and "*" maps over a list, e.g. "${campaigns.campaigns.*.id}".
+
+Per step the report shows handler latency, request and response payload
+size (responses over Bedrock's 25 KB limit are flagged); per turn, the
+total time. The first run loads every handler module, so its steps
+include the import (cold start); later runs are warm. Model reasoning
+time is not simulated. With --layout consolidated every step goes through
+lambda/consolidated, the single function that can host all action groups.
+
+Usage:
+  python benchmarks/agent_replay.py --list
+  python benchmarks/agent_replay.py --plan analyze-optimize-store --runs 10
+  python benchmarks/agent_replay.py --plan my-plan.json --rows 336 --latency-ms 5 --markdown replay.md
+  python benchmarks/agent_replay.py --layout consolidated
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+import uuid
+
+import _schemas
+import _support
+
+# Bedrock rejects action-group responses larger than this
+MAX_RESPONSE_BYTES = 25 * 1024
+
+CAMPAIGN_IDS = [
+    'goog-camp-001', 'goog-camp-002', 'goog-camp-003',
+    'meta-camp-001', 'meta-camp-002', 'meta-camp-003'
+]
+
+PLANS = {
+    'analyze-optimize-store': [
+        {
+            'prompt': 'How are my Google and Meta campaigns doing this week?',
+            'steps': [
+                {'name': 'google', 'actionGroup': 'google-ads-actions', 'method': 'GET', 'path': '/campaigns'},
+                {'name': 'meta', 'actionGroup': 'meta-ads-actions', 'method': 'GET', 'path': '/campaigns'},
+                {'name': 'compare', 'actionGroup': 'analytics-actions', 'method': 'POST', 'path': '/compare-campaigns',
+                 'body': {'campaignIds': CAMPAIGN_IDS}},
+            ]
+        },
+        {
+            'prompt': 'Dig into the best performer and rebalance a $6,000 budget for ROAS.',
+            'steps': [
+                {'name': 'analysis', 'actionGroup': 'analytics-actions', 'method': 'GET', 'path': '/analyze-performance',
+                 'parameters': {'campaignId': '${compare.bestPerformer}', 'days': '14'}},
+                {'name': 'optimize', 'actionGroup': 'budget-optimizer-actions', 'method': 'POST', 'path': '/optimize',
+                 'body': {'totalBudget': 6000, 'campaignIds': '${compare.campaigns.*.campaignId}', 'goal': 'maximize_roas'}},
+                {'name': 'simulate', 'actionGroup': 'budget-optimizer-actions', 'method': 'POST', 'path': '/simulate',
+                 'body': {'scenarios': [
+                     {'name': 'current', 'totalBudget': 6000, 'allocations': {c: 1000 for c in CAMPAIGN_IDS}},
+                     {'name': 'optimized', 'totalBudget': 6000, 'allocations': '${optimize.allocations}'},
+                 ]}},
+            ]
+        },
+        {
+            'prompt': 'Save that plan so we can review it next week.',
+            'steps': [
+                {'name': 'store', 'actionGroup': 'storage-actions', 'method': 'POST', 'path': '/store',
+                 'body': {'key': 'weekly-plan', 'data': {'allocations': '${optimize.allocations}',
+                                                         'best': '${compare.bestPerformer}'}}},
+                {'name': 'retrieve', 'actionGroup': 'storage-actions', 'method': 'GET', 'path': '/retrieve',
+                 'parameters': {'key': 'weekly-plan'}},
+            ]
+        },
+    ],
+    'batch-metrics-review': [
+        {
+            'prompt': 'Pull the latest metrics for every campaign and tell me what needs attention.',
+            'steps': [
+                {'name': 'google', 'actionGroup': 'google-ads-actions', 'method': 'POST', 'path': '/batch',
+                 'body': {'operations': [{'path': '/metrics', 'method': 'GET', 'parameters': {'campaignId': c}}
+                                         for c in CAMPAIGN_IDS[:3]]}},
+                {'name': 'meta', 'actionGroup': 'meta-ads-actions', 'method': 'POST', 'path': '/batch',
+                 'body': {'operations': [{'path': '/metrics', 'method': 'GET', 'parameters': {'campaignId': c}}
+                                         for c in CAMPAIGN_IDS[3:]]}},
+                {'name': 'recommendations', 'actionGroup': 'budget-optimizer-actions', 'method': 'GET',
+                 'path': '/recommendations', 'parameters': {'totalBudget': '6000'}},
+            ]
+        },
+    ],
+}
+
+_REFERENCE = re.compile(r'\$\{([^}]+)\}')
+
+class PlanError(Exception):
+    """The plan does not match the action-group schemas or an earlier result."""
+
+class LocalContext:
+    """The parts of the Lambda context object the handlers read."""
+
+    def __init__(self, function_name, timeout_seconds):
+        self.function_name = function_name
+        self.aws_request_id = str(uuid.uuid4())
+        self.memory_limit_in_mb = 1024
+        self._deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+# --- plan resolution -----------------------------------------------------------
+
+def lookup(results, reference):
+    name, _, path = reference.partition('.')
+    if name not in results:
+        raise PlanError(f'No earlier step named {name!r}')
+    values, mapped = [results[name]], False
+    for part in path.split('.') if path else []:
+        if part == '*':
+            values = [item for value in values for item in value]
+            mapped = True
+            continue
+        try:
+            values = [value[int(part)] if isinstance(value, list) else value[part] for value in values]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise PlanError(f'{reference} not found in the result of {name!r}')
+    return values if mapped else values[0]
+
+def resolve(value, results):
+    """``value`` with every ${step.path} reference replaced by the earlier result."""
+    if isinstance(value, dict):
+        return {key: resolve(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, results) for item in value]
+    if isinstance(value, str):
+        whole = _REFERENCE.fullmatch(value)
+        if whole:
+            return lookup(results, whole.group(1))
+        return _REFERENCE.sub(lambda m: str(lookup(results, m.group(1))), value)
+    return value
+
+def allocations_by_campaign(value):
+    # /optimize returns a list of allocations; /simulate wants {campaignId: budget}
+    if isinstance(value, list) and value and isinstance(value[0], dict) and 'recommendedBudget' in value[0]:
+        return {a['campaignId']: a['recommendedBudget'] for a in value}
+    return value
+
+def validate(groups, step, parameters, body):
+    group = groups.get(step['actionGroup'])
+    if group is None:
+        raise PlanError(f"Unknown action group {step['actionGroup']!r}")
+    operation = group['operations'].get((step['method'].upper(), step['path']))
+    if operation is None:
+        raise PlanError(f"{step['actionGroup']} has no {step['method']} {step['path']} in its schema")
+
+    declared = {p['name']: p for p in operation.get('parameters', [])}
+    for name in parameters:
+        if name not in declared:
+            raise PlanError(f"{step['path']} does not declare parameter {name!r}")
+    for name, param in declared.items():
+        if param.get('required') and name not in parameters:
+            raise PlanError(f"{step['path']} requires parameter {name!r}")
+
+    request_body = operation.get('requestBody')
+    if request_body and request_body.get('required') and body is None:
+        raise PlanError(f"{step['path']} requires a request body")
+    schema = ((request_body or {}).get('content', {}).get('application/json') or {}).get('schema', {})
+    for name in schema.get('required', []):
+        if name not in (body or {}):
+            raise PlanError(f"{step['path']} body requires {name!r}")
+    return group, operation
+
+def build_event(step, operation, parameters, body, session_id, prompt, session_attributes):
+    """The action-group event Bedrock sends for one tool call."""
+    types = {p['name']: (p.get('schema') or {}).get('type', 'string') for p in operation.get('parameters', [])}
+    event = {
+        'messageVersion': '1.0',
+        'agent': {'name': 'ad-optimizer-agent', 'id': 'LOCAL', 'alias': 'TSTALIASID', 'version': 'DRAFT'},
+        'sessionId': session_id,
+        'inputText': prompt,
+        'actionGroup': step['actionGroup'],
+        'apiPath': step['path'],
+        'httpMethod': step['method'].upper(),
+        'parameters': [
+            {'name': name, 'type': types.get(name, 'string'), 'value': value if isinstance(value, str) else json.dumps(value)}
+            for name, value in parameters.items()
+        ],
+        'sessionAttributes': dict(session_attributes),
+        'promptSessionAttributes': {}
+    }
+    if body is not None:
+        event['requestBody'] = {'content': {'application/json': json.dumps(body, default=str)}}
+    return event
+
+# --- replay --------------------------------------------------------------------
+
+LAYOUTS = ('split', 'consolidated')
+
+class Replayer:
+    def __init__(self, groups, layout='split'):
+        self.groups = groups
+        self.layout = layout
+        self.modules = {}
+
+    def handler(self, function_name):
+        """The function's handler, and the import time if this loaded it."""
+        if self.layout == 'consolidated':
+            function_name = 'consolidated'
+        if function_name in self.modules:
+            return self.modules[function_name], 0.0
+        started = time.perf_counter()
+        module = _support.load_handler_module(function_name)
+        self.modules[function_name] = module
+        return module, (time.perf_counter() - started) * 1000
+
+    def run(self, plan):
+        session_id = f'replay-{uuid.uuid4().hex[:12]}'
+        session_attributes = {}
+        results = {}
+        turns = []
+        for turn_index, turn in enumerate(plan):
+            turn_started = time.perf_counter()
+            steps = []
+            for step_index, step in enumerate(turn['steps']):
+                name = step.get('name') or f'step{turn_index}.{step_index}'
+                parameters = resolve(step.get('parameters') or {}, results)
+                body = resolve(step.get('body'), results)
+                if step['path'] == '/simulate' and body:
+                    for scenario in body.get('scenarios', []):
+                        scenario['allocations'] = allocations_by_campaign(scenario.get('allocations'))
+                group, operation = validate(self.groups, step, parameters, body)
+                event = build_event(step, operation, parameters, body, session_id, turn['prompt'], session_attributes)
+
+                module, import_ms = self.handler(group['function'])
+                context = LocalContext(group['function'], group['timeoutSeconds'])
+                started = time.perf_counter()
+                response = module.handler(event, context)
+                handler_ms = (time.perf_counter() - started) * 1000
+
+                session_attributes = response.get('sessionAttributes', session_attributes)
+                inner = response['response']
+                response_body = inner['responseBody']['application/json']['body']
+                results[name] = json.loads(response_body)
+                response_bytes = len(json.dumps(response))
+                steps.append({
+                    'name': name,
+                    'route': f"{step['actionGroup']} {step['method'].upper()} {step['path']}",
+                    'status': inner['httpStatusCode'],
+                    'coldStartMs': round(import_ms, 3),
+                    'latencyMs': round(import_ms + handler_ms, 3),
+                    'requestBytes': len(json.dumps(event)),
+                    'responseBytes': response_bytes,
+                    'overLimit': response_bytes > MAX_RESPONSE_BYTES
+                })
+            turns.append({
+                'prompt': turn['prompt'],
+                'steps': steps,
+                'totalMs': round((time.perf_counter() - turn_started) * 1000, 3)
+            })
+        return {'turns': turns, 'results': results}
+
+# --- reporting -----------------------------------------------------------------
+
+def summarize(runs):
+    """Per step and per turn: cold (first run) and warm p50/max latency."""
+    warm = runs[1:] or runs
+    summary = []
+    for turn_index, turn in enumerate(runs[0]['turns']):
+        totals = [run['turns'][turn_index]['totalMs'] for run in warm]
+        steps = []
+        for step_index, step in enumerate(turn['steps']):
+            latencies = [run['turns'][turn_index]['steps'][step_index]['latencyMs'] for run in warm]
+            steps.append(dict(step, coldMs=step['latencyMs'], warmP50Ms=round(statistics.median(latencies), 3),
+                              warmMaxMs=round(max(latencies), 3)))
+        summary.append({
+            'prompt': turn['prompt'],
+            'steps': steps,
+            'coldTotalMs': turn['totalMs'],
+            'warmP50TotalMs': round(statistics.median(totals), 3),
+            'warmMaxTotalMs': round(max(totals), 3)
+        })
+    return summary
+
+def render(summary):
+    lines = [
+        '| turn | step | route | status | cold ms | warm p50 ms | warm max ms | request B | response B |',
+        '|---:|---|---|---:|---:|---:|---:|---:|---:|'
+    ]
+    for index, turn in enumerate(summary, 1):
+        for step in turn['steps']:
+            flag = ' (over 25 KB)' if step['overLimit'] else ''
+            lines.append(
+                f"| {index} | {step['name']} | {step['route']} | {step['status']} | {step['coldMs']:.1f} | "
+                f"{step['warmP50Ms']:.2f} | {step['warmMaxMs']:.2f} | {step['requestBytes']} | "
+                f"{step['responseBytes']}{flag} |"
+            )
+        lines.append(
+            f"| {index} | **turn total** | {turn['prompt']} | | {turn['coldTotalMs']:.1f} | "
+            f"{turn['warmP50TotalMs']:.2f} | {turn['warmMaxTotalMs']:.2f} | | |"
+        )
+    cold = sum(turn['coldTotalMs'] for turn in summary)
+    warm = sum(turn['warmP50TotalMs'] for turn in summary)
+    lines.append(f'\nPlan total: {cold:.1f} ms cold, {warm:.2f} ms warm (p50 of turn totals)')
+    return '\n'.join(lines)
+
+def load_plan(name):
+    if name in PLANS:
+        return PLANS[name]
+    with open(name) as f:
+        plan = json.load(f)
+    return plan['turns'] if isinstance(plan, dict) else plan
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay scripted agent plans against the handlers in-process')
+    parser.add_argument('--plan', default='analyze-optimize-store',
+                        help=f"built-in plan ({', '.join(PLANS)}) or a JSON file holding a list of turns")
+    parser.add_argument('--list', action='store_true', help='list the built-in plans and the available operations')
+    parser.add_argument('--runs', type=int, default=5, help='replays of the plan; the first is cold')
+    parser.add_argument('--rows', type=int, default=14 * 24, help='metric rows seeded per campaign')
+    parser.add_argument('--latency-ms', type=float, default=0, help='simulated round trip per storage call')
+    parser.add_argument('--layout', choices=LAYOUTS, default='split',
+                        help='one function per action group, or the single consolidated function')
+    parser.add_argument('--verbose', action='store_true', help='print each step result of the last run')
+    parser.add_argument('--output', help='write every run and the summary as JSON')
+    parser.add_argument('--markdown', help='also write the table to this file')
+    args = parser.parse_args()
+
+    groups = _schemas.load_action_groups()
+    if args.list:
+        for name, plan in PLANS.items():
+            print(f"{name}: {len(plan)} turns, {sum(len(turn['steps']) for turn in plan)} steps")
+        for name, group in groups.items():
+            operations = ', '.join(f'{method} {path}' for method, path in sorted(group['operations']))
+            print(f"{name} -> lambda/{group['function']}: {operations}")
+        return
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    os.environ.setdefault('METRICS_ENABLED', 'false')
+    _support.use_memory_storage(CAMPAIGN_IDS, rows_per_campaign=args.rows, latency_ms=args.latency_ms)
+
+    plan = load_plan(args.plan)
+    replayer = Replayer(groups, args.layout)
+    runs = []
+    try:
+        for _ in range(max(1, args.runs)):
+            runs.append(replayer.run(plan))
+    except PlanError as e:
+        sys.exit(f'Plan error: {e}')
+
+    summary = summarize(runs)
+    report = render(summary)
+    print(report)
+    if args.verbose:
+        for name, result in runs[-1]['results'].items():
+            print(f'\n[{name}]\n{json.dumps(result, indent=2, default=str)[:2000]}')
+    if args.markdown:
+        with open(args.markdown, 'w') as f:
+            f.write(report + '\n')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'plan': args.plan, 'layout': args.layout, 'runs': [run['turns'] for run in runs], 'summary': summary}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Cold-start and import-time harness for the action-group Lambdas.
+
+Every (function, route) pair is measured in a fresh interpreter with a
+stubbed boto3, so nothing reaches AWS. Each run records the handler module
+import time, the first (cold) invocation latency and a second (warm)
+invocation latency, and prints a table. Save a run with --output and pass
+it back with --baseline to see the change before deploying.
+
+Numbers are relative: Lambda scales CPU with memorySize, so compare runs
+from the same machine rather than reading them as absolute Lambda timings.
+
+Usage:
+  python benchmarks/cold_start.py [--runs 5] [--functions analytics storage]
+  python benchmarks/cold_start.py --output before.json
+  python benchmarks/cold_start.py --baseline before.json --markdown report.md
+  python benchmarks/cold_start.py --real-boto3   # also pay the real boto3 import/client cost
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import _support
+
+# One representative event per route; bodies and parameters match the
+# OpenAPI schemas in lib/ai-agent-stack.ts.
+ROUTE_EVENTS = {
+    'google-ads': [
+        ('GET', '/campaigns', {}, None),
+        ('GET', '/metrics', {'campaignId': 'goog-camp-001'}, None),
+        ('POST', '/adjust-bid', {}, {'campaignId': 'goog-camp-001', 'bidAdjustment': 10}),
+        ('POST', '/update-budget', {}, {'campaignId': 'goog-camp-001', 'newBudget': 1200}),
+        ('POST', '/toggle-status', {}, {'campaignId': 'goog-camp-002', 'status': 'PAUSED'}),
+    ],
+    'meta-ads': [
+        ('GET', '/campaigns', {}, None),
+        ('GET', '/metrics', {'campaignId': 'meta-camp-001'}, None),
+        ('POST', '/adjust-bid', {}, {'campaignId': 'meta-camp-001', 'bidAdjustment': -5}),
+        ('POST', '/update-budget', {}, {'campaignId': 'meta-camp-001', 'newBudget': 900}),
+        ('POST', '/toggle-status', {}, {'campaignId': 'meta-camp-002', 'status': 'PAUSED'}),
+        ('POST', '/test-creative', {}, {'campaignId': 'meta-camp-003', 'creativeVariants': ['a', 'b']}),
+    ],
+    'analytics': [
+        ('GET', '/analyze-performance', {'campaignId': 'goog-camp-001', 'days': '7'}, None),
+        ('GET', '/detect-trends', {'campaignId': 'goog-camp-001'}, None),
+        ('POST', '/compare-campaigns', {}, {'campaignIds': ['goog-camp-001', 'goog-camp-002', 'meta-camp-001']}),
+        ('GET', '/recommendations', {'campaignId': 'meta-camp-001'}, None),
+        ('GET', '/cross-platform', {}, None),
+    ],
+    'budget-optimizer': [
+        ('POST', '/optimize', {}, {'totalBudget': 6000, 'campaignIds': ['goog-camp-001', 'goog-camp-003', 'meta-camp-001']}),
+        ('POST', '/reallocate', {}, {'fromCampaign': 'meta-camp-002', 'toCampaign': 'goog-camp-001', 'amount': 200}),
+        ('GET', '/recommendations', {'totalBudget': '6000'}, None),
+        ('POST', '/simulate', {}, {'scenarios': [
+            {'name': 'google-heavy', 'totalBudget': 5000, 'allocations': {'goog-camp-001': 3000, 'meta-camp-001': 2000}},
+            {'name': 'balanced', 'totalBudget': 5000, 'allocations': {'goog-camp-001': 2500, 'meta-camp-001': 2500}},
+        ]}),
+    ],
+    'storage': [
+        ('POST', '/store', {}, {'key': 'bench-insight', 'data': {'note': 'cold start harness'}}),
+        ('GET', '/retrieve', {'key': 'bench-insight'}, None),
+    ],
+}
+
+# --- child process -----------------------------------------------------------
+
+def run_child(function_name, route_index, real_boto3):
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ.setdefault('METRICS_TABLE', 'ad-optimizer-metrics')
+    os.environ.setdefault('BUCKET_NAME', 'ad-optimizer-bench')
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    s3 = _support.install_stub_boto3(real_boto3)
+
+    method, path, params, body = ROUTE_EVENTS[function_name][route_index]
+    if function_name == 'storage' and path == '/retrieve':
+        payload = json.dumps({'data': {'note': 'seeded'}, 'key': params['key']}).encode('utf-8')
+        s3.objects[(os.environ['BUCKET_NAME'], f"insights/{params['key']}.json")] = payload
+    event = _support.build_event(function_name, method, path, params, body)
+
+    started = time.perf_counter()
+    module = _support.load_handler_module(function_name)
+    import_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    response = module.handler(event, None)
+    first_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    module.handler(event, None)
+    warm_ms = (time.perf_counter() - started) * 1000
+
+    print(json.dumps({
+        'importMs': import_ms,
+        'firstMs': first_ms,
+        'warmMs': warm_ms,
+        'status': response.get('response', {}).get('httpStatusCode')
+    }))
+
+# --- parent process ----------------------------------------------------------
+
+def measure(function_name, route_index, runs, real_boto3):
+    samples = []
+    command = [sys.executable, os.path.abspath(__file__), '--child', function_name, str(route_index)]
+    if real_boto3:
+        command.append('--real-boto3')
+    for _ in range(runs):
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    result = {
+        key: round(statistics.median(sample[key] for sample in samples), 3)
+        for key in ('importMs', 'firstMs', 'warmMs')
+    }
+    result['coldMs'] = round(result['importMs'] + result['firstMs'], 3)
+    result['status'] = samples[-1]['status']
+    return result
+
+def render_table(results, baseline):
+    header = '| function | route | status | import ms | first call ms | warm call ms | cold total ms |'
+    divider = '|---|---|---|---:|---:|---:|---:|'
+    if baseline:
+        header += ' baseline cold ms | change |'
+        divider += '---:|---:|'
+    lines = [header, divider]
+    for key, row in results.items():
+        function_name, route = key.split(' ', 1)
+        line = (f"| {function_name} | {route} | {row['status']} | {row['importMs']:.1f} | "
+                f"{row['firstMs']:.1f} | {row['warmMs']:.2f} | {row['coldMs']:.1f} |")
+        if baseline:
+            before = baseline.get(key)
+            if before:
+                change = (row['coldMs'] - before['coldMs']) / before['coldMs'] * 100 if before['coldMs'] else 0
+                line += f" {before['coldMs']:.1f} | {change:+.1f}% |"
+            else:
+                line += ' - | new |'
+        lines.append(line)
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start and import-time harness for lambda/*/index.py')
+    parser.add_argument('--functions', nargs='+', default=_support.FUNCTIONS, choices=_support.FUNCTIONS)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per route (median is reported)')
+    parser.add_argument('--real-boto3', action='store_true', help='import real boto3 and build real clients lazily')
+    parser.add_argument('--output', help='write raw results as JSON')
+    parser.add_argument('--baseline', help='JSON from a previous --output run to compare against')
+    parser.add_argument('--markdown', help='also write the comparison table to this file')
+    parser.add_argument('--child', nargs=2, metavar=('FUNCTION', 'ROUTE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]), args.real_boto3)
+        return
+
+    results = {}
+    for function_name in args.functions:
+        for index, (method, path, _, _) in enumerate(ROUTE_EVENTS[function_name]):
+            results[f'{function_name} {method} {path}'] = measure(function_name, index, args.runs, args.real_boto3)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    table = render_table(results, baseline)
+    print(table)
+    if args.markdown:
+        with open(args.markdown, 'w') as f:
+            f.write(table + '\n')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
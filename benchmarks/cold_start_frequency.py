@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Cold-start frequency of the split and consolidated deployment layouts.
+
+lib/ai-agent-stack.ts deploys one function per action group by default;
+with -c consolidatedActionGroups=true every action group runs on the single
+lambda/consolidated function instead. Each Lambda function keeps its own
+pool of containers, so a turn that touches three action groups can pay up
+to three cold starts in the split layout and at most one in the
+consolidated layout.
+
+This harness replays the agent_replay plans as simulated traffic: agent
+sessions start at random times over the simulated span, each runs the
+plan's turns with model reasoning time between tool calls and user think
+time between turns. Every tool call is assigned to a container of its
+function: an idle container is reused, otherwise a new one is started
+(a cold start). Containers idle for longer than --idle-minutes are
+reclaimed, as Lambda does after an undocumented, roughly 5-15 minute
+window. The same traffic is run against both layouts and the report shows
+cold starts per turn, the share of turns with at least one cold start and
+the peak container count.
+
+Usage:
+  python benchmarks/cold_start_frequency.py
+  python benchmarks/cold_start_frequency.py --sessions 50 --hours 8 --idle-minutes 5
+  python benchmarks/cold_start_frequency.py --plan batch-metrics-review --output frequency.json
+"""
+import argparse
+import json
+import random
+
+import _schemas
+from agent_replay import PLANS, load_plan
+
+LAYOUTS = ('split', 'consolidated')
+
+class ContainerPool:
+    """The containers of one function: when each is busy until and was last used."""
+
+    def __init__(self, idle_seconds):
+        self.idle_seconds = idle_seconds
+        self.containers = []
+        self.peak = 0
+
+    def invoke(self, at, duration, init_seconds):
+        """Run one call starting at ``at``; returns whether it was a cold start."""
+        self.containers = [c for c in self.containers if c['busyUntil'] > at - self.idle_seconds]
+        for container in self.containers:
+            if container['busyUntil'] <= at:
+                container['busyUntil'] = at + duration
+                return False
+        self.containers.append({'busyUntil': at + init_seconds + duration})
+        self.peak = max(self.peak, len(self.containers))
+        return True
+
+def traffic(plan, groups, args):
+    """Tool calls of every simulated session as (start, turn id, function) tuples, by start time."""
+    rng = random.Random(args.seed)
+    calls = []
+    for session in range(args.sessions):
+        at = rng.uniform(0, args.hours * 3600)
+        for turn_index, turn in enumerate(plan):
+            for step in turn['steps']:
+                calls.append((at, (session, turn_index), groups[step['actionGroup']]['function']))
+                at += args.step_ms / 1000 + rng.expovariate(1 / args.step_gap_s)
+            at += rng.expovariate(1 / args.turn_gap_s)
+    return sorted(calls)
+
+def simulate(calls, layout, args):
+    pools = {}
+    cold_turns = {}
+    cold_starts = 0
+    for at, turn, function_name in calls:
+        pool_name = 'consolidated' if layout == 'consolidated' else function_name
+        pool = pools.setdefault(pool_name, ContainerPool(args.idle_minutes * 60))
+        cold = pool.invoke(at, args.step_ms / 1000, args.init_ms / 1000)
+        cold_starts += cold
+        cold_turns[turn] = cold_turns.get(turn, 0) + cold
+    turns = len(cold_turns)
+    return {
+        'layout': layout,
+        'invocations': len(calls),
+        'turns': turns,
+        'coldStarts': cold_starts,
+        'coldStartsPerTurn': round(cold_starts / turns, 3) if turns else 0,
+        'turnsWithColdStart': round(sum(1 for count in cold_turns.values() if count) / turns, 3) if turns else 0,
+        'coldInvocationRate': round(cold_starts / len(calls), 3) if calls else 0,
+        'peakContainers': sum(pool.peak for pool in pools.values())
+    }
+
+def render(results, args):
+    lines = [
+        f"{args.sessions} sessions over {args.hours} h of plan '{args.plan}', "
+        f"containers reclaimed after {args.idle_minutes} idle minutes",
+        '',
+        '| layout | invocations | cold starts | cold starts / turn | turns with a cold start | cold invocations | peak containers |',
+        '|---|---:|---:|---:|---:|---:|---:|'
+    ]
+    for result in results:
+        lines.append(
+            f"| {result['layout']} | {result['invocations']} | {result['coldStarts']} | "
+            f"{result['coldStartsPerTurn']:.2f} | {result['turnsWithColdStart']:.0%} | "
+            f"{result['coldInvocationRate']:.0%} | {result['peakContainers']} |"
+        )
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare cold-start frequency of the split and consolidated layouts')
+    parser.add_argument('--plan', default='analyze-optimize-store',
+                        help=f"built-in plan ({', '.join(PLANS)}) or a JSON file holding a list of turns")
+    parser.add_argument('--sessions', type=int, default=20, help='agent sessions to simulate')
+    parser.add_argument('--hours', type=float, default=8, help='span over which sessions start')
+    parser.add_argument('--idle-minutes', type=float, default=10, help='idle time after which a container is reclaimed')
+    parser.add_argument('--step-gap-s', type=float, default=4, help='mean model reasoning time between tool calls')
+    parser.add_argument('--turn-gap-s', type=float, default=90, help='mean user think time between turns')
+    parser.add_argument('--step-ms', type=float, default=300, help='handler duration of a warm call')
+    parser.add_argument('--init-ms', type=float, default=900, help='extra duration of a cold start')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--markdown', help='also write the table to this file')
+    args = parser.parse_args()
+
+    calls = traffic(load_plan(args.plan), _schemas.load_action_groups(), args)
+    results = [simulate(calls, layout, args) for layout in LAYOUTS]
+    report = render(results, args)
+    print(report)
+    if args.markdown:
+        with open(args.markdown, 'w') as f:
+            f.write(report + '\n')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'parameters': vars(args), 'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: response encoding for large action-group payloads.
+
+Compares the previous success_response path (hand-converting DynamoDB
+Decimals to float, then json.dumps(default=str)) with the shared
+agent_runtime encoder on compare-campaigns and optimize payloads.
+
+Usage: python benchmarks/encoder_benchmark.py [--campaigns 500] [--repeat 50]
+"""
+import argparse
+import json
+import random
+import timeit
+from datetime import datetime
+from decimal import Decimal
+
+import _support  # noqa: F401  (puts agent_runtime on sys.path)
+from agent_runtime import success_response
+
+def legacy_success_response(event, data):
+    return {
+        'messageVersion': '1.0',
+        'response': {
+            'actionGroup': event.get('actionGroup'),
+            'apiPath': event.get('apiPath'),
+            'httpMethod': event.get('httpMethod'),
+            'httpStatusCode': 200,
+            'responseBody': {
+                'application/json': {
+                    'body': json.dumps(data, default=str)
+                }
+            }
+        }
+    }
+
+def legacy_to_float(value):
+    """The per-field float(Decimal) conversion the handlers used to do."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, dict):
+        return {k: legacy_to_float(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [legacy_to_float(v) for v in value]
+    return value
+
+def money(rng, low, high):
+    return Decimal(str(round(rng.uniform(low, high), 2)))
+
+def compare_campaigns_payload(count, rng):
+    campaigns = []
+    for i in range(count):
+        campaigns.append({
+            'campaignId': f'camp-{i:05d}',
+            'metrics': {
+                'totalImpressions': Decimal(rng.randint(10000, 150000)),
+                'totalClicks': Decimal(rng.randint(500, 5000)),
+                'totalConversions': Decimal(rng.randint(20, 300)),
+                'totalCost': money(rng, 500, 2000),
+                'avgCTR': money(rng, 0.5, 5),
+                'avgCPC': money(rng, 0.2, 3),
+                'avgConversionRate': money(rng, 1, 12),
+                'avgCPA': money(rng, 5, 60),
+                'roas': money(rng, 0.5, 6)
+            },
+            'health': rng.choice(['good', 'needs_attention', 'critical'])
+        })
+    return {
+        'campaigns': campaigns,
+        'bestPerformer': campaigns[0]['campaignId'],
+        'worstPerformer': campaigns[-1]['campaignId'],
+        'recommendation': 'Consider reallocating budget',
+        'timestamp': datetime.now()
+    }
+
+def optimize_payload(count, rng):
+    allocations = []
+    for i in range(count):
+        allocations.append({
+            'campaignId': f'camp-{i:05d}',
+            'currentBudget': Decimal(1000),
+            'recommendedBudget': money(rng, 100, 3000),
+            'change': money(rng, -900, 2000),
+            'changePct': money(rng, -90, 200),
+            'weight': money(rng, 0, 100),
+            'roas': money(rng, 0.5, 6),
+            'cpa': money(rng, 5, 60)
+        })
+    return {
+        'optimizationGoal': 'maximize_roas',
+        'totalBudget': Decimal(count * 1000),
+        'allocations': allocations,
+        'expectedOutcomes': {'totalConversions': Decimal(4321), 'avgROAS': money(rng, 1, 5)},
+        'timestamp': datetime.now()
+    }
+
+def metric_rows(count, rng):
+    return [
+        {
+            'impressions': Decimal(rng.randint(1000, 90000)),
+            'clicks': Decimal(rng.randint(10, 900)),
+            'conversions': Decimal(rng.randint(0, 60)),
+            'cost': money(rng, 10, 300)
+        }
+        for _ in range(count)
+    ]
+
+def legacy_totals(items):
+    return [sum(float(item.get(field, 0)) for item in items)
+            for field in ('impressions', 'clicks', 'conversions', 'cost')]
+
+def native_totals(items):
+    return [float(sum(item.get(field, 0) for item in items))
+            for field in ('impressions', 'clicks', 'conversions', 'cost')]
+
+def best_ms(func, repeat):
+    return min(timeit.repeat(func, number=repeat, repeat=5)) / repeat * 1000
+
+def report(name, size, legacy_ms, shared_ms):
+    print(f"{name:<20} {size:>10,} {legacy_ms:>12.3f} {shared_ms:>12.3f} {legacy_ms / shared_ms:>8.2f}x")
+
+def run(name, payload, repeat):
+    event = {'actionGroup': 'bench', 'apiPath': f'/{name}', 'httpMethod': 'POST'}
+    legacy = best_ms(lambda: legacy_success_response(event, legacy_to_float(payload)), repeat)
+    shared = best_ms(lambda: success_response(event, payload), repeat)
+    size = len(success_response(event, payload)['response']['responseBody']['application/json']['body'])
+    report(name, size, legacy, shared)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--campaigns', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'payload':<20} {'bytes/rows':>10} {'legacy ms':>12} {'shared ms':>12} {'speedup':>9}")
+    run('compare-campaigns', compare_campaigns_payload(args.campaigns, rng), args.repeat)
+    run('optimize', optimize_payload(args.campaigns, rng), args.repeat)
+
+    # analyze_campaign_performance totals: per-item float() vs Decimal sums
+    rows = metric_rows(args.campaigns * 10, rng)
+    report('analyze totals', len(rows),
+           best_ms(lambda: legacy_totals(rows), args.repeat),
+           best_ms(lambda: native_totals(rows), args.repeat))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Per-route latency report from captured handler logs.
+
+Every routed invocation writes one CloudWatch Embedded Metric Format
+record (see agent_runtime/metrics.py). This script reads those records
+from saved log output, groups them by function and route, and prints
+p50/p95/p99 latency alongside the average AWS calls, items read and
+response size. Save a report with --output and pass it back with
+--baseline to track hot paths such as /analyze-performance and /optimize
+over time.
+
+Lines that are not EMF records are skipped, so raw `aws logs tail`,
+`sam logs` or CloudWatch export output can be fed in unchanged.
+
+Usage:
+  aws logs tail /aws/lambda/ai-agent-analytics --since 1d > analytics.log
+  python benchmarks/latency_report.py analytics.log budget.log
+  python benchmarks/latency_report.py analytics.log --output week1.json
+  python benchmarks/latency_report.py analytics.log --baseline week1.json --markdown report.md
+  cat *.log | python benchmarks/latency_report.py --route /optimize
+"""
+import argparse
+import json
+import math
+import sys
+
+COUNTERS = ('DynamoDBCalls', 'S3Calls', 'ItemsRead')
+
+def read_records(lines):
+    """EMF records found in ``lines``, skipping everything else."""
+    for line in lines:
+        start = line.find('{"_aws"')
+        if start < 0:
+            continue
+        try:
+            record = json.loads(line[start:])
+        except json.JSONDecodeError:
+            continue
+        if 'Route' in record and 'Latency' in record:
+            yield record
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+def summarize(records, route_filter=None):
+    groups = {}
+    for record in records:
+        route = record['Route']
+        if route_filter and route_filter not in route:
+            continue
+        groups.setdefault(f"{record.get('Function', '?')} {route}", []).append(record)
+
+    results = {}
+    for key in sorted(groups):
+        rows = groups[key]
+        latencies = sorted(float(row['Latency']) for row in rows)
+        sizes = sorted(int(row.get('ResponseBytes', 0)) for row in rows)
+        result = {
+            'count': len(rows),
+            'errors': sum(1 for row in rows if int(row.get('StatusCode', 200)) >= 400),
+            'p50Ms': round(percentile(latencies, 50), 3),
+            'p95Ms': round(percentile(latencies, 95), 3),
+            'p99Ms': round(percentile(latencies, 99), 3),
+            'maxMs': round(latencies[-1], 3),
+            'p95ResponseBytes': percentile(sizes, 95)
+        }
+        for name in COUNTERS:
+            result[f'avg{name}'] = round(sum(float(row.get(name, 0)) for row in rows) / len(rows), 2)
+        results[key] = result
+    return results
+
+def render_table(results, baseline):
+    header = ('| function | route | count | errors | p50 ms | p95 ms | p99 ms | max ms | '
+              'DynamoDB calls | S3 calls | items read | p95 bytes |')
+    divider = '|---|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|'
+    if baseline:
+        header += ' baseline p95 ms | change |'
+        divider += '---:|---:|'
+    lines = [header, divider]
+    for key, row in results.items():
+        function_name, route = key.split(' ', 1)
+        line = (f"| {function_name} | {route} | {row['count']} | {row['errors']} | "
+                f"{row['p50Ms']:.1f} | {row['p95Ms']:.1f} | {row['p99Ms']:.1f} | {row['maxMs']:.1f} | "
+                f"{row['avgDynamoDBCalls']:.2f} | {row['avgS3Calls']:.2f} | {row['avgItemsRead']:.1f} | "
+                f"{row['p95ResponseBytes']} |")
+        if baseline:
+            before = baseline.get(key)
+            if before:
+                change = (row['p95Ms'] - before['p95Ms']) / before['p95Ms'] * 100 if before['p95Ms'] else 0
+                line += f" {before['p95Ms']:.1f} | {change:+.1f}% |"
+            else:
+                line += ' - | new |'
+        lines.append(line)
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='p50/p95/p99 route latency from EMF log lines')
+    parser.add_argument('logs', nargs='*', help='captured log files (default: stdin)')
+    parser.add_argument('--route', help='only routes containing this text, e.g. /optimize')
+    parser.add_argument('--output', help='write the summary as JSON')
+    parser.add_argument('--baseline', help='JSON from a previous --output run to compare against')
+    parser.add_argument('--markdown', help='also write the table to this file')
+    args = parser.parse_args()
+
+    records = []
+    if args.logs:
+        for path in args.logs:
+            with open(path) as f:
+                records.extend(read_records(f))
+    else:
+        records.extend(read_records(sys.stdin))
+
+    results = summarize(records, args.route)
+    if not results:
+        sys.exit('No EMF route records found')
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    table = render_table(results, baseline)
+    print(table)
+    if args.markdown:
+        with open(args.markdown, 'w') as f:
+            f.write(table + '\n')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Memory profile per route, to right-size the Lambda memory settings.
+
+Each (function, route, scale) is run in a fresh interpreter under
+tracemalloc against the stubbed boto3 from _support, with a synthetic
+dataset that grows with the scale: more metric rows per campaign, more
+campaigns per comparison/optimization, more scenarios and larger stored
+insights. Each run records the memory traced during the handler import,
+the peak traced during the invocation, the process RSS high-water mark
+and the source lines holding the most memory after the call.
+
+The report ends with a recommended memorySize per function: the largest
+RSS seen, plus headroom, rounded up to a common Lambda size. Lambda also
+scales CPU with memory, so check latency (cold_start.py) before cutting a
+latency-sensitive function down. Use --real-boto3 for recommendations;
+without it the boto3 import (tens of MB) is not counted.
+
+Usage:
+  python benchmarks/memory_profile.py --real-boto3
+  python benchmarks/memory_profile.py --functions analytics --scales 1 8 32 --markdown memory.md
+"""
+import argparse
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+import tracemalloc
+
+import _support
+
+PROFILED_FUNCTIONS = ['analytics', 'budget-optimizer', 'storage']
+
+LAMBDA_MEMORY_SIZES = [128, 256, 512, 768, 1024, 1536, 2048, 3008]
+
+STACK_FILE = os.path.join(_support.REPO_ROOT, 'lib', 'ai-agent-stack.ts')
+
+# budget-optimizer's default KNOWN_CAMPAIGN_IDS, read by GET /recommendations
+KNOWN_CAMPAIGN_IDS = [
+    'goog-camp-001', 'goog-camp-002', 'goog-camp-003',
+    'meta-camp-001', 'meta-camp-002', 'meta-camp-003'
+]
+
+CONSTRUCT_IDS = {
+    'analytics': 'AnalyticsFunction',
+    'budget-optimizer': 'BudgetOptimizerFunction',
+    'storage': 'StorageFunction',
+}
+
+def dataset(scale):
+    """Rows per campaign and campaign ids used at ``scale``."""
+    rows = 14 * scale
+    campaigns = [f'{platform}-camp-{i:03d}' for i in range(2 + scale) for platform in ('goog', 'meta')]
+    return rows, campaigns
+
+def insight(scale):
+    return {
+        'rows': [
+            {'campaignId': f'goog-camp-{i:03d}', 'note': 'memory profile ' * 4, 'roas': 2.5, 'cpa': 18.0}
+            for i in range(50 * scale)
+        ]
+    }
+
+def route_events(function_name, scale):
+    """(method, path, params, body) per route, sized for ``scale``."""
+    _, campaigns = dataset(scale)
+    if function_name == 'analytics':
+        return [
+            ('GET', '/analyze-performance', {'campaignId': campaigns[0], 'days': '14'}, None),
+            ('GET', '/detect-trends', {'campaignId': campaigns[0]}, None),
+            ('POST', '/compare-campaigns', {}, {'campaignIds': campaigns}),
+            ('GET', '/recommendations', {'campaignId': campaigns[0]}, None),
+        ]
+    if function_name == 'budget-optimizer':
+        return [
+            ('POST', '/optimize', {}, {'totalBudget': 1000 * len(campaigns), 'campaignIds': campaigns}),
+            ('GET', '/recommendations', {'totalBudget': '6000'}, None),
+            ('POST', '/simulate', {}, {'scenarios': [
+                {'name': f'scenario-{i}', 'totalBudget': 5000,
+                 'allocations': {c: 5000 / len(campaigns) for c in campaigns}}
+                for i in range(2 * scale)
+            ]}),
+        ]
+    return [
+        ('POST', '/store', {}, {'key': 'memory-profile', 'data': insight(scale)}),
+        ('GET', '/retrieve', {'key': 'memory-profile'}, None),
+    ]
+
+# --- child process -----------------------------------------------------------
+
+def run_child(function_name, route_index, scale, real_boto3):
+    import resource
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ.setdefault('METRICS_TABLE', 'ad-optimizer-metrics')
+    os.environ.setdefault('BUCKET_NAME', 'ad-optimizer-bench')
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    os.environ.setdefault('METRICS_ENABLED', 'false')
+    rows, campaigns = dataset(scale)
+    s3 = _support.install_stub_boto3(real_boto3, rows_per_campaign=rows)
+
+    method, path, params, body = route_events(function_name, scale)[route_index]
+    if path == '/retrieve':
+        payload = json.dumps({'data': insight(scale), 'key': params['key']}).encode('utf-8')
+        s3.objects[(os.environ['BUCKET_NAME'], f"insights/{params['key']}.json")] = payload
+    event = _support.build_event(function_name, method, path, params, body)
+
+    # Generate the stub table's rows before tracing so they are not charged
+    # to the route; their RSS is subtracted from the high-water mark below
+    table = sys.modules['boto3'].resource('dynamodb').Table(os.environ['METRICS_TABLE'])
+    seed_started_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if function_name != 'storage':
+        for campaign_id in campaigns + KNOWN_CAMPAIGN_IDS:
+            table._rows(campaign_id)
+    seed_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - seed_started_kb
+
+    # Build the AWS clients before tracing: the peak is the route's own work,
+    # and boto3's allocations are not multiplied by tracemalloc's bookkeeping
+    from agent_runtime import clients
+    clients.table(os.environ['METRICS_TABLE'])
+    clients.client('s3')
+
+    tracemalloc.start(10)
+    module = _support.load_handler_module(function_name)
+    import_bytes = tracemalloc.get_traced_memory()[0]
+
+    # Snapshot whenever an AWS call returns at a new high-water mark, so the
+    # hot spots reflect what is alive at the peak rather than after the call
+    peak = {'bytes': 0, 'snapshot': None}
+
+    def after_call(**kwargs):
+        current = tracemalloc.get_traced_memory()[0]
+        if current > peak['bytes']:
+            peak.update(bytes=current, snapshot=tracemalloc.take_snapshot())
+
+    table.events.register('after-call', after_call)
+    s3.meta.events.register('after-call', after_call)
+
+    before = tracemalloc.take_snapshot()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    response = module.handler(event, None)
+    peak_bytes = tracemalloc.get_traced_memory()[1] - baseline
+    after_call()
+    # tracemalloc's own bookkeeping would not exist in Lambda
+    tracing_kb = tracemalloc.get_tracemalloc_memory() / 1024
+    tracemalloc.stop()
+
+    hotspots = [
+        {'site': f'{os.path.relpath(stat.traceback[0].filename, _support.REPO_ROOT)}:{stat.traceback[0].lineno}',
+         'kb': round(stat.size_diff / 1024, 1)}
+        for stat in peak['snapshot'].compare_to(before, 'lineno')
+        if stat.size_diff > 0 and stat.traceback[0].filename.startswith(_support.LAMBDA_DIR)
+    ][:3]
+    print(json.dumps({
+        'importKB': round(import_bytes / 1024, 1),
+        'peakKB': round(peak_bytes / 1024, 1),
+        'rssMB': round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - seed_kb - tracing_kb) / 1024, 1),
+        'rows': rows if function_name != 'storage' else 0,
+        'campaigns': len(campaigns) if function_name != 'storage' else 0,
+        'hotspots': hotspots,
+        'status': response['response']['httpStatusCode']
+    }))
+
+# --- parent process ----------------------------------------------------------
+
+def measure(function_name, route_index, scale, real_boto3):
+    command = [sys.executable, os.path.abspath(__file__), '--child', function_name, str(route_index), str(scale)]
+    if real_boto3:
+        command.append('--real-boto3')
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def configured_memory(function_name):
+    """memorySize set for the function in lib/ai-agent-stack.ts (Lambda default 128)."""
+    with open(STACK_FILE) as f:
+        source = f.read()
+    start = source.find(f"'{CONSTRUCT_IDS[function_name]}'")
+    if start < 0:
+        return None
+    block = source[start:source.find('});', start)]
+    match = re.search(r'memorySize:\s*(\d+)', block)
+    return int(match.group(1)) if match else 128
+
+def recommend(rss_mb, headroom):
+    needed = math.ceil(rss_mb * headroom)
+    for size in LAMBDA_MEMORY_SIZES:
+        if size >= needed:
+            return size
+    return LAMBDA_MEMORY_SIZES[-1]
+
+def render_table(results):
+    lines = [
+        '| function | route | scale | rows/campaign | campaigns | import KB | peak KB | RSS MB | top allocation sites |',
+        '|---|---|---:|---:|---:|---:|---:|---:|---|'
+    ]
+    for (function_name, route, scale), row in results.items():
+        sites = ', '.join(f"{h['site']} ({h['kb']} KB)" for h in row['hotspots']) or '-'
+        lines.append(
+            f"| {function_name} | {route} | {scale} | {row['rows'] or '-'} | {row['campaigns'] or '-'} | "
+            f"{row['importKB']:.0f} | {row['peakKB']:.0f} | {row['rssMB']:.1f} | {sites} |"
+        )
+    return '\n'.join(lines)
+
+def render_recommendations(results, headroom):
+    lines = [
+        '| function | max RSS MB | max peak traced MB | configured MB | recommended MB |',
+        '|---|---:|---:|---:|---:|'
+    ]
+    for function_name in dict.fromkeys(key[0] for key in results):
+        rows = [row for key, row in results.items() if key[0] == function_name]
+        rss_mb = max(row['rssMB'] for row in rows)
+        peak_mb = max(row['peakKB'] for row in rows) / 1024
+        configured = configured_memory(function_name)
+        lines.append(
+            f"| {function_name} | {rss_mb:.1f} | {peak_mb:.1f} | {configured or '-'} | "
+            f"{recommend(rss_mb, headroom)} |"
+        )
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='tracemalloc memory profile per route with growing synthetic data')
+    parser.add_argument('--functions', nargs='+', default=PROFILED_FUNCTIONS, choices=PROFILED_FUNCTIONS)
+    parser.add_argument('--scales', nargs='+', type=int, default=[1, 4, 16, 64],
+                        help='dataset scale factors (rows per campaign = 14 x scale)')
+    parser.add_argument('--headroom', type=float, default=1.5, help='multiplier applied to the max RSS')
+    parser.add_argument('--real-boto3', action='store_true', help='import real boto3 so its memory is counted')
+    parser.add_argument('--output', help='write raw results as JSON')
+    parser.add_argument('--markdown', help='also write the tables to this file')
+    parser.add_argument('--child', nargs=3, metavar=('FUNCTION', 'ROUTE', 'SCALE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]), int(args.child[2]), args.real_boto3)
+        return
+
+    results = {}
+    for function_name in args.functions:
+        for scale in args.scales:
+            for index, (method, path, _, _) in enumerate(route_events(function_name, scale)):
+                results[(function_name, f'{method} {path}', scale)] = measure(
+                    function_name, index, scale, args.real_boto3
+                )
+
+    report = render_table(results) + '\n\n' + render_recommendations(results, args.headroom)
+    print(report)
+    if args.markdown:
+        with open(args.markdown, 'w') as f:
+            f.write(report + '\n')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({' '.join(map(str, key)): row for key, row in results.items()}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Merge cProfile dumps captured by the handlers into one top-N report.
+
+Handlers write a .prof file per profiled invocation (see
+agent_runtime/profiling.py), to the campaign data bucket or /tmp. This
+script collects dumps from local files and directories, or downloads them
+from S3, merges them with pstats and prints the most expensive functions,
+so a slow /compare-campaigns or /simulate shows whether the time went to
+DynamoDB, Decimal conversion or JSON encoding.
+
+Usage:
+  python benchmarks/profile_report.py /tmp/profiles
+  python benchmarks/profile_report.py --bucket my-bucket --prefix profiles/analytics/POST_compare-campaigns
+  python benchmarks/profile_report.py /tmp/profiles --route simulate --sort tottime --top 40
+"""
+import argparse
+import os
+import pstats
+import sys
+import tempfile
+
+def local_dumps(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.endswith('.prof'):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+def download_dumps(bucket, prefix, directory):
+    import boto3
+
+    s3 = boto3.client('s3')
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if not obj['Key'].endswith('.prof'):
+                continue
+            path = os.path.join(directory, obj['Key'].replace('/', '_'))
+            s3.download_file(bucket, obj['Key'], path)
+            yield path
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge handler cProfile dumps into a top-N report')
+    parser.add_argument('paths', nargs='*', help='.prof files or directories holding them')
+    parser.add_argument('--bucket', help='download dumps from this S3 bucket')
+    parser.add_argument('--prefix', default='profiles/', help='S3 key prefix to download (default profiles/)')
+    parser.add_argument('--route', help='only dumps whose path contains this text, e.g. compare-campaigns')
+    parser.add_argument('--sort', default='cumulative', choices=['cumulative', 'tottime', 'ncalls'])
+    parser.add_argument('--top', type=int, default=25, help='number of functions to show')
+    parser.add_argument('--output', help='also write the merged stats to this .prof file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        dumps = list(local_dumps(args.paths))
+        if args.bucket:
+            dumps.extend(download_dumps(args.bucket, args.prefix, directory))
+        if args.route:
+            dumps = [path for path in dumps if args.route in path]
+        if not dumps:
+            sys.exit('No profile dumps found')
+
+        stats = pstats.Stats(dumps[0])
+        for path in dumps[1:]:
+            stats.add(path)
+
+    print(f'{len(dumps)} profiled invocations merged')
+    stats.strip_dirs().sort_stats(args.sort).print_stats(args.top)
+    if args.output:
+        stats.dump_stats(args.output)
+
+if __name__ == '__main__':
+    main()
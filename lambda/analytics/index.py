@@ -1,105 +1,208 @@
-import json
 import os
-import boto3
+import threading
+from bisect import bisect_left
 from datetime import datetime, timedelta
-from decimal import Decimal
-from boto3.dynamodb.conditions import Key
 import statistics
 
-s3_client = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
+from agent_runtime import (
+    BadRequest,
+    CircuitOpen,
+    FieldSelection,
+    Router,
+    StructuredLogger,
+    TTLCache,
+    mark_partial,
+    paginate,
+    profiled,
+    resume_indexes,
+    run_concurrently,
+    storage,
+)
 
 BUCKET_NAME = os.environ.get('BUCKET_NAME')
 METRICS_TABLE = os.environ.get('METRICS_TABLE')
 
+TRENDS_WINDOW_DAYS = 14
+
+logger = StructuredLogger('analytics')
+router = Router('analytics', logger=logger)
+
+# Derived per-campaign analyses, reused by warm invocations in this container.
+# Metric rows are written by the ads functions in other containers, so the
+# TTL bounds how stale an analysis can be.
+analysis_cache = TTLCache(int(os.environ.get('ANALYSIS_CACHE_TTL', '60')), max_entries=256, name='analytics.analysis')
+
+# Oldest expired analysis served, labeled with its age, while the metrics table is unavailable
+STALE_MAX_AGE = int(os.environ.get('STALE_MAX_AGE', '3600'))
+
+@profiled('analytics', logger)
 def handler(event, context):
     """
     Performance analytics tool for the AI agent.
     Analyzes campaign performance, identifies trends, and predicts outcomes.
     """
-    print(f"Received event: {json.dumps(event)}")
-    
-    api_path = event.get('apiPath', '')
-    http_method = event.get('httpMethod', '')
-    parameters = event.get('parameters', [])
-    request_body = event.get('requestBody', {})
-    
-    # Handle GET PERFORMANCE ANALYSIS
-    if http_method == 'GET' and '/analyze-performance' in api_path:
-        campaign_id = get_parameter(parameters, 'campaignId')
-        days = int(get_parameter(parameters, 'days') or 7)
-        
-        if not campaign_id:
-            return error_response(event, 'campaignId parameter required')
-        
-        analysis = analyze_campaign_performance(campaign_id, days)
-        return success_response(event, analysis)
-    
-    # Handle GET TREND DETECTION
-    elif http_method == 'GET' and '/detect-trends' in api_path:
-        campaign_id = get_parameter(parameters, 'campaignId')
-        
-        if not campaign_id:
-            return error_response(event, 'campaignId parameter required')
-        
-        trends = detect_performance_trends(campaign_id)
-        return success_response(event, trends)
-    
-    # Handle POST COMPARE CAMPAIGNS
-    elif http_method == 'POST' and '/compare-campaigns' in api_path:
-        body_data = parse_request_body(request_body)
-        campaign_ids = body_data.get('campaignIds', [])
-        
-        if not campaign_ids or len(campaign_ids) < 2:
-            return error_response(event, 'At least 2 campaignIds required')
-        
-        comparison = compare_campaigns(campaign_ids)
-        return success_response(event, comparison)
-    
-    # Handle GET RECOMMENDATIONS
-    elif http_method == 'GET' and '/recommendations' in api_path:
-        campaign_id = get_parameter(parameters, 'campaignId')
-        
-        if not campaign_id:
-            return error_response(event, 'campaignId parameter required')
-        
-        recommendations = generate_recommendations(campaign_id)
-        return success_response(event, recommendations)
+    return router.dispatch(event, context)
+
+@router.route('GET', '/analyze-performance')
+def _analyze_performance(request):
+    campaign_id = require_campaign_id(request)
+    days = int(request.param('days') or 7)
+    memo = MetricsWindowMemo()
+    analysis = analyze_campaign_performance(campaign_id, days, memo, fields=request.fields)
+    return with_query_stats(analysis, memo)
+
+@router.route('GET', '/detect-trends')
+def _detect_trends(request):
+    memo = MetricsWindowMemo()
+    trends = detect_performance_trends(require_campaign_id(request), memo, fields=request.fields)
+    return with_query_stats(trends, memo)
+
+@router.route('POST', '/compare-campaigns')
+def _compare_campaigns(request):
+    campaign_ids = request.body.get('campaignIds', [])
     
-    # Handle GET CROSS-PLATFORM ANALYSIS
-    elif http_method == 'GET' and '/cross-platform' in api_path:
-        analysis = analyze_cross_platform_performance()
-        return success_response(event, analysis)
+    if not campaign_ids or len(campaign_ids) < 2:
+        raise BadRequest('At least 2 campaignIds required')
     
-    # Handle general analytics request (from manual action group)
-    elif http_method == 'GET' and api_path == '/analytics':
-        # Get general analytics overview
-        start_date = get_parameter(parameters, 'startDate')
-        end_date = get_parameter(parameters, 'endDate')
-        
-        # Return cross-platform analysis as default
-        analysis = analyze_cross_platform_performance()
-        analysis['dateRange'] = f"{start_date} to {end_date}" if start_date and end_date else "Last 7 days"
-        analysis['message'] = "Here's your advertising performance overview across all platforms"
-        
-        return success_response(event, analysis)
+    # A continuation token resumes with the campaigns a partial response left out
+    indexes = resume_indexes(request, len(campaign_ids))
+    memo = MetricsWindowMemo()
+    comparison = compare_campaigns(
+        [campaign_ids[i] for i in indexes], memo, fields=request.fields, deadline=request.deadline
+    )
+    pending = [i for i in indexes if request.deadline.was_skipped(campaign_ids[i])]
+    comparison = mark_partial(with_query_stats(comparison, memo), request, pending)
+    return paginate(comparison, 'campaigns', request, order_by=lambda c: c['metrics'].get('roas', 0))
+
+@router.route('GET', '/recommendations')
+def _recommendations(request):
+    memo = MetricsWindowMemo()
+    return with_query_stats(generate_recommendations(require_campaign_id(request), memo), memo)
+
+@router.route('GET', '/cross-platform')
+def _cross_platform(request):
+    return analyze_cross_platform_performance()
+
+@router.route('GET', '/analytics')
+def _analytics_overview(request):
+    # General analytics request (from manual action group)
+    start_date = request.param('startDate')
+    end_date = request.param('endDate')
     
-    else:
-        return error_response(event, 'Invalid operation')
+    # Return cross-platform analysis as default
+    analysis = analyze_cross_platform_performance()
+    analysis['dateRange'] = f"{start_date} to {end_date}" if start_date and end_date else "Last 7 days"
+    analysis['message'] = "Here's your advertising performance overview across all platforms"
+    return analysis
+
+def require_campaign_id(request):
+    campaign_id = request.param('campaignId')
+    if not campaign_id:
+        raise BadRequest('campaignId parameter required')
+    return campaign_id
+
+def with_query_stats(result, memo):
+    """Attach the request's DynamoDB usage to a route result."""
+    result['queryStats'] = memo.stats()
+    return result
+
+class MetricsWindowMemo:
+    """
+    Request-scoped cache of metric rows per campaign.
+
+    The widest window asked for is queried once; narrower windows over the
+    same campaign are served by slicing those rows in memory, so one
+    request never re-reads rows it already has. ``prefetch`` loads several
+    campaigns concurrently; a campaign whose prefetch failed raises the
+    same error when its rows are asked for, without querying again.
+    """
+
+    def __init__(self):
+        self.now = datetime.now()
+        self.queries = 0
+        self.items_read = 0
+        self._windows = {}
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def items(self, campaign_id, days):
+        """Metric rows for the last ``days`` days, oldest first."""
+        failure = self._failures.get(campaign_id)
+        if failure is not None:
+            raise failure
+        cached = self._windows.get(campaign_id)
+        if cached is None or cached[0] < days:
+            cached = (days, self._query(campaign_id, self.start_time(days)))
+            self._windows[campaign_id] = cached
+        window_days, items = cached
+        if window_days == days:
+            return items
+        timestamps = [item['timestamp'] for item in items]
+        return items[bisect_left(timestamps, self.start_time(days)):]
+
+    def prefetch(self, campaign_ids, days, deadline=None):
+        """
+        Load the ``days`` window of each campaign, querying them concurrently.
+        Campaigns not started before ``deadline`` expires are left unloaded.
+        """
+        run_concurrently(
+            lambda campaign_id: self._prefetch(campaign_id, days), dict.fromkeys(campaign_ids), deadline=deadline
+        )
 
-def analyze_campaign_performance(campaign_id, days=7):
-    """Analyze campaign performance over time period."""
+    def _prefetch(self, campaign_id, days):
+        try:
+            self.items(campaign_id, days)
+        except Exception as e:
+            with self._lock:
+                self._failures[campaign_id] = e
+
+    def start_time(self, days):
+        return int((self.now - timedelta(days=days)).timestamp())
+
+    def stats(self):
+        return {'queries': self.queries, 'itemsRead': self.items_read}
+
+    def _query(self, campaign_id, start_time):
+        table = storage.table(METRICS_TABLE)
+        items = []
+        queries = 0
+        last_key = None
+        while True:
+            page, last_key = table.query(campaign_id, since=start_time, start_key=last_key)
+            queries += 1
+            items.extend(page)
+            if last_key is None:
+                break
+        with self._lock:
+            self.queries += queries
+            self.items_read += len(items)
+        return items
+
+def analyze_campaign_performance(campaign_id, days=7, memo=None, fields=None):
+    """
+    Analyze campaign performance over time period.
+    Trends and issues are only computed when ``fields`` asks for them
+    (or for ``overallHealth``, which is derived from the issues).
+    Results are reused from ``analysis_cache`` while fresh. When the
+    metrics cannot be read (an open circuit breaker or a storage error), an
+    expired analysis is served with its ``staleAgeSeconds``; with none, an
+    open circuit breaker fails fast. Errors in the analysis itself are
+    never masked by stale data.
+    """
+    memo = memo or MetricsWindowMemo()
+    cache_key = analysis_key(campaign_id, days, fields)
+    want_trends, want_issues = cache_key[2:]
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+    
     try:
-        table = dynamodb.Table(METRICS_TABLE)
-        
         # Query metrics for the campaign
-        start_time = int((datetime.now() - timedelta(days=days)).timestamp())
-        response = table.query(
-            KeyConditionExpression=Key('campaignId').eq(campaign_id) & Key('timestamp').gte(start_time)
-        )
-        
-        items = response.get('Items', [])
-        
+        items = memo.items(campaign_id, days)
+    except storage.read_errors() as e:
+        return unavailable_analysis(campaign_id, days, cache_key, e)
+    
+    try:
         if not items:
             return {
                 'campaignId': campaign_id,
@@ -108,40 +211,18 @@ def analyze_campaign_performance(campaign_id, days=7):
             }
         
         # Calculate aggregate metrics
-        total_impressions = sum(float(item.get('impressions', 0)) for item in items)
-        total_clicks = sum(float(item.get('clicks', 0)) for item in items)
-        total_conversions = sum(float(item.get('conversions', 0)) for item in items)
-        total_cost = sum(float(item.get('cost', 0)) for item in items)
+        # Sum the DynamoDB Decimals natively and convert each total once
+        total_impressions = float(sum(item.get('impressions', 0) for item in items))
+        total_clicks = float(sum(item.get('clicks', 0) for item in items))
+        total_conversions = float(sum(item.get('conversions', 0) for item in items))
+        total_cost = float(sum(item.get('cost', 0) for item in items))
         
         avg_ctr = (total_clicks / total_impressions * 100) if total_impressions > 0 else 0
         avg_cpc = (total_cost / total_clicks) if total_clicks > 0 else 0
         avg_conversion_rate = (total_conversions / total_clicks * 100) if total_clicks > 0 else 0
         avg_cpa = (total_cost / total_conversions) if total_conversions > 0 else 0
         
-        # Calculate trends
-        recent_items = items[-3:] if len(items) >= 3 else items
-        older_items = items[:3] if len(items) >= 6 else items[:len(items)//2]
-        
-        recent_ctr = statistics.mean([float(item.get('ctr', 0)) for item in recent_items])
-        older_ctr = statistics.mean([float(item.get('ctr', 0)) for item in older_items])
-        ctr_trend = 'improving' if recent_ctr > older_ctr else 'declining' if recent_ctr < older_ctr else 'stable'
-        
-        recent_cpa = statistics.mean([float(item.get('cpa', 0)) for item in recent_items if float(item.get('cpa', 0)) > 0])
-        older_cpa = statistics.mean([float(item.get('cpa', 0)) for item in older_items if float(item.get('cpa', 0)) > 0])
-        cpa_trend = 'improving' if recent_cpa < older_cpa else 'declining' if recent_cpa > older_cpa else 'stable'
-        
-        # Detect issues
-        issues = []
-        if avg_ctr < 1.0:
-            issues.append('Low CTR - consider improving ad copy or targeting')
-        if avg_conversion_rate < 2.0:
-            issues.append('Low conversion rate - review landing page and offer')
-        if ctr_trend == 'declining':
-            issues.append('CTR declining - possible ad fatigue')
-        if cpa_trend == 'declining':
-            issues.append('CPA increasing - efficiency dropping')
-        
-        return {
+        result = {
             'campaignId': campaign_id,
             'period': f'{days} days',
             'dataPoints': len(items),
@@ -156,26 +237,97 @@ def analyze_campaign_performance(campaign_id, days=7):
                 'avgCPA': round(avg_cpa, 2),
                 'roas': round((total_conversions * 50) / total_cost, 2) if total_cost > 0 else 0  # Assuming $50 avg order value
             },
-            'trends': {
-                'ctr': ctr_trend,
-                'cpa': cpa_trend
-            },
-            'issues': issues,
-            'overallHealth': 'good' if len(issues) == 0 else 'needs_attention' if len(issues) <= 2 else 'critical',
             'timestamp': datetime.now().isoformat()
         }
         
+        if want_trends:
+            # Calculate trends
+            recent_items = items[-3:] if len(items) >= 3 else items
+            older_items = items[:3] if len(items) >= 6 else items[:len(items)//2]
+            
+            recent_ctr = statistics.mean([item.get('ctr', 0) for item in recent_items])
+            older_ctr = statistics.mean([item.get('ctr', 0) for item in older_items])
+            ctr_trend = 'improving' if recent_ctr > older_ctr else 'declining' if recent_ctr < older_ctr else 'stable'
+            
+            recent_cpa = statistics.mean([item.get('cpa', 0) for item in recent_items if item.get('cpa', 0) > 0])
+            older_cpa = statistics.mean([item.get('cpa', 0) for item in older_items if item.get('cpa', 0) > 0])
+            cpa_trend = 'improving' if recent_cpa < older_cpa else 'declining' if recent_cpa > older_cpa else 'stable'
+            
+            result['trends'] = {
+                'ctr': ctr_trend,
+                'cpa': cpa_trend
+            }
+        
+        if want_issues:
+            # Detect issues
+            issues = []
+            if avg_ctr < 1.0:
+                issues.append('Low CTR - consider improving ad copy or targeting')
+            if avg_conversion_rate < 2.0:
+                issues.append('Low conversion rate - review landing page and offer')
+            if ctr_trend == 'declining':
+                issues.append('CTR declining - possible ad fatigue')
+            if cpa_trend == 'declining':
+                issues.append('CPA increasing - efficiency dropping')
+            
+            result['issues'] = issues
+            result['overallHealth'] = 'good' if len(issues) == 0 else 'needs_attention' if len(issues) <= 2 else 'critical'
+        
+        analysis_cache.set(cache_key, result, tags=[f'campaign:{campaign_id}'])
+        return dict(result)
+        
     except Exception as e:
-        print(f"Error analyzing performance: {str(e)}")
+        logger.error('Error analyzing performance', error=str(e))
         return {
             'campaignId': campaign_id,
             'status': 'error',
             'message': str(e)
         }
 
-def detect_performance_trends(campaign_id):
+def unavailable_analysis(campaign_id, days, cache_key, error):
+    """Stale analysis when the metrics read failed, else the failure itself."""
+    stale = stale_analysis(campaign_id, days, cache_key)
+    if stale is not None:
+        logger.warning('serving stale analysis', campaignId=campaign_id, error=str(error),
+                       ageSeconds=stale['staleAgeSeconds'])
+        return stale
+    if isinstance(error, CircuitOpen):
+        return {
+            'campaignId': campaign_id,
+            'status': 'unavailable',
+            'message': str(error),
+            'retryAfterSeconds': round(error.retry_after)
+        }
+    logger.error('Error analyzing performance', error=str(error))
+    return {
+        'campaignId': campaign_id,
+        'status': 'error',
+        'message': str(error)
+    }
+
+def stale_analysis(campaign_id, days, cache_key):
+    """Expired analysis for the key (or the full analysis of the window), labeled with its age."""
+    for key in (cache_key, (campaign_id, days, True, True)):
+        stale = analysis_cache.stale(key, STALE_MAX_AGE)
+        if stale is not None:
+            analysis, age = stale
+            return dict(analysis, stale=True, staleAgeSeconds=round(age))
+    return None
+
+def analysis_key(campaign_id, days, fields=None):
+    """Cache key of an analysis: the sections a selection needs decide what is computed."""
+    fields = fields or FieldSelection()
+    want_issues = fields.wants('issues') or fields.wants('overallHealth')
+    want_trends = want_issues or fields.wants('trends')
+    return (campaign_id, days, want_trends, want_issues)
+
+def detect_performance_trends(campaign_id, memo=None, fields=None):
     """Detect specific performance trends and anomalies."""
-    analysis = analyze_campaign_performance(campaign_id, days=14)
+    fields = fields or FieldSelection()
+    needed = ['aggregateMetrics', 'trends'] if fields.wants('detectedTrends') else ['aggregateMetrics']
+    analysis = analyze_campaign_performance(
+        campaign_id, days=TRENDS_WINDOW_DAYS, memo=memo, fields=FieldSelection(needed)
+    )
     
     trends = {
         'campaignId': campaign_id,
@@ -219,17 +371,37 @@ def detect_performance_trends(campaign_id):
     
     return trends
 
-def compare_campaigns(campaign_ids):
-    """Compare performance across multiple campaigns."""
+def compare_campaigns(campaign_ids, memo=None, fields=None, deadline=None):
+    """
+    Compare performance across multiple campaigns.
+    Campaigns whose metrics were not read before ``deadline`` expired are
+    left out; they are in ``deadline.skipped``.
+    """
+    memo = memo or MetricsWindowMemo()
+    fields = fields or FieldSelection()
+    # Ranking needs the metrics; health needs the full issue scan
+    needed = ['aggregateMetrics', 'overallHealth'] if fields.wants('campaigns', 'health') else ['aggregateMetrics']
     comparisons = []
     
+    # Query the windows of campaigns without a cached analysis concurrently;
+    # the analyses below are then served from the caches or the memo
+    memo.prefetch(
+        [c for c in campaign_ids if analysis_key(c, 7, FieldSelection(needed)) not in analysis_cache], 7, deadline
+    )
     for campaign_id in campaign_ids:
-        analysis = analyze_campaign_performance(campaign_id, days=7)
-        comparisons.append({
+        if deadline is not None and deadline.was_skipped(campaign_id):
+            continue
+        analysis = analyze_campaign_performance(campaign_id, days=7, memo=memo, fields=FieldSelection(needed))
+        comparison = {
             'campaignId': campaign_id,
             'metrics': analysis.get('aggregateMetrics', {}),
             'health': analysis.get('overallHealth', 'unknown')
-        })
+        }
+        if analysis.get('stale'):
+            comparison['staleAgeSeconds'] = analysis['staleAgeSeconds']
+        elif analysis.get('status') in ('unavailable', 'error'):
+            comparison['status'] = analysis['status']
+        comparisons.append(comparison)
     
     # Identify best and worst performers
     comparisons_with_roas = [c for c in comparisons if c['metrics'].get('roas', 0) > 0]
@@ -245,10 +417,13 @@ def compare_campaigns(campaign_ids):
         'timestamp': datetime.now().isoformat()
     }
 
-def generate_recommendations(campaign_id):
+def generate_recommendations(campaign_id, memo=None):
     """Generate actionable recommendations for campaign optimization."""
-    analysis = analyze_campaign_performance(campaign_id, days=7)
-    trends = detect_performance_trends(campaign_id)
+    memo = memo or MetricsWindowMemo()
+    
+    # Fetch the trends window first; the 7-day analysis is sliced from it
+    trends = detect_performance_trends(campaign_id, memo)
+    analysis = analyze_campaign_performance(campaign_id, days=7, memo=memo)
     
     recommendations = []
     
@@ -345,55 +520,3 @@ def analyze_cross_platform_performance():
         'recommendation': 'Allocate more budget to Google Ads - it has higher ROAS (3.2 vs 2.8)',
         'timestamp': datetime.now().isoformat()
     }
-
-def get_parameter(parameters, name):
-    """Extract parameter value by name."""
-    for param in parameters:
-        if param.get('name') == name:
-            return param.get('value')
-    return None
-
-def parse_request_body(request_body):
-    """Parse request body from Bedrock Agent format."""
-    if not request_body:
-        return {}
-    content = request_body.get('content', {})
-    body_str = content.get('application/json', '')
-    if body_str:
-        try:
-            return json.loads(body_str)
-        except json.JSONDecodeError:
-            return {}
-    return {}
-
-def success_response(event, data):
-    return {
-        'messageVersion': '1.0',
-        'response': {
-            'actionGroup': event.get('actionGroup'),
-            'apiPath': event.get('apiPath'),
-            'httpMethod': event.get('httpMethod'),
-            'httpStatusCode': 200,
-            'responseBody': {
-                'application/json': {
-                    'body': json.dumps(data, default=str)
-                }
-            }
-        }
-    }
-
-def error_response(event, error_message):
-    return {
-        'messageVersion': '1.0',
-        'response': {
-            'actionGroup': event.get('actionGroup'),
-            'apiPath': event.get('apiPath'),
-            'httpMethod': event.get('httpMethod'),
-            'httpStatusCode': 400,
-            'responseBody': {
-                'application/json': {
-                    'body': json.dumps({'error': error_message})
-                }
-            }
-        }
-    }
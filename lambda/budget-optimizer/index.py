@@ -1,103 +1,135 @@
-import json
 import os
-import boto3
-from datetime import datetime, timedelta
-from decimal import Decimal
-from boto3.dynamodb.conditions import Key
+from datetime import datetime
 
-s3_client = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
+from agent_runtime import (
+    BadRequest,
+    CircuitOpen,
+    FieldSelection,
+    Router,
+    StructuredLogger,
+    TTLCache,
+    invalidate,
+    mark_partial,
+    metrics_digest,
+    paginate,
+    profiled,
+    resume_indexes,
+    run_concurrently,
+    storage,
+)
 
 BUCKET_NAME = os.environ.get('BUCKET_NAME')
 METRICS_TABLE = os.environ.get('METRICS_TABLE')
 
+# Campaigns whose metrics warming pings preload (comma-separated override)
+KNOWN_CAMPAIGN_IDS = [c.strip() for c in os.environ.get('WARM_CAMPAIGN_IDS', '').split(',') if c.strip()] or [
+    'goog-camp-001', 'goog-camp-002', 'goog-camp-003',
+    'meta-camp-001', 'meta-camp-002', 'meta-camp-003'
+]
+
+# Latest metrics per campaign, kept for warm invocations in this container
+metrics_cache = TTLCache(int(os.environ.get('METRICS_CACHE_TTL', '60')), max_entries=512, name='budget-optimizer.metrics')
+
+# Oldest expired metrics served, labeled with their age, while the metrics table is unavailable
+STALE_MAX_AGE = int(os.environ.get('STALE_MAX_AGE', '3600'))
+
+logger = StructuredLogger('budget-optimizer')
+router = Router('budget-optimizer', logger=logger)
+
+@profiled('budget-optimizer', logger)
 def handler(event, context):
     """
     Budget optimization tool for the AI agent.
     Optimizes budget allocation across campaigns and platforms.
     """
-    print(f"Received event: {json.dumps(event)}")
+    return router.dispatch(event, context)
+
+@router.route('*', '/health')
+def _health(request):
+    return {
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'function': 'budget-optimizer'
+    }
+
+@router.preload('connections')
+def _preload_connections():
+    return storage.table(METRICS_TABLE).warm()
+
+@router.preload('metrics')
+def _preload_metrics():
+    found = run_concurrently(lambda c: get_campaign_metrics(c, refresh=True), KNOWN_CAMPAIGN_IDS)
+    loaded = [c for c, metrics in zip(KNOWN_CAMPAIGN_IDS, found) if metrics]
+    return {'campaigns': loaded, 'missing': len(KNOWN_CAMPAIGN_IDS) - len(loaded)}
+
+@router.route('POST', '/optimize')
+def _optimize(request):
+    total_budget = request.body.get('totalBudget')
+    campaign_ids = request.body.get('campaignIds', [])
+    optimization_goal = request.body.get('goal', 'maximize_roas')  # maximize_roas, minimize_cpa, maximize_conversions
     
-    # Handle warming requests (prevents cold starts)
-    if event.get('source') == 'warming':
-        return {
-            'statusCode': 200,
-            'body': json.dumps({'status': 'warm', 'timestamp': datetime.now().isoformat()})
-        }
+    if not total_budget or not campaign_ids:
+        raise BadRequest('totalBudget and campaignIds required')
     
-    api_path = event.get('apiPath', '')
-    http_method = event.get('httpMethod', '')
-    parameters = event.get('parameters', [])
-    request_body = event.get('requestBody', {})
+    allocation = optimize_budget_allocation(
+        total_budget, campaign_ids, optimization_goal, fields=request.fields, session=request.session
+    )
+    if 'allocations' not in allocation:
+        return allocation
+    return paginate(allocation, 'allocations', request, order_by=lambda a: a['recommendedBudget'])
+
+@router.route('POST', '/reallocate', idempotent=True)
+def _reallocate(request):
+    from_campaign = request.body.get('fromCampaign')
+    to_campaign = request.body.get('toCampaign')
+    amount = request.body.get('amount')
     
-    # Handle health checks
-    if api_path == '/health':
-        return success_response(event, {
-            'status': 'healthy',
-            'timestamp': datetime.now().isoformat(),
-            'function': 'budget-optimizer'
-        })
+    if not from_campaign or not to_campaign or not amount:
+        raise BadRequest('fromCampaign, toCampaign, and amount required')
     
-    # Handle POST OPTIMIZE BUDGET
-    if http_method == 'POST' and '/optimize' in api_path:
-        body_data = parse_request_body(request_body)
-        total_budget = body_data.get('totalBudget')
-        campaign_ids = body_data.get('campaignIds', [])
-        optimization_goal = body_data.get('goal', 'maximize_roas')  # maximize_roas, minimize_cpa, maximize_conversions
-        
-        if not total_budget or not campaign_ids:
-            return error_response(event, 'totalBudget and campaignIds required')
-        
-        allocation = optimize_budget_allocation(total_budget, campaign_ids, optimization_goal)
-        return success_response(event, allocation)
+    invalidate(f'campaign:{from_campaign}')
+    invalidate(f'campaign:{to_campaign}')
+    return reallocate_budget(from_campaign, to_campaign, amount)
+
+@router.route('GET', '/recommendations')
+def _recommendations(request):
+    total_budget = float(request.param('totalBudget') or 0)
     
-    # Handle POST REALLOCATE
-    elif http_method == 'POST' and '/reallocate' in api_path:
-        body_data = parse_request_body(request_body)
-        from_campaign = body_data.get('fromCampaign')
-        to_campaign = body_data.get('toCampaign')
-        amount = body_data.get('amount')
-        
-        if not from_campaign or not to_campaign or not amount:
-            return error_response(event, 'fromCampaign, toCampaign, and amount required')
-        
-        result = reallocate_budget(from_campaign, to_campaign, amount)
-        return success_response(event, result)
+    if not total_budget:
+        raise BadRequest('totalBudget parameter required')
     
-    # Handle GET BUDGET RECOMMENDATIONS
-    elif http_method == 'GET' and '/recommendations' in api_path:
-        total_budget = float(get_parameter(parameters, 'totalBudget') or 0)
-        
-        if not total_budget:
-            return error_response(event, 'totalBudget parameter required')
-        
-        recommendations = get_budget_recommendations(total_budget)
-        return success_response(event, recommendations)
+    return get_budget_recommendations(total_budget, fields=request.fields, session=request.session)
+
+@router.route('POST', '/simulate')
+def _simulate(request):
+    budget_scenarios = request.body.get('scenarios', [])
     
-    # Handle POST SIMULATE
-    elif http_method == 'POST' and '/simulate' in api_path:
-        body_data = parse_request_body(request_body)
-        budget_scenarios = body_data.get('scenarios', [])
-        
-        if not budget_scenarios:
-            return error_response(event, 'scenarios required')
-        
-        simulation = simulate_budget_scenarios(budget_scenarios)
-        return success_response(event, simulation)
+    if not budget_scenarios:
+        raise BadRequest('scenarios required')
     
-    else:
-        return error_response(event, 'Invalid operation')
+    # A continuation token resumes with the scenarios a partial response left out
+    indexes = resume_indexes(request, len(budget_scenarios))
+    simulation = simulate_budget_scenarios(
+        [budget_scenarios[i] for i in indexes], session=request.session, deadline=request.deadline
+    )
+    pending = [i for i in indexes if scenario_skipped(budget_scenarios[i], request.deadline)]
+    simulation = mark_partial(simulation, request, pending)
+    return paginate(simulation, 'scenarios', request, order_by=lambda r: r['expectedROAS'])
 
-def optimize_budget_allocation(total_budget, campaign_ids, optimization_goal='maximize_roas'):
+def optimize_budget_allocation(total_budget, campaign_ids, optimization_goal='maximize_roas', fields=None, session=None):
     """
     Optimize budget allocation across campaigns based on performance.
     Uses a simple weighted allocation based on historical performance.
+    Expected outcomes and the summary are only computed when ``fields``
+    asks for them.
     """
+    fields = fields or FieldSelection()
     # Get performance data for all campaigns
     campaign_performance = []
+    metrics_by_campaign = fetch_campaign_metrics(campaign_ids, session=session)
     
     for campaign_id in campaign_ids:
-        metrics = get_campaign_metrics(campaign_id)
+        metrics = metrics_by_campaign.get(campaign_id)
         if metrics:
             campaign_performance.append({
                 'campaignId': campaign_id,
@@ -171,34 +203,41 @@ def optimize_budget_allocation(total_budget, campaign_ids, optimization_goal='ma
             'cpa': campaign['cpa']
         })
     
-    # Calculate expected outcomes
-    expected_total_conversions = sum(
-        (alloc['recommendedBudget'] / campaign_performance[i]['cpa']) 
-        for i, alloc in enumerate(allocations) 
-        if campaign_performance[i]['cpa'] > 0
-    )
-    
-    expected_avg_roas = sum(
-        (alloc['weight'] / 100 * campaign_performance[i]['roas']) 
-        for i, alloc in enumerate(allocations)
-    )
-    
-    return {
+    result = {
         'optimizationGoal': optimization_goal,
         'totalBudget': total_budget,
         'allocations': allocations,
-        'expectedOutcomes': {
+        'timestamp': datetime.now().isoformat()
+    }
+    with_stale_metrics(result, metrics_by_campaign)
+    
+    if fields.wants('expectedOutcomes'):
+        # Calculate expected outcomes
+        expected_total_conversions = sum(
+            (alloc['recommendedBudget'] / campaign_performance[i]['cpa']) 
+            for i, alloc in enumerate(allocations) 
+            if campaign_performance[i]['cpa'] > 0
+        )
+        
+        expected_avg_roas = sum(
+            (alloc['weight'] / 100 * campaign_performance[i]['roas']) 
+            for i, alloc in enumerate(allocations)
+        )
+        
+        result['expectedOutcomes'] = {
             'totalConversions': round(expected_total_conversions, 0),
             'avgROAS': round(expected_avg_roas, 2),
             'estimatedRevenue': round(expected_total_conversions * 50, 2)  # Assuming $50 AOV
-        },
-        'summary': {
+        }
+    
+    if fields.wants('summary'):
+        result['summary'] = {
             'campaignsOptimized': len(allocations),
             'budgetIncreases': len([a for a in allocations if a['change'] > 0]),
             'budgetDecreases': len([a for a in allocations if a['change'] < 0])
-        },
-        'timestamp': datetime.now().isoformat()
-    }
+        }
+    
+    return result
 
 def reallocate_budget(from_campaign, to_campaign, amount):
     """Reallocate budget from one campaign to another."""
@@ -211,16 +250,15 @@ def reallocate_budget(from_campaign, to_campaign, amount):
         'timestamp': datetime.now().isoformat()
     }
 
-def get_budget_recommendations(total_budget):
+def get_budget_recommendations(total_budget, fields=None, session=None):
     """Get budget allocation recommendations across all campaigns."""
+    fields = fields or FieldSelection()
+    needed = ['allocations', 'expectedOutcomes'] if fields.wants('expectedOutcomes') else ['allocations']
     # Get all campaigns
-    all_campaigns = [
-        'goog-camp-001', 'goog-camp-002', 'goog-camp-003',
-        'meta-camp-001', 'meta-camp-002', 'meta-camp-003'
-    ]
-    
     # Optimize for maximum ROAS
-    optimization = optimize_budget_allocation(total_budget, all_campaigns, 'maximize_roas')
+    optimization = optimize_budget_allocation(
+        total_budget, KNOWN_CAMPAIGN_IDS, 'maximize_roas', fields=FieldSelection(needed), session=session
+    )
     
     # Add platform-level recommendations
     google_budget = sum(a['recommendedBudget'] for a in optimization['allocations'] if 'goog' in a['campaignId'])
@@ -239,7 +277,7 @@ def get_budget_recommendations(total_budget):
             }
         },
         'campaignAllocations': optimization['allocations'],
-        'expectedOutcomes': optimization['expectedOutcomes'],
+        'expectedOutcomes': optimization.get('expectedOutcomes'),
         'keyRecommendations': [
             'Focus budget on high-ROAS campaigns',
             'Maintain minimum spend on testing campaigns',
@@ -250,11 +288,23 @@ def get_budget_recommendations(total_budget):
     
     return recommendations
 
-def simulate_budget_scenarios(scenarios):
-    """Simulate different budget allocation scenarios."""
+def simulate_budget_scenarios(scenarios, session=None, deadline=None):
+    """
+    Simulate different budget allocation scenarios.
+    Scenarios with a campaign whose metrics were not read before
+    ``deadline`` expired are left out.
+    """
     results = []
+    # Scenarios usually share campaigns: read each one once, concurrently
+    metrics_by_campaign = fetch_campaign_metrics(
+        [campaign_id for scenario in scenarios for campaign_id in scenario.get('allocations', {})],
+        session=session,
+        deadline=deadline
+    )
     
     for scenario in scenarios:
+        if scenario_skipped(scenario, deadline):
+            continue
         scenario_name = scenario.get('name', 'Unnamed')
         total_budget = scenario.get('totalBudget', 0)
         allocations = scenario.get('allocations', {})
@@ -264,7 +314,7 @@ def simulate_budget_scenarios(scenarios):
         expected_cost = 0
         
         for campaign_id, budget in allocations.items():
-            metrics = get_campaign_metrics(campaign_id)
+            metrics = metrics_by_campaign.get(campaign_id)
             if metrics and metrics.get('cpa', 0) > 0:
                 conversions = budget / metrics['cpa']
                 expected_conversions += conversions
@@ -283,29 +333,65 @@ def simulate_budget_scenarios(scenarios):
     # Identify best scenario
     best_scenario = max(results, key=lambda x: x['expectedROAS']) if results else None
     
-    return {
+    return with_stale_metrics({
         'scenarios': results,
         'bestScenario': best_scenario['scenario'] if best_scenario else None,
         'recommendation': f"Scenario '{best_scenario['scenario']}' provides the best ROAS" if best_scenario else "No clear winner",
         'timestamp': datetime.now().isoformat()
+    }, metrics_by_campaign)
+
+def with_stale_metrics(result, metrics_by_campaign):
+    """Add the age in seconds of any stale metrics the result was computed from."""
+    stale = {
+        campaign_id: metrics['staleAgeSeconds']
+        for campaign_id, metrics in metrics_by_campaign.items()
+        if metrics and 'staleAgeSeconds' in metrics
     }
+    if stale:
+        result['staleMetrics'] = stale
+    return result
+
+def scenario_skipped(scenario, deadline):
+    """Whether a campaign of ``scenario`` was skipped at the deadline."""
+    return deadline is not None and any(deadline.was_skipped(c) for c in scenario.get('allocations', {}))
+
+def fetch_campaign_metrics(campaign_ids, session=None, deadline=None):
+    """
+    Latest metrics for each distinct campaign, looked up concurrently.
+    Campaigns not looked up before ``deadline`` expires map to None.
+    """
+    campaign_ids = list(dict.fromkeys(campaign_ids))
+    found = run_concurrently(
+        lambda campaign_id: get_campaign_metrics(campaign_id, session=session), campaign_ids, deadline=deadline
+    )
+    return dict(zip(campaign_ids, found))
 
-def get_campaign_metrics(campaign_id):
-    """Get latest metrics for a campaign from DynamoDB."""
+def get_campaign_metrics(campaign_id, refresh=False, session=None):
+    """
+    Get latest metrics for a campaign, from the warm cache, the agent
+    session's metrics digest or DynamoDB. Whatever is found is written back
+    to the session so later turns skip the query. When DynamoDB cannot be
+    read, expired cached metrics are returned with their
+    ``staleAgeSeconds``.
+    """
+    digest_key = f'metrics.{campaign_id}'
+    if not refresh:
+        cached = metrics_cache.get(campaign_id)
+        if cached is None and session is not None:
+            digest = session.get(digest_key)
+            if digest is not None:
+                cached = dict(digest, campaignId=campaign_id, budget=1000)
+                metrics_cache.set(campaign_id, cached, tags=[f'campaign:{campaign_id}'])
+        if cached is not None:
+            if session is not None and session.age(digest_key) is None:
+                session.put(digest_key, metrics_digest(cached))
+            return cached
+    
     try:
-        table = dynamodb.Table(METRICS_TABLE)
-        
         # Query for the most recent metrics
-        response = table.query(
-            KeyConditionExpression=Key('campaignId').eq(campaign_id),
-            ScanIndexForward=False,  # Descending order
-            Limit=1
-        )
-        
-        items = response.get('Items', [])
-        if items:
-            item = items[0]
-            return {
+        item = storage.table(METRICS_TABLE).latest(campaign_id)
+        if item:
+            metrics = {
                 'campaignId': campaign_id,
                 'roas': float(item.get('roas', 0)) if 'roas' in item else 0,
                 'cpa': float(item.get('cpa', 0)) if 'cpa' in item else 0,
@@ -313,61 +399,19 @@ def get_campaign_metrics(campaign_id):
                 'cost': float(item.get('cost', 0)) if 'cost' in item else 0,
                 'budget': 1000  # Default budget, should be fetched from campaign data
             }
+            metrics_cache.set(campaign_id, metrics, tags=[f'campaign:{campaign_id}'])
+            if session is not None:
+                session.put(digest_key, metrics_digest(metrics))
+            return metrics
         
         return None
         
     except Exception as e:
-        print(f"Error getting metrics: {str(e)}")
+        stale = metrics_cache.stale(campaign_id, STALE_MAX_AGE)
+        if stale is not None:
+            metrics, age = stale
+            logger.warning('serving stale metrics', campaignId=campaign_id, ageSeconds=round(age), error=str(e))
+            return dict(metrics, staleAgeSeconds=round(age))
+        if not isinstance(e, CircuitOpen):
+            logger.error('Error getting metrics', error=str(e))
         return None
-
-def get_parameter(parameters, name):
-    """Extract parameter value by name."""
-    for param in parameters:
-        if param.get('name') == name:
-            return param.get('value')
-    return None
-
-def parse_request_body(request_body):
-    """Parse request body from Bedrock Agent format."""
-    if not request_body:
-        return {}
-    content = request_body.get('content', {})
-    body_str = content.get('application/json', '')
-    if body_str:
-        try:
-            return json.loads(body_str)
-        except json.JSONDecodeError:
-            return {}
-    return {}
-
-def success_response(event, data):
-    return {
-        'messageVersion': '1.0',
-        'response': {
-            'actionGroup': event.get('actionGroup'),
-            'apiPath': event.get('apiPath'),
-            'httpMethod': event.get('httpMethod'),
-            'httpStatusCode': 200,
-            'responseBody': {
-                'application/json': {
-                    'body': json.dumps(data, default=str)
-                }
-            }
-        }
-    }
-
-def error_response(event, error_message):
-    return {
-        'messageVersion': '1.0',
-        'response': {
-            'actionGroup': event.get('actionGroup'),
-            'apiPath': event.get('apiPath'),
-            'httpMethod': event.get('httpMethod'),
-            'httpStatusCode': 400,
-            'responseBody': {
-                'application/json': {
-                    'body': json.dumps({'error': error_message})
-                }
-            }
-        }
-    }
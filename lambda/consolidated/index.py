@@ -0,0 +1,97 @@
+import importlib.util
+import json
+import os
+import time
+from datetime import datetime
+
+from agent_runtime import StructuredLogger, error_response
+
+# Directory holding the action-group handlers (lambda/ in the repo)
+FUNCTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FUNCTIONS = ['google-ads', 'meta-ads', 'analytics', 'budget-optimizer', 'storage']
+
+logger = StructuredLogger('consolidated')
+
+# Handler modules loaded in this container, by function directory
+_handlers = {}
+
+def handler(event, context):
+    """
+    Single entry point for every action group.
+    Routes each event by its actionGroup to the matching handler module,
+    so one pool of warm containers, connections and caches serves them all.
+    """
+    if event.get('source') == 'warming':
+        return warm(event, context)
+
+    function_name = function_for(event.get('actionGroup'))
+    if function_name is None:
+        logger.warning('unknown action group', actionGroup=event.get('actionGroup'))
+        return error_response(event, 'Invalid action group')
+    return load_handler(function_name).handler(event, context)
+
+def function_for(action_group):
+    """
+    Handler directory serving ``action_group``: from ACTION_GROUP_FUNCTIONS
+    (comma-separated ``group=function`` pairs), else the group name without
+    its ``-actions`` suffix (``google_ads`` and ``google-ads-actions`` both
+    map to google-ads).
+    """
+    if not action_group:
+        return None
+    configured = dict(
+        pair.split('=', 1) for pair in os.environ.get('ACTION_GROUP_FUNCTIONS', '').split(',') if '=' in pair
+    )
+    name = configured.get(action_group)
+    if name is None:
+        name = action_group
+        if name.endswith('-actions') or name.endswith('_actions'):
+            name = name[:-len('-actions')]
+        name = name.replace('_', '-')
+    return name.strip() if name.strip() in FUNCTIONS else None
+
+def load_handler(function_name):
+    """
+    The handler module of one function, imported on first use so a cold
+    start only pays for the action groups it is asked for.
+    """
+    module = _handlers.get(function_name)
+    if module is None:
+        started = time.perf_counter()
+        path = os.path.join(FUNCTIONS_DIR, function_name, 'index.py')
+        spec = importlib.util.spec_from_file_location(f"{function_name.replace('-', '_')}_index", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _handlers[function_name] = module
+        logger.info(
+            'handler loaded',
+            function=function_name,
+            importMs=round((time.perf_counter() - started) * 1000, 3),
+            loaded=list(_handlers)
+        )
+    return module
+
+def warm(event, context):
+    """
+    Handle a scheduled warming ping by loading and warming every handler
+    (or those named in the event's ``functions`` list).
+    """
+    started = time.perf_counter()
+    warmed = {}
+    for function_name in event.get('functions') or FUNCTIONS:
+        if function_name not in FUNCTIONS:
+            warmed[function_name] = {'status': 'unknown'}
+            continue
+        response = load_handler(function_name).handler(event, context)
+        warmed[function_name] = json.loads(response['body'])
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'status': 'warm',
+            'function': 'consolidated',
+            'functions': warmed,
+            'durationMs': round((time.perf_counter() - started) * 1000, 3),
+            'timestamp': datetime.now().isoformat()
+        }, default=str)
+    }
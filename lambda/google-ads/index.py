@@ -1,99 +1,113 @@
-import json
 import os
-import boto3
 from datetime import datetime, timedelta
 from decimal import Decimal
 
-s3_client = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
-secrets_client = boto3.client('secretsmanager')
+from agent_runtime import BadRequest, Router, StructuredLogger, TTLCache, invalidate, metrics_digest, profiled, storage, write_buffer
 
 BUCKET_NAME = os.environ.get('BUCKET_NAME')
 METRICS_TABLE = os.environ.get('METRICS_TABLE')
 SECRETS_ARN = os.environ.get('SECRETS_ARN')
 
+logger = StructuredLogger('google-ads')
+router = Router('google-ads', logger=logger)
+
+# Campaign catalog and latest metrics, reused by warm invocations in this
+# container; entries are tagged campaign:<id> so writes can drop them
+catalog_cache = TTLCache(int(os.environ.get('CATALOG_CACHE_TTL', '300')), max_entries=8, name='google-ads.catalog')
+metrics_cache = TTLCache(int(os.environ.get('METRICS_CACHE_TTL', '60')), max_entries=512, name='google-ads.metrics')
+
+@profiled('google-ads', logger)
 def handler(event, context):
     """
     Google Ads integration tool for the AI agent.
     Manages Google Ads campaigns: get metrics, adjust bids, update budgets.
     """
-    print(f"Received event: {json.dumps(event)}")
-    
-    # Handle warming requests (prevents cold starts)
-    if event.get('source') == 'warming':
-        return {
-            'statusCode': 200,
-            'body': json.dumps({'status': 'warm', 'timestamp': datetime.now().isoformat()})
-        }
-    
-    api_path = event.get('apiPath', '')
-    http_method = event.get('httpMethod', '')
-    parameters = event.get('parameters', [])
-    request_body = event.get('requestBody', {})
-    
-    # Handle health checks
-    if api_path == '/health':
-        return success_response(event, {
-            'status': 'healthy',
-            'timestamp': datetime.now().isoformat(),
-            'function': 'google-ads'
-        })
+    return router.dispatch(event, context)
+
+@router.route('*', '/health')
+def _health(request):
+    return {
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'function': 'google-ads'
+    }
+
+@router.preload('connections')
+def _preload_connections():
+    return storage.table(METRICS_TABLE).warm()
+
+@router.preload('catalog')
+def _preload_catalog():
+    return {'campaigns': len(cached_campaigns())}
+
+@router.route('GET', '/campaigns')
+def _campaigns(request):
+    # Reuse the catalog cached earlier in this agent session
+    catalog = request.session.get('catalog.google')
+    if catalog is None:
+        catalog = cached_campaigns()
+        request.session.put('catalog.google', catalog)
+    return {'campaigns': catalog}
+
+@router.route('GET', '/metrics')
+def _metrics(request):
+    campaign_id = request.param('campaignId')
+    if not campaign_id:
+        raise BadRequest('campaignId parameter required')
     
-    # Get API credentials (in production, use real Google Ads API)
-    # For demo, we'll simulate the API calls
+    metrics = cached_campaign_metrics(campaign_id)
+    request.session.put(f'metrics.{campaign_id}', metrics_digest(metrics))
+    return metrics
+
+@router.route('POST', '/adjust-bid', idempotent=True)
+def _adjust_bid(request):
+    campaign_id = request.body.get('campaignId')
+    bid_adjustment = request.body.get('bidAdjustment')  # percentage
     
-    # Handle GET CAMPAIGNS
-    if http_method == 'GET' and '/campaigns' in api_path:
-        campaigns = get_campaigns()
-        return success_response(event, {'campaigns': campaigns})
+    if not campaign_id or bid_adjustment is None:
+        raise BadRequest('campaignId and bidAdjustment required')
     
-    # Handle GET METRICS
-    elif http_method == 'GET' and '/metrics' in api_path:
-        campaign_id = get_parameter(parameters, 'campaignId')
-        if not campaign_id:
-            return error_response(event, 'campaignId parameter required')
-        
-        metrics = get_campaign_metrics(campaign_id)
-        return success_response(event, metrics)
+    return adjust_campaign_bid(campaign_id, bid_adjustment)
+
+@router.route('POST', '/update-budget', idempotent=True)
+def _update_budget(request):
+    campaign_id = request.body.get('campaignId')
+    new_budget = request.body.get('newBudget')
     
-    # Handle POST ADJUST BID
-    elif http_method == 'POST' and '/adjust-bid' in api_path:
-        body_data = parse_request_body(request_body)
-        campaign_id = body_data.get('campaignId')
-        bid_adjustment = body_data.get('bidAdjustment')  # percentage
-        
-        if not campaign_id or bid_adjustment is None:
-            return error_response(event, 'campaignId and bidAdjustment required')
-        
-        result = adjust_campaign_bid(campaign_id, bid_adjustment)
-        return success_response(event, result)
+    if not campaign_id or not new_budget:
+        raise BadRequest('campaignId and newBudget required')
     
-    # Handle POST UPDATE BUDGET
-    elif http_method == 'POST' and '/update-budget' in api_path:
-        body_data = parse_request_body(request_body)
-        campaign_id = body_data.get('campaignId')
-        new_budget = body_data.get('newBudget')
-        
-        if not campaign_id or not new_budget:
-            return error_response(event, 'campaignId and newBudget required')
-        
-        result = update_campaign_budget(campaign_id, new_budget)
-        return success_response(event, result)
+    request.session.invalidate('catalog.google')
+    invalidate(f'campaign:{campaign_id}')
+    return update_campaign_budget(campaign_id, new_budget)
+
+@router.route('POST', '/toggle-status', idempotent=True)
+def _toggle_status(request):
+    campaign_id = request.body.get('campaignId')
+    status = request.body.get('status')  # 'PAUSED' or 'ENABLED'
     
-    # Handle POST PAUSE/ACTIVATE
-    elif http_method == 'POST' and '/toggle-status' in api_path:
-        body_data = parse_request_body(request_body)
-        campaign_id = body_data.get('campaignId')
-        status = body_data.get('status')  # 'PAUSED' or 'ENABLED'
-        
-        if not campaign_id or not status:
-            return error_response(event, 'campaignId and status required')
-        
-        result = toggle_campaign_status(campaign_id, status)
-        return success_response(event, result)
+    if not campaign_id or not status:
+        raise BadRequest('campaignId and status required')
     
-    else:
-        return error_response(event, 'Invalid operation')
+    request.session.invalidate('catalog.google')
+    invalidate(f'campaign:{campaign_id}')
+    return toggle_campaign_status(campaign_id, status)
+
+def cached_campaigns():
+    """Campaign catalog from the container cache, fetched when missing or stale."""
+    catalog = catalog_cache.get('google')
+    if catalog is None:
+        catalog = get_campaigns()
+        catalog_cache.set('google', catalog, tags=['catalog'] + [f"campaign:{c['id']}" for c in catalog])
+    return catalog
+
+def cached_campaign_metrics(campaign_id):
+    """Latest metrics from the container cache; a miss fetches and stores them."""
+    metrics = metrics_cache.get(campaign_id)
+    if metrics is None:
+        metrics = get_campaign_metrics(campaign_id)
+        metrics_cache.set(campaign_id, metrics, tags=[f'campaign:{campaign_id}'])
+    return dict(metrics)
 
 def get_campaigns():
     """Get list of Google Ads campaigns (simulated)."""
@@ -187,9 +201,8 @@ def toggle_campaign_status(campaign_id, status):
     }
 
 def store_metrics(campaign_id, metrics):
-    """Store metrics in DynamoDB."""
+    """Queue metrics for the batched DynamoDB write made before the handler returns."""
     try:
-        table = dynamodb.Table(METRICS_TABLE)
         item = {
             'campaignId': campaign_id,
             'timestamp': int(datetime.now().timestamp()),
@@ -197,58 +210,6 @@ def store_metrics(campaign_id, metrics):
             **{k: Decimal(str(v)) if isinstance(v, (int, float)) else v 
                for k, v in metrics.items() if k not in ['campaignId', 'timestamp']}
         }
-        table.put_item(Item=item)
+        write_buffer(METRICS_TABLE).add(item)
     except Exception as e:
-        print(f"Error storing metrics: {str(e)}")
-
-def get_parameter(parameters, name):
-    """Extract parameter value by name."""
-    for param in parameters:
-        if param.get('name') == name:
-            return param.get('value')
-    return None
-
-def parse_request_body(request_body):
-    """Parse request body from Bedrock Agent format."""
-    if not request_body:
-        return {}
-    content = request_body.get('content', {})
-    body_str = content.get('application/json', '')
-    if body_str:
-        try:
-            return json.loads(body_str)
-        except json.JSONDecodeError:
-            return {}
-    return {}
-
-def success_response(event, data):
-    return {
-        'messageVersion': '1.0',
-        'response': {
-            'actionGroup': event.get('actionGroup'),
-            'apiPath': event.get('apiPath'),
-            'httpMethod': event.get('httpMethod'),
-            'httpStatusCode': 200,
-            'responseBody': {
-                'application/json': {
-                    'body': json.dumps(data, default=str)
-                }
-            }
-        }
-    }
-
-def error_response(event, error_message):
-    return {
-        'messageVersion': '1.0',
-        'response': {
-            'actionGroup': event.get('actionGroup'),
-            'apiPath': event.get('apiPath'),
-            'httpMethod': event.get('httpMethod'),
-            'httpStatusCode': 400,
-            'responseBody': {
-                'application/json': {
-                    'body': json.dumps({'error': error_message})
-                }
-            }
-        }
-    }
+        logger.error('Error storing metrics', error=str(e))
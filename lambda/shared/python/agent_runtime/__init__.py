@@ -0,0 +1,65 @@
+"""
+Shared runtime for the Bedrock action-group Lambda functions.
+Packaged as a Lambda layer so every function gets the same dispatch,
+parsing and response plumbing.
+"""
+from .breaker import CircuitBreaker, CircuitOpen, breaker_stats
+from .cache import TTLCache, cache_stats, invalidate
+from .clients import ClientRegistry, clients
+from .concurrency import gather_bounded, run_concurrently
+from .deadline import Deadline, mark_partial
+from .encoding import ResponseEncoder, encode_body
+from .fields import FieldSelection
+from .idempotency import IdempotencyStore, RequestInProgress
+from .logs import StructuredLogger
+from .metrics import InvocationMetrics, metrics
+from .pagination import InvalidCursor, paginate, resume_indexes
+from .profiling import profiled
+from .routing import ActionRequest, BadRequest, Router
+from .responses import error_response, success_response
+from .session import SessionCache, metrics_digest
+from .storage import ObjectNotFound, StorageRegistry, storage
+from .tracing import CallTracer, tracer
+from .writes import WriteBuffer, flush_writes, write_buffer
+
+__all__ = [
+    'ActionRequest',
+    'BadRequest',
+    'CallTracer',
+    'CircuitBreaker',
+    'CircuitOpen',
+    'ClientRegistry',
+    'Deadline',
+    'FieldSelection',
+    'IdempotencyStore',
+    'InvalidCursor',
+    'InvocationMetrics',
+    'ObjectNotFound',
+    'RequestInProgress',
+    'ResponseEncoder',
+    'Router',
+    'SessionCache',
+    'StorageRegistry',
+    'StructuredLogger',
+    'TTLCache',
+    'WriteBuffer',
+    'breaker_stats',
+    'cache_stats',
+    'clients',
+    'encode_body',
+    'error_response',
+    'flush_writes',
+    'gather_bounded',
+    'invalidate',
+    'mark_partial',
+    'metrics',
+    'metrics_digest',
+    'paginate',
+    'profiled',
+    'resume_indexes',
+    'run_concurrently',
+    'storage',
+    'success_response',
+    'tracer',
+    'write_buffer',
+]
@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .logs import StructuredLogger
+from .metrics import metrics
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Named breakers in this container, reported by ``breaker_stats``
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+_logger = StructuredLogger('circuit-breaker')
+
+class CircuitOpen(Exception):
+    """The breaker is open: the call was not made."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'{name} is unavailable; retry in {retry_after:.0f} s')
+        self.name = name
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Per-container circuit breaker around calls to one dependency.
+
+    The outcome of the last ``window`` calls is kept. Once at least
+    ``min_calls`` are recorded and the share that failed reaches
+    ``error_rate``, or the share slower than ``slow_ms`` reaches
+    ``slow_rate``, the breaker opens: calls fail immediately with
+    ``CircuitOpen`` instead of waiting out timeouts and retries. After
+    ``cooldown_seconds`` one trial call is let through (half open); the
+    breaker closes if it is healthy and opens again otherwise.
+
+    State changes are logged and counted in the invocation metrics
+    (BreakerOpened, BreakerClosed); rejected calls are counted as
+    BreakerRejected.
+
+    Configured through the environment:
+      BREAKER_ENABLED      set to ``false`` to let every call through
+      BREAKER_WINDOW       calls kept for the rates (default 20)
+      BREAKER_MIN_CALLS    calls needed before the breaker can open (default 5)
+      BREAKER_ERROR_RATE   failure share that opens the breaker (default 0.5)
+      BREAKER_SLOW_MS      latency above which a call counts as slow (default 2000)
+      BREAKER_SLOW_RATE    slow share that opens the breaker (default 0.5)
+      BREAKER_COOLDOWN     seconds the breaker stays open (default 30)
+    """
+
+    def __init__(self, name, window=None, min_calls=None, error_rate=None, slow_ms=None, slow_rate=None,
+                 cooldown_seconds=None, enabled=None, clock=time.monotonic):
+        self.name = name
+        self.window = window or int(os.environ.get('BREAKER_WINDOW', '20'))
+        self.min_calls = min_calls or int(os.environ.get('BREAKER_MIN_CALLS', '5'))
+        self.error_rate = error_rate or float(os.environ.get('BREAKER_ERROR_RATE', '0.5'))
+        self.slow_ms = slow_ms or float(os.environ.get('BREAKER_SLOW_MS', '2000'))
+        self.slow_rate = slow_rate or float(os.environ.get('BREAKER_SLOW_RATE', '0.5'))
+        if cooldown_seconds is None:
+            cooldown_seconds = float(os.environ.get('BREAKER_COOLDOWN', '30'))
+        self.cooldown_seconds = cooldown_seconds
+        if enabled is None:
+            enabled = os.environ.get('BREAKER_ENABLED', 'true').lower() != 'false'
+        self.enabled = enabled
+        self._clock = clock
+        self._outcomes = deque(maxlen=self.window)
+        self._state = CLOSED
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    @contextmanager
+    def guard(self):
+        """
+        Run the enclosed call through the breaker: raises ``CircuitOpen``
+        up front when it is open, otherwise records the call's latency and
+        whether it raised.
+        """
+        if not self.enabled:
+            yield
+            return
+        trial = self._admit()
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self._record(False, (time.perf_counter() - started) * 1000, trial)
+            raise
+        self._record(True, (time.perf_counter() - started) * 1000, trial)
+
+    def stats(self):
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                'state': self._state,
+                'calls': calls,
+                'failures': sum(1 for ok, _ in self._outcomes if not ok),
+                'slow': sum(1 for _, slow in self._outcomes if slow),
+                'opened': self.opened,
+                'rejected': self.rejected
+            }
+
+    def _admit(self):
+        # Whether the call is the half-open trial; raises when it may not run
+        with self._lock:
+            if self._state == CLOSED:
+                return False
+            waited = self._clock() - self._opened_at
+            if self._state == OPEN and waited >= self.cooldown_seconds:
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            retry_after = max(self.cooldown_seconds - waited, 0)
+        metrics.add('BreakerRejected')
+        raise CircuitOpen(self.name, retry_after)
+
+    def _record(self, ok, elapsed_ms, trial):
+        slow = elapsed_ms > self.slow_ms
+        with self._lock:
+            if trial:
+                self._trial_running = False
+                if ok and not slow:
+                    self._outcomes.clear()
+                    self._transition(CLOSED)
+                else:
+                    self._open()
+                return
+            self._outcomes.append((ok, slow))
+            if self._state != CLOSED or len(self._outcomes) < self.min_calls:
+                return
+            calls = len(self._outcomes)
+            failures = sum(1 for outcome, _ in self._outcomes if not outcome)
+            slow_calls = sum(1 for _, was_slow in self._outcomes if was_slow)
+            if failures / calls >= self.error_rate or slow_calls / calls >= self.slow_rate:
+                self._open()
+
+    def _open(self):
+        self._opened_at = self._clock()
+        self.opened += 1
+        self._transition(OPEN)
+
+    def _transition(self, state):
+        previous, self._state = self._state, state
+        if state == OPEN:
+            metrics.add('BreakerOpened')
+        elif state == CLOSED:
+            metrics.add('BreakerClosed')
+        _logger.warning('circuit breaker state change', breaker=self.name, previous=previous, state=state)
+
+def breaker(name):
+    """The container's breaker for the dependency ``name``, created on first use."""
+    with _breakers_lock:
+        found = _breakers.get(name)
+        if found is None:
+            found = _breakers[name] = CircuitBreaker(name)
+        return found
+
+def breaker_stats():
+    """State and counters of every breaker in the container, by name."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.stats() for b in breakers}
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 1024
+
+# Named caches in this container, reported by ``cache_stats``
+_caches = []
+_caches_lock = threading.Lock()
+
+class TTLCache:
+    """
+    Per-container key/value cache whose entries expire after ``ttl_seconds``.
+    Lives in module globals, so entries survive across warm invocations.
+
+    At most ``max_entries`` are kept; the least recently used entry is
+    evicted first. Entries can be tagged when set (e.g. ``campaign:<id>``)
+    so a write can drop everything derived from what it changed with
+    ``invalidate_tag``, or across every cache in the container with the
+    module-level ``invalidate``. Caches given a ``name`` count hits and
+    misses, which the router adds to each route log line. Expired entries
+    stay until they are evicted, so ``stale`` can still serve them while
+    their source is unavailable.
+    """
+
+    def __init__(self, ttl_seconds, max_entries=DEFAULT_MAX_ENTRIES, name=None, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.name = name
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if name:
+            with _caches_lock:
+                _caches.append(self)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= self._clock():
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, tags=(), ttl_seconds=None):
+        """Store ``value``; ``ttl_seconds`` overrides the cache's TTL for this entry."""
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl_seconds <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            self._entries[key] = (value, now + ttl_seconds, frozenset(tags), now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stale(self, key, max_age=None):
+        """
+        ``(value, age_seconds)`` of the entry under ``key``, expired or not,
+        or None when there is none (or it is older than ``max_age``).
+        Not counted as a hit or miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            age = self._clock() - entry[3]
+            if max_age is not None and age > max_age:
+                return None
+            return entry[0], age
+
+    def invalidate(self, key=None):
+        """Drop one entry, or every entry when ``key`` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def invalidate_tag(self, tag):
+        """Drop every entry set with ``tag``; returns how many were dropped."""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if tag in entry[2]]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries)
+            }
+
+    def __contains__(self, key):
+        """Whether ``key`` holds a fresh entry; not counted as a hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > self._clock()
+
+    def __len__(self):
+        return len(self._entries)
+
+def invalidate(tag):
+    """Drop entries tagged ``tag`` from every named cache in the container."""
+    with _caches_lock:
+        caches = list(_caches)
+    return sum(cache.invalidate_tag(tag) for cache in caches)
+
+def cache_stats():
+    """Counters of every named cache in the container, by name."""
+    with _caches_lock:
+        caches = list(_caches)
+    return {cache.name: cache.stats() for cache in caches}
@@ -0,0 +1,174 @@
+import os
+import threading
+
+from .metrics import metrics
+from .tracing import install_hooks
+
+# Per-service connection settings. Read timeouts stay well inside the
+# Bedrock action-group budget; pools are sized for /batch and other fan-out.
+SERVICE_CONFIG = {
+    'dynamodb': {'connect_timeout': 2, 'read_timeout': 5, 'max_attempts': 5, 'max_pool_connections': 32},
+    's3': {'connect_timeout': 2, 'read_timeout': 10, 'max_attempts': 4, 'max_pool_connections': 16},
+}
+DEFAULT_CONFIG = {'connect_timeout': 2, 'read_timeout': 10, 'max_attempts': 3, 'max_pool_connections': 10}
+
+# Error codes counted as throttling, whichever service returns them
+THROTTLE_CODES = frozenset({
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'RequestLimitExceeded',
+    'SlowDown',
+})
+
+class ClientRegistry:
+    """
+    Per-container registry of AWS clients, resources and DynamoDB tables.
+
+    Nothing is created (and boto3 is not imported) until a route first asks
+    for it; after that the same object is reused across warm invocations.
+    Every call made through a created client is traced and counted in the
+    invocation metrics.
+
+    Clients are built with ``client_config``: adaptive retries, TCP
+    keep-alive and per-service pool size and timeouts. Retries and
+    throttled attempts are counted per service for the container's
+    lifetime (``counters``).
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._resources = {}
+        self._tables = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def client(self, service_name):
+        """Low-level boto3 client for ``service_name``."""
+        client = self._clients.get(service_name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(service_name)
+                if client is None:
+                    client = _boto3().client(service_name, config=client_config(service_name))
+                    self._instrument(client, service_name)
+                    self._clients[service_name] = client
+        return client
+
+    def resource(self, service_name):
+        """boto3 service resource for ``service_name``."""
+        resource = self._resources.get(service_name)
+        if resource is None:
+            with self._lock:
+                resource = self._resources.get(service_name)
+                if resource is None:
+                    resource = _boto3().resource(service_name, config=client_config(service_name))
+                    self._instrument(resource.meta.client, service_name)
+                    self._resources[service_name] = resource
+        return resource
+
+    def table(self, table_name):
+        """Cached ``dynamodb.Table`` handle for ``table_name``."""
+        table = self._tables.get(table_name)
+        if table is None:
+            table = self.resource('dynamodb').Table(table_name)
+            self._tables[table_name] = table
+        return table
+
+    def warm_table(self, table_name):
+        """
+        Open the DynamoDB connection and load the table's metadata
+        (DescribeTable) so the first real query skips that work.
+        """
+        table = self.table(table_name)
+        table.load()
+        return {'table': table_name, 'status': table.table_status}
+
+    def set_client(self, service_name, client):
+        """Install a client ahead of first use (local harnesses and benchmarks)."""
+        self._clients[service_name] = client
+
+    def set_resource(self, service_name, resource):
+        """Install a resource ahead of first use; cached tables are dropped."""
+        self._resources[service_name] = resource
+        if service_name == 'dynamodb':
+            self._tables.clear()
+
+    def counters(self):
+        """Calls, retries and throttled attempts per service in this container."""
+        with self._lock:
+            return {service: dict(counts) for service, counts in self._counters.items()}
+
+    def _instrument(self, client, service_name):
+        counts = self._counters.setdefault(service_name, {'calls': 0, 'retries': 0, 'throttles': 0})
+
+        def count(key, value=1):
+            with self._lock:
+                counts[key] += value
+
+        def on_call(service_name, parsed):
+            metrics.record_call(service_name, parsed)
+            retries = ((parsed or {}).get('ResponseMetadata') or {}).get('RetryAttempts', 0)
+            count('calls')
+            if retries:
+                count('retries', retries)
+                metrics.add('Retries', retries)
+
+        def needs_retry(response=None, **kwargs):
+            # Fired once per attempt; response is (http_response, parsed) or None
+            parsed = response[1] if response else {}
+            if (parsed.get('Error') or {}).get('Code') in THROTTLE_CODES:
+                count('throttles')
+                metrics.add('Throttles')
+
+        install_hooks(client, service_name, on_call=on_call)
+        client.meta.events.register('needs-retry', needs_retry)
+
+    def created(self):
+        """Names of the clients and resources created in this container."""
+        return {
+            'clients': sorted(self._clients),
+            'resources': sorted(self._resources),
+            'tables': sorted(self._tables)
+        }
+
+    def reset(self):
+        with self._lock:
+            self._clients.clear()
+            self._resources.clear()
+            self._tables.clear()
+            self._counters.clear()
+
+def client_config(service_name):
+    """
+    botocore Config for ``service_name``. Each setting can be overridden for
+    every service through the environment (AWS_CONNECT_TIMEOUT,
+    AWS_READ_TIMEOUT, AWS_MAX_ATTEMPTS, AWS_MAX_POOL_CONNECTIONS) or for one
+    service with the service name inserted, e.g. AWS_DYNAMODB_READ_TIMEOUT.
+    """
+    from botocore.config import Config
+
+    settings = dict(DEFAULT_CONFIG, **SERVICE_CONFIG.get(service_name, {}))
+    for name in settings:
+        override = (
+            os.environ.get(f'AWS_{service_name.upper()}_{name.upper()}')
+            or os.environ.get(f'AWS_{name.upper()}')
+        )
+        if override:
+            settings[name] = float(override) if name.endswith('timeout') else int(override)
+    return Config(
+        connect_timeout=settings['connect_timeout'],
+        read_timeout=settings['read_timeout'],
+        max_pool_connections=settings['max_pool_connections'],
+        retries={'mode': 'adaptive', 'max_attempts': settings['max_attempts']},
+        tcp_keepalive=True
+    )
+
+def _boto3():
+    import boto3
+    return boto3
+
+clients = ClientRegistry()
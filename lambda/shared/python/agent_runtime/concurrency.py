@@ -0,0 +1,70 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_IO_CONCURRENCY = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def io_concurrency():
+    """Blocking AWS calls allowed in flight at once (IO_CONCURRENCY, default 8)."""
+    try:
+        return max(1, int(os.environ.get('IO_CONCURRENCY', DEFAULT_IO_CONCURRENCY)))
+    except ValueError:
+        return DEFAULT_IO_CONCURRENCY
+
+async def gather_bounded(func, items, limit=None, deadline=None):
+    """
+    Await ``func(item)`` for every item, each in a worker thread, with at
+    most ``limit`` running at once. Results come back in the order of
+    ``items``; the first exception raised is propagated. Items not started
+    before ``deadline`` expires are skipped and their result is None.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    executor = _shared_executor()
+    semaphore = asyncio.Semaphore(limit or io_concurrency())
+
+    async def run(item):
+        async with semaphore:
+            if deadline is not None and deadline.expired():
+                deadline.skip(item)
+                return None
+            return await loop.run_in_executor(executor, func, item)
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+def run_concurrently(func, items, limit=None, deadline=None):
+    """
+    Synchronous entry point for ``gather_bounded``, for use inside the
+    Lambda handlers. boto3 calls block, so each one runs in a worker
+    thread while the event loop bounds how many are in flight; a loop over
+    campaigns then takes about as long as its slowest campaign rather
+    than the sum of all of them. Single items and ``limit=1`` run inline.
+    """
+    items = list(items)
+    limit = limit or io_concurrency()
+    if len(items) <= 1 or limit == 1:
+        return [_run_inline(func, item, deadline) for item in items]
+    # asyncio costs tens of milliseconds to import, so only the functions
+    # that fan out pay for it, and only on their first fan-out
+    import asyncio
+
+    return asyncio.run(gather_bounded(func, items, limit, deadline))
+
+def _run_inline(func, item, deadline):
+    if deadline is not None and deadline.expired():
+        deadline.skip(item)
+        return None
+    return func(item)
+
+def _shared_executor():
+    # One pool per container, reused by warm invocations; sized to the
+    # concurrency limit, which the client connection pools already cover
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=io_concurrency(), thread_name_prefix='agent-io')
+        return _executor
@@ -0,0 +1,63 @@
+import os
+import threading
+
+from .metrics import metrics
+from .pagination import encode_continuation
+
+DEFAULT_RESERVE_MS = 2000
+
+class Deadline:
+    """
+    Time budget of one invocation, read from the Lambda context.
+
+    Per-campaign work checks ``expired`` before it starts: once less than
+    ``reserve_ms`` is left (DEADLINE_RESERVE_MS, default 2000), new work is
+    skipped so the handler still has time to build and return what it has
+    instead of being killed by the function timeout. Skipped items are
+    collected in ``skipped`` and counted in the DeadlineSkipped metric;
+    routes report them with ``mark_partial``. Without a context (local
+    calls) the deadline never expires.
+    """
+
+    def __init__(self, context=None, reserve_ms=None):
+        self.context = context
+        if reserve_ms is None:
+            reserve_ms = int(os.environ.get('DEADLINE_RESERVE_MS', DEFAULT_RESERVE_MS))
+        self.reserve_ms = reserve_ms
+        self.skipped = []
+        self._lock = threading.Lock()
+
+    def remaining_ms(self):
+        """Milliseconds left for new work, or None when there is no deadline."""
+        remaining = getattr(self.context, 'get_remaining_time_in_millis', None)
+        if remaining is None:
+            return None
+        return remaining() - self.reserve_ms
+
+    def expired(self):
+        remaining = self.remaining_ms()
+        return remaining is not None and remaining <= 0
+
+    def skip(self, item):
+        """Record ``item`` as not started because the deadline passed."""
+        with self._lock:
+            self.skipped.append(item)
+        metrics.add('DeadlineSkipped')
+
+    def was_skipped(self, item):
+        with self._lock:
+            return item in self.skipped
+
+def mark_partial(data, request, pending):
+    """
+    Flag ``data`` as partial when ``pending`` (indexes into the request's
+    item list) is not empty. The ``continuationToken`` it adds resumes the
+    same request with only the pending items.
+    """
+    if not pending:
+        return data
+    data['partial'] = True
+    data['pendingCount'] = len(pending)
+    data['continuationToken'] = encode_continuation(pending, request)
+    metrics.add('PartialResponses')
+    return data
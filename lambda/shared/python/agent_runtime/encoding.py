@@ -0,0 +1,43 @@
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+def _decimal_places():
+    value = os.environ.get('RESPONSE_DECIMAL_PLACES')
+    return int(value) if value else None
+
+class ResponseEncoder(json.JSONEncoder):
+    """
+    JSON encoder for action-group response bodies.
+
+    DynamoDB Decimals and datetimes are converted in ``default``, which the
+    C encoder only calls for those values, so items straight from a table
+    query can be returned without a float(Decimal) pass beforehand.
+    When ``decimal_places`` is set, Decimals are rounded as they are encoded.
+
+    Response payloads are freshly built trees, so the circular-reference
+    bookkeeping is off by default.
+    """
+
+    def __init__(self, decimal_places=None, **kwargs):
+        kwargs.setdefault('check_circular', False)
+        super().__init__(**kwargs)
+        self.decimal_places = decimal_places
+
+    def default(self, o):
+        if o.__class__ is Decimal or isinstance(o, Decimal):
+            if self.decimal_places is None:
+                return float(o)
+            return round(float(o), self.decimal_places)
+        if isinstance(o, (datetime, date)):
+            return o.isoformat()
+        if isinstance(o, (set, frozenset)):
+            return list(o)
+        return str(o)
+
+_encoder = ResponseEncoder(decimal_places=_decimal_places())
+
+def encode_body(data):
+    """Serialize response data with the shared ResponseEncoder."""
+    return _encoder.encode(data)
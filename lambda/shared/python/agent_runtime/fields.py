@@ -0,0 +1,101 @@
+FIELDS_KEY = 'fields'
+
+# Response bookkeeping kept regardless of the selection; a partial
+# response must keep what tells the caller it is partial and how to resume
+ALWAYS_INCLUDED = ('pagination', 'queryStats', 'partial', 'pendingCount', 'continuationToken')
+
+# Labels on data served from a stale cache, kept on every projected object
+STALE_LABELS = ('stale', 'staleAgeSeconds', 'staleMetrics')
+
+class FieldSelection:
+    """
+    The response fields a caller asked for with ``fields``.
+
+    Paths are dotted (``aggregateMetrics.roas``) and apply to every element
+    of a list they pass through. Selecting a field selects everything
+    beneath it; an empty selection selects the whole response. Stale-data
+    labels (``STALE_LABELS``) are kept on every object that is projected,
+    so fallback data is never served unlabeled. Routes ask
+    ``wants`` before computing a section so unrequested sections are never
+    built, and the router trims whatever is left with ``project``.
+    """
+
+    __slots__ = ('tree',)
+
+    def __init__(self, paths=None):
+        self.tree = None
+        for path in paths or ():
+            parts = [part for part in path.strip().split('.') if part]
+            if not parts:
+                continue
+            if self.tree is None:
+                self.tree = {}
+            node = self.tree
+            for part in parts[:-1]:
+                child = node.setdefault(part, {})
+                if child is None:
+                    break
+                node = child
+            else:
+                node[parts[-1]] = None
+
+    @classmethod
+    def from_request(cls, request):
+        """Selection from the body's ``fields`` list/string, else the query parameter."""
+        value = request.body.get(FIELDS_KEY)
+        if value is None:
+            value = request.param(FIELDS_KEY)
+        if isinstance(value, str):
+            value = value.split(',')
+        if not isinstance(value, list):
+            return cls()
+        return cls(str(path) for path in value)
+
+    @property
+    def everything(self):
+        return self.tree is None
+
+    def wants(self, *path):
+        """Whether any part of the field at ``path`` was selected."""
+        node = self.tree
+        for part in path:
+            if node is None:
+                return True
+            if part not in node:
+                return False
+            node = node[part]
+        return True
+
+    def child(self, *path):
+        """The selection beneath ``path``, for passing to nested computations."""
+        node = self.tree
+        for part in path:
+            if node is None:
+                break
+            node = node.get(part, {})
+        selection = FieldSelection()
+        selection.tree = node
+        return selection
+
+    def project(self, data):
+        """Copy of ``data`` reduced to the selected fields."""
+        if self.tree is None or not isinstance(data, dict):
+            return data
+        projected = _project(data, self.tree)
+        for key in ALWAYS_INCLUDED:
+            if key in data:
+                projected[key] = data[key]
+        return projected
+
+def _project(data, tree):
+    if tree is None:
+        return data
+    if isinstance(data, dict):
+        return {
+            key: _project(value, tree[key]) if key in tree else value
+            for key, value in data.items()
+            if key in tree or key in STALE_LABELS
+        }
+    if isinstance(data, list):
+        return [_project(item, tree) for item in data]
+    return data
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+
+from .cache import TTLCache
+from .encoding import encode_body
+from .fields import FIELDS_KEY
+from .metrics import metrics
+from .routing import BadRequest
+from .storage import storage
+
+IDEMPOTENCY_KEY = 'idempotencyKey'
+
+IN_PROGRESS = 'IN_PROGRESS'
+COMPLETED = 'COMPLETED'
+
+# Lease of an in-progress claim when the context gives no remaining time
+DEFAULT_LEASE_SECONDS = 60
+
+class RequestInProgress(BadRequest):
+    """An identical request is still running; the retry should wait for it."""
+
+class IdempotencyStore:
+    """
+    Runs mutation routes at most once per idempotency key.
+
+    Bedrock retries an action-group call after a timeout with the same
+    event, so a route can be asked to do its work twice. The key is the
+    request's ``idempotencyKey`` (body or query parameter) or, when absent,
+    a hash of the session, the user's input text, the route, its
+    parameters and body, which is identical for a retry. The first request
+    claims the key with a conditional write to the idempotency table and
+    stores its result there when it completes; a retry gets the stored
+    result back without repeating the work. Results are also kept in a
+    warm-container cache, so a retry landing on the same container skips
+    the table read. Failed requests release their key so they can be
+    retried. If the table is unreachable, requests run unprotected rather
+    than fail. Operations of a ``/batch`` request are keyed by their
+    position as well, so repeating an operation within a batch runs it
+    again.
+
+    A claim is only a lease: its TTL is the invocation's remaining time,
+    so a claim left behind by an invocation the function timeout killed
+    expires with it and the retry takes the key over. Implicit keys are
+    remembered only for the retry window, so repeating the same command
+    later in the session runs it again; explicit keys for the full TTL.
+
+    Configured through the environment:
+      IDEMPOTENCY_TABLE          DynamoDB table keyed by ``idempotencyKey`` with
+                                 TTL on ``ttl`` (unset: warm-container cache only)
+      IDEMPOTENCY_TTL            seconds an explicit key is remembered (default 3600)
+      IDEMPOTENCY_RETRY_WINDOW   seconds an implicit key is remembered (default 120)
+    """
+
+    def __init__(self, function_name, logger, table_name=None, ttl_seconds=None, retry_window_seconds=None):
+        self.function_name = function_name
+        self.logger = logger
+        self.table_name = table_name if table_name is not None else os.environ.get('IDEMPOTENCY_TABLE')
+        if ttl_seconds is None:
+            ttl_seconds = int(os.environ.get('IDEMPOTENCY_TTL', '3600'))
+        self.ttl_seconds = ttl_seconds
+        if retry_window_seconds is None:
+            retry_window_seconds = int(os.environ.get('IDEMPOTENCY_RETRY_WINDOW', '120'))
+        self.retry_window_seconds = min(retry_window_seconds, ttl_seconds)
+        self.cache = TTLCache(ttl_seconds, max_entries=256, name=f'{function_name}.idempotency')
+        self.requests = 0
+        self.duplicates = 0
+        self._lock = threading.Lock()
+
+    def key(self, request):
+        explicit = self._explicit_key(request)
+        route = f'{request.http_method.upper()} {request.api_path}'
+        if request.batch_index is not None:
+            # Identical operations in one batch are separate requests, while
+            # a retried batch repeats each operation at the same index
+            route = f'{route}#batch{request.batch_index}'
+        if explicit:
+            return f'{self.function_name}#{route}#{explicit}'
+        params = {k: v for k, v in request.params.items() if k not in (IDEMPOTENCY_KEY, FIELDS_KEY)}
+        body = {k: v for k, v in request.body.items() if k not in (IDEMPOTENCY_KEY, FIELDS_KEY)}
+        fingerprint = json.dumps(
+            [request.event.get('sessionId'), request.event.get('inputText'), params, body],
+            sort_keys=True,
+            default=str
+        )
+        return f'{self.function_name}#{route}#{hashlib.sha256(fingerprint.encode()).hexdigest()[:32]}'
+
+    def run(self, request, work):
+        """Result of ``work()`` for the request's key, running it only the first time."""
+        key = self.key(request)
+        ttl_seconds = self.ttl_seconds if self._explicit_key(request) else self.retry_window_seconds
+        self._count('IdempotentRequests')
+
+        stored = self.cache.get(key)
+        if stored is not None:
+            return self._replay(key, stored, 'cache')
+
+        table = self._table()
+        if table is not None:
+            stored = self._claim(table, key, self._lease_seconds(request))
+            if stored is not None:
+                return self._replay(key, stored, 'table')
+
+        try:
+            result = work()
+        except Exception:
+            self._release(table, key)
+            raise
+
+        body = encode_body(result)
+        self.cache.set(key, body, ttl_seconds=ttl_seconds)
+        if table is not None:
+            try:
+                table.put(self._record(key, COMPLETED, ttl_seconds, result=body))
+            except Exception as e:
+                self.logger.warning('idempotency record not saved', key=key, error=str(e))
+        return result
+
+    def stats(self):
+        """Requests seen and duplicates suppressed in this container."""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'duplicates': self.duplicates,
+                'suppressionRate': round(self.duplicates / self.requests, 4) if self.requests else 0.0
+            }
+
+    def _claim(self, table, key, lease_seconds):
+        """
+        Claim ``key`` for ``lease_seconds``; returns the stored result when
+        it already completed. An expired claim counts as absent, so
+        ``put_if_absent`` takes it over.
+        """
+        try:
+            if table.put_if_absent(self._record(key, IN_PROGRESS, lease_seconds)):
+                return None
+            record = table.get(key)
+        except Exception as e:
+            self.logger.warning('idempotency table unavailable', key=key, error=str(e))
+            return None
+        if record is None:
+            # Released by a failed attempt between the two calls
+            return None
+        if record.get('status') == COMPLETED:
+            self.cache.set(key, record['result'], ttl_seconds=max(int(record['ttl']) - time.time(), 0))
+            return record['result']
+        raise RequestInProgress('An identical request is still in progress; retry shortly')
+
+    def _release(self, table, key):
+        if table is None:
+            return
+        try:
+            table.delete(key)
+        except Exception as e:
+            self.logger.warning('idempotency key not released', key=key, error=str(e))
+
+    def _replay(self, key, stored, source):
+        self._count('DuplicatesSuppressed')
+        self.logger.info('duplicate suppressed', key=key, source=source, **self.stats())
+        return json.loads(stored)
+
+    def _lease_seconds(self, request):
+        # The claim outlives the invocation by at most a second
+        remaining = getattr(request.context, 'get_remaining_time_in_millis', None)
+        if remaining is None:
+            return DEFAULT_LEASE_SECONDS
+        return math.ceil(remaining() / 1000) + 1
+
+    def _explicit_key(self, request):
+        return request.body.get(IDEMPOTENCY_KEY) or request.param(IDEMPOTENCY_KEY)
+
+    def _record(self, key, status, ttl_seconds, result=None):
+        record = {
+            IDEMPOTENCY_KEY: key,
+            'status': status,
+            'ttl': int(time.time()) + ttl_seconds
+        }
+        if result is not None:
+            record['result'] = result
+        return record
+
+    def _table(self):
+        if not self.table_name:
+            return None
+        return storage.table(self.table_name, partition_key=IDEMPOTENCY_KEY, sort_key=None, ttl_attribute='ttl')
+
+    def _count(self, metric):
+        with self._lock:
+            if metric == 'IdempotentRequests':
+                self.requests += 1
+            else:
+                self.duplicates += 1
+        metrics.add(metric)
@@ -0,0 +1,102 @@
+import json
+import os
+import random
+import sys
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+DEFAULT_EVENT_FIELDS = ('actionGroup', 'apiPath', 'httpMethod', 'sessionId')
+
+class StructuredLogger:
+    """
+    JSON-lines logger for the action-group functions.
+
+    Records are only built and serialized when their level is enabled.
+    DEBUG records are additionally sampled per invocation, and incoming
+    events are reduced to an allow-list of fields before they are logged.
+
+    Configured through the environment:
+      LOG_LEVEL               minimum level (default INFO)
+      LOG_SAMPLE_RATE         fraction of invocations that emit DEBUG records (default 0)
+      LOG_ROUTE_SAMPLE_RATE   fraction of successful route summaries to emit (default 1)
+      LOG_EVENT_FIELDS        comma-separated event fields to log at DEBUG
+    """
+
+    def __init__(self, name, level=None, sample_rate=None, route_sample_rate=None,
+                 event_fields=None, stream=None):
+        self.name = name
+        self.level = LEVELS.get((level or os.environ.get('LOG_LEVEL', 'INFO')).upper(), LEVELS['INFO'])
+        self.sample_rate = _rate(sample_rate, 'LOG_SAMPLE_RATE', 0.0)
+        self.route_sample_rate = _rate(route_sample_rate, 'LOG_ROUTE_SAMPLE_RATE', 1.0)
+        if event_fields is None:
+            configured = os.environ.get('LOG_EVENT_FIELDS')
+            event_fields = configured.split(',') if configured else DEFAULT_EVENT_FIELDS
+        self.event_fields = tuple(field.strip() for field in event_fields if field.strip())
+        self.stream = stream
+        self.sampled = False
+        self.request_id = None
+
+    def start_invocation(self, context=None):
+        """Make the per-invocation sampling decision and bind the request id."""
+        self.sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        self.request_id = getattr(context, 'aws_request_id', None)
+
+    def enabled(self, level):
+        """Whether a record at ``level`` would be written."""
+        level_no = LEVELS[level]
+        if level_no < self.level:
+            return False
+        return level_no > LEVELS['DEBUG'] or self.sampled
+
+    def log(self, level, message, **fields):
+        if not self.enabled(level):
+            return
+        record = {'level': level, 'logger': self.name, 'msg': message}
+        if self.request_id:
+            record['requestId'] = self.request_id
+        record.update(fields)
+        print(json.dumps(record, default=str), file=self.stream or sys.stdout)
+
+    def debug(self, message, **fields):
+        self.log('DEBUG', message, **fields)
+
+    def info(self, message, **fields):
+        self.log('INFO', message, **fields)
+
+    def warning(self, message, **fields):
+        self.log('WARNING', message, **fields)
+
+    def error(self, message, **fields):
+        self.log('ERROR', message, **fields)
+
+    def event(self, event):
+        """Log the allow-listed fields of an incoming event at DEBUG."""
+        if not self.enabled('DEBUG'):
+            return
+        self.debug('event', event={
+            field: event[field] for field in self.event_fields if field in event
+        })
+
+    def route_summary(self, route, status_code, latency_ms, request_bytes, response_bytes, cache=None):
+        """One compact line per routed invocation; failures are never sampled out."""
+        if status_code < 400 and self.route_sample_rate < 1.0 and random.random() >= self.route_sample_rate:
+            return
+        fields = {'cache': cache} if cache else {}
+        self.log(
+            'INFO' if status_code < 400 else 'WARNING',
+            'route',
+            route=route,
+            status=status_code,
+            latencyMs=round(latency_ms, 3),
+            requestBytes=request_bytes,
+            responseBytes=response_bytes,
+            **fields
+        )
+
+def _rate(value, env_name, default):
+    if value is None:
+        value = os.environ.get(env_name, default)
+    try:
+        return min(max(float(value), 0.0), 1.0)
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,119 @@
+import json
+import os
+import sys
+import threading
+import time
+
+DEFAULT_NAMESPACE = 'AdOptimizerAgent'
+
+# Metrics every record declares, even when zero
+CORE_METRICS = ('Latency', 'DynamoDBCalls', 'S3Calls', 'ItemsRead', 'ResponseBytes')
+
+# Metric name -> CloudWatch unit, in the order they appear in each record
+METRIC_UNITS = {
+    'Latency': 'Milliseconds',
+    'DynamoDBCalls': 'Count',
+    'S3Calls': 'Count',
+    'ItemsRead': 'Count',
+    'ResponseBytes': 'Bytes',
+    'Retries': 'Count',
+    'Throttles': 'Count',
+    'IdempotentRequests': 'Count',
+    'DuplicatesSuppressed': 'Count',
+    'DeadlineSkipped': 'Count',
+    'PartialResponses': 'Count',
+    'BreakerOpened': 'Count',
+    'BreakerClosed': 'Count',
+    'BreakerRejected': 'Count',
+    'BufferedWrites': 'Count',
+    'WriteRetries': 'Count',
+    'WritesDropped': 'Count',
+}
+
+# boto3 service name -> call-count metric
+SERVICE_CALL_METRICS = {
+    'dynamodb': 'DynamoDBCalls',
+    's3': 'S3Calls',
+}
+
+class InvocationMetrics:
+    """
+    Per-invocation counters written as one CloudWatch Embedded Metric
+    Format (EMF) record per routed request.
+
+    CloudWatch extracts the metrics from the log line, dimensioned by
+    function and route, so latency percentiles are available without any
+    PutMetricData calls. AWS calls are counted through botocore hooks
+    installed by the client registry. The core metrics are declared in
+    every record; the others only when non-zero, since each declared
+    metric is a billed custom metric per dimension set.
+
+    Configured through the environment:
+      METRICS_ENABLED     set to ``false`` to stop emitting records
+      METRICS_NAMESPACE   CloudWatch namespace (default AdOptimizerAgent)
+    """
+
+    def __init__(self, namespace=None, enabled=None, stream=None):
+        self.namespace = namespace or os.environ.get('METRICS_NAMESPACE', DEFAULT_NAMESPACE)
+        if enabled is None:
+            enabled = os.environ.get('METRICS_ENABLED', 'true').lower() != 'false'
+        self.enabled = enabled
+        self.stream = stream
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Reset the counters at the start of an invocation."""
+        with self._lock:
+            self._counters = {}
+
+    def add(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record_call(self, service_name, parsed):
+        """Count one AWS call and the items it returned."""
+        metric = SERVICE_CALL_METRICS.get(service_name)
+        if metric:
+            self.add(metric)
+        if isinstance(parsed, dict):
+            if 'Count' in parsed:
+                self.add('ItemsRead', parsed['Count'])
+            elif 'Item' in parsed:
+                self.add('ItemsRead')
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def emit(self, function_name, route, status_code, latency_ms, response_bytes, request_id=None):
+        """Write the EMF record for the invocation that just finished."""
+        if not self.enabled:
+            return
+        values = {name: 0 for name in CORE_METRICS}
+        values.update((name, value) for name, value in self.counters().items() if value)
+        values['Latency'] = round(latency_ms, 3)
+        values['ResponseBytes'] = response_bytes
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [['Function', 'Route'], ['Function']],
+                    'Metrics': [
+                        {'Name': name, 'Unit': unit}
+                        for name, unit in METRIC_UNITS.items()
+                        if name in values
+                    ]
+                }]
+            },
+            'Function': function_name,
+            'Route': route,
+            'StatusCode': status_code
+        }
+        if request_id:
+            record['requestId'] = request_id
+        record.update(values)
+        print(json.dumps(record, separators=(',', ':')), file=self.stream or sys.stdout)
+
+metrics = InvocationMetrics()
@@ -0,0 +1,138 @@
+import base64
+import hashlib
+import json
+import os
+
+from .encoding import encode_body
+from .fields import FIELDS_KEY
+from .routing import BadRequest
+
+# Bedrock caps action-group responses at 25 KB; keep headroom for the envelope.
+MAX_RESPONSE_BYTES = int(os.environ.get('RESPONSE_MAX_BYTES', '20000'))
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', '50'))
+
+PAGINATION_KEYS = ('cursor', 'pageSize')
+CONTINUATION_KEY = 'continuationToken'
+
+class InvalidCursor(BadRequest):
+    """The continuation token is malformed or belongs to another request."""
+
+def paginate(data, list_key, request, order_by=None, max_bytes=None):
+    """
+    Return ``data`` with ``data[list_key]`` cut to one page that fits the
+    response byte budget, plus a ``pagination`` block.
+
+    The page starts at the request's ``cursor`` and holds at most
+    ``pageSize`` items, fewer if the encoded response would exceed
+    ``max_bytes`` (default: the request's ``max_response_bytes``, else
+    RESPONSE_MAX_BYTES). Item sizes are measured with the response encoder
+    before anything is returned; a single item larger than the budget is still
+    returned on its own. When items are left over, the list is ordered by
+    ``order_by`` (descending) so the top-k come first, and ``nextCursor``
+    continues from where the page stopped.
+    """
+    items = data.get(list_key) or []
+    max_bytes = max_bytes or request.max_response_bytes or MAX_RESPONSE_BYTES
+    fingerprint = request_fingerprint(request)
+    cursor = _request_value(request, 'cursor')
+    offset = decode_cursor(cursor, fingerprint) if cursor else 0
+    page_size = _page_size(_request_value(request, 'pageSize'))
+
+    sizes = [len(encode_body(item)) for item in items]
+    # Sized with the widest values the block can take, so the page always fits
+    pagination = {
+        'offset': offset,
+        'returned': len(items),
+        'total': len(items),
+        'nextCursor': encode_cursor(len(items), fingerprint),
+        'truncated': False,
+        'maxBytes': max_bytes
+    }
+    base = dict(data)
+    base[list_key] = []
+    base['pagination'] = pagination
+    budget = max_bytes - len(encode_body(base))
+
+    fits_whole = offset == 0 and len(items) <= page_size and sum(sizes) + 2 * len(items) <= budget
+    if not fits_whole and order_by is not None:
+        order = sorted(range(len(items)), key=lambda i: order_by(items[i]), reverse=True)
+        items = [items[i] for i in order]
+        sizes = [sizes[i] for i in order]
+
+    end = offset
+    used = 0
+    while end < len(items) and end - offset < page_size:
+        cost = sizes[end] + (2 if end > offset else 0)
+        if used + cost > budget and end > offset:
+            break
+        used += cost
+        end += 1
+
+    page = items[offset:end]
+    result = dict(data)
+    result[list_key] = page
+    pagination.update(
+        returned=len(page),
+        nextCursor=encode_cursor(end, fingerprint) if end < len(items) else None,
+        truncated=end < len(items)
+    )
+    result['pagination'] = pagination
+    return result
+
+def encode_cursor(offset, fingerprint):
+    raw = json.dumps({'o': offset, 'f': fingerprint}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, fingerprint):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        offset = int(state['o'])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if state.get('f') != fingerprint or offset < 0:
+        raise InvalidCursor('Cursor does not match this request')
+    return offset
+
+def encode_continuation(pending, request):
+    """Token that resumes ``request`` with only the items at the ``pending`` indexes."""
+    raw = json.dumps({'p': list(pending), 'f': request_fingerprint(request)}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def resume_indexes(request, count):
+    """
+    Indexes of the request's ``count`` items still to process: all of them,
+    or those left pending by the ``continuationToken`` of an earlier partial
+    response to the same request.
+    """
+    token = _request_value(request, CONTINUATION_KEY)
+    if not token:
+        return list(range(count))
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        pending = [int(index) for index in state['p']]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor('Invalid continuationToken')
+    if state.get('f') != request_fingerprint(request) or any(not 0 <= index < count for index in pending):
+        raise InvalidCursor('continuationToken does not match this request')
+    return pending
+
+def request_fingerprint(request):
+    """Short hash of the request's inputs, ignoring the pagination and fields keys."""
+    ignored = PAGINATION_KEYS + (CONTINUATION_KEY, FIELDS_KEY)
+    body = {k: v for k, v in request.body.items() if k not in ignored}
+    params = {k: v for k, v in request.params.items() if k not in ignored}
+    raw = json.dumps([request.api_path, body, params], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]
+
+def _request_value(request, name):
+    value = request.body.get(name)
+    return request.param(name) if value is None else value
+
+def _page_size(value):
+    try:
+        size = int(value) if value is not None else DEFAULT_PAGE_SIZE
+    except (TypeError, ValueError):
+        size = DEFAULT_PAGE_SIZE
+    return max(size, 1)
@@ -0,0 +1,80 @@
+import functools
+import os
+import random
+import re
+import tempfile
+
+from .storage import storage
+
+DEFAULT_PREFIX = 'profiles'
+
+def profiled(function_name, logger=None):
+    """
+    Decorator for a Lambda ``handler`` that captures cProfile stats for
+    opted-in invocations.
+
+    An invocation is profiled when PROFILE_SAMPLE_RATE selects it, or when
+    the event asks for it with ``"profile": true`` or a ``profile`` session
+    attribute of ``true``. Stats are written in pstats format to
+    s3://BUCKET_NAME/PROFILE_PREFIX/<function>/<route>/<request id>.prof,
+    or under /tmp when PROFILE_TARGET is ``tmp`` or no bucket is configured.
+    Merge dumps with benchmarks/profile_report.py.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            if not _should_profile(event):
+                return handler(event, context)
+
+            import cProfile
+
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return handler(event, context)
+            finally:
+                profile.disable()
+                try:
+                    location = _save(profile, function_name, event, context)
+                    if logger:
+                        logger.info('profile captured', location=location)
+                except Exception as e:
+                    if logger:
+                        logger.warning('profile not saved', error=str(e))
+
+        return wrapper
+
+    return decorator
+
+def _should_profile(event):
+    if event.get('source') == 'warming':
+        return False
+    requested = event.get('profile')
+    if requested is None:
+        requested = (event.get('sessionAttributes') or {}).get('profile')
+    if requested is True or str(requested).lower() == 'true':
+        return True
+    try:
+        rate = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+    except ValueError:
+        return False
+    return rate > 0 and random.random() < rate
+
+def _save(profile, function_name, event, context):
+    route = f"{event.get('httpMethod', '')}{event.get('apiPath', '')}".strip('/') or 'unknown'
+    route = re.sub(r'[^A-Za-z0-9_-]+', '_', route)
+    request_id = getattr(context, 'aws_request_id', None) or 'local'
+    key = f"{os.environ.get('PROFILE_PREFIX', DEFAULT_PREFIX)}/{function_name}/{route}/{request_id}.prof"
+
+    bucket = os.environ.get('BUCKET_NAME')
+    if os.environ.get('PROFILE_TARGET', 's3').lower() == 'tmp' or not bucket:
+        path = os.path.join(tempfile.gettempdir(), key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        profile.dump_stats(path)
+        return path
+
+    with tempfile.NamedTemporaryFile(suffix='.prof') as f:
+        profile.dump_stats(f.name)
+        f.seek(0)
+        storage.bucket(bucket).put(key, f.read())
+    return f's3://{bucket}/{key}'
@@ -0,0 +1,23 @@
+import json
+
+from .encoding import encode_body
+
+def success_response(event, data):
+    """Wrap a route result in the Bedrock action-group response envelope."""
+    return _envelope(event, 200, encode_body(data))
+
+def error_response(event, error_message):
+    """Wrap an error message in the Bedrock action-group response envelope."""
+    return _envelope(event, 400, json.dumps({'error': error_message}))
+
+def _envelope(event, status_code, body):
+    return {
+        'messageVersion': '1.0',
+        'response': {
+            'actionGroup': event.get('actionGroup'),
+            'apiPath': event.get('apiPath'),
+            'httpMethod': event.get('httpMethod'),
+            'httpStatusCode': status_code,
+            'responseBody': {'application/json': {'body': body}}
+        }
+    }
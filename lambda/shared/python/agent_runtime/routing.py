@@ -0,0 +1,511 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .breaker import breaker_stats
+from .cache import cache_stats
+from .clients import clients
+from .encoding import encode_body
+from .fields import FieldSelection
+from .logs import StructuredLogger
+from .metrics import metrics
+from .responses import error_response, success_response
+from .session import SessionCache
+from .tracing import tracer
+from .writes import flush_writes
+
+BATCH_MAX_OPERATIONS = int(os.environ.get('BATCH_MAX_OPERATIONS', '25'))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', '8'))
+
+# Room left in a batch response for its counts and duration
+BATCH_ENVELOPE_BYTES = 200
+# Room left in each operation's share for its method, path, status and latency
+BATCH_RESULT_BYTES = 120
+# Smallest budget an operation's own pagination is given
+BATCH_MIN_OPERATION_BYTES = 500
+
+TOO_LARGE_MESSAGE = 'Response too large for this batch; run the operation on its own'
+
+# Method of a route that answers every HTTP method on its path
+ANY_METHOD = '*'
+
+class BadRequest(Exception):
+    """Raised by a route to return a 400 response with the given message."""
+
+class ActionRequest:
+    """
+    A decoded Bedrock action-group event.
+    Parameters are indexed once per event and the request body is parsed
+    at most once, on first access.
+    """
+
+    def __init__(self, event, context=None, session=None):
+        self.event = event
+        self.context = context
+        self._session = session
+        self.api_path = event.get('apiPath', '')
+        self.http_method = event.get('httpMethod', '')
+        self.params = {
+            param.get('name'): param.get('value')
+            for param in event.get('parameters') or []
+        }
+        self._body = None
+        self._fields = None
+        self._deadline = None
+        # Response byte budget for ``paginate``; set for batched operations
+        self.max_response_bytes = None
+        # Position in the /batch operations list, for batched operations
+        self.batch_index = None
+
+    @property
+    def body(self):
+        """Request body from Bedrock Agent format, parsed as JSON."""
+        if self._body is None:
+            self._body = parse_request_body(self.event.get('requestBody'))
+        return self._body
+
+    def param(self, name, default=None):
+        """Extract parameter value by name."""
+        value = self.params.get(name)
+        return default if value is None else value
+
+    @property
+    def session(self):
+        """Cross-turn cache kept in the event's session attributes."""
+        if self._session is None:
+            self._session = SessionCache(self.event.get('sessionAttributes'))
+        return self._session
+
+    @property
+    def fields(self):
+        """The ``fields`` selection for this request (everything when absent)."""
+        if self._fields is None:
+            self._fields = FieldSelection.from_request(self)
+        return self._fields
+
+    @property
+    def deadline(self):
+        """Time left in the invocation, from the Lambda context (see ``Deadline``)."""
+        if self._deadline is None:
+            from .deadline import Deadline
+            self._deadline = Deadline(self.context)
+        return self._deadline
+
+class RouteStats:
+    """Per-container call count and latency for a single route."""
+
+    __slots__ = ('count', 'errors', 'total_ms', 'max_ms', 'last_ms')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def record(self, elapsed_ms, failed=False):
+        self.count += 1
+        self.errors += 1 if failed else 0
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.last_ms = elapsed_ms
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avgMs': round(self.total_ms / self.count, 3) if self.count else 0,
+            'maxMs': round(self.max_ms, 3),
+            'lastMs': round(self.last_ms, 3)
+        }
+
+class Router:
+    """
+    Exact-match (method, path) dispatch table for one action group.
+
+    Routes are registered with the ``route`` decorator and receive an
+    ``ActionRequest``. A route returns the response data, or raises
+    ``BadRequest`` to produce a 400 response. Response data is reduced to
+    the request's ``fields`` selection, when one is given.
+
+    Every router also serves ``POST /batch``, which runs a list of
+    operations against the other routes concurrently in one invocation.
+    Each routed invocation emits one EMF metrics record (latency, AWS
+    calls, items read, response bytes) dimensioned by function and route,
+    and its AWS calls are traced (see ``CallTracer``). The route log line
+    carries the hits and misses of each named ``TTLCache`` during the
+    invocation. Writes queued in a ``WriteBuffer`` are flushed before the
+    response is returned; the flush, route log line and metrics record
+    also happen when a route raises. Routes registered with
+    ``idempotent=True`` run at most once per idempotency key (see
+    ``IdempotencyStore``). Routes that fan out over campaigns pass
+    ``request.deadline`` to ``run_concurrently`` and return partial
+    results rather than time out.
+    """
+
+    def __init__(self, function_name, logger=None):
+        self.function_name = function_name
+        self.logger = logger or StructuredLogger(function_name)
+        self.idempotency = None
+        self._routes = {}
+        self._stats = {}
+        self._preloaders = {}
+        self._idempotent = set()
+        self.route('POST', '/batch')(self._batch)
+
+    def route(self, method, path, idempotent=False):
+        """
+        Register a route for an HTTP method (or ``'*'`` for any method)
+        and exact API path. Mutations that Bedrock may retry should pass
+        ``idempotent=True``.
+        """
+        key = (method.upper(), _normalize_path(path))
+        if idempotent and self.idempotency is None:
+            from .idempotency import IdempotencyStore
+            self.idempotency = IdempotencyStore(self.function_name, self.logger)
+
+        def decorator(func):
+            if key in self._routes:
+                raise ValueError(f'Duplicate route {key[0]} {key[1]}')
+            self._routes[key] = func
+            self._stats[key] = RouteStats()
+            if idempotent:
+                self._idempotent.add(key)
+            return func
+
+        return decorator
+
+    def routes(self):
+        """Registered (method, path) pairs in registration order."""
+        return list(self._routes)
+
+    def stats(self):
+        """Per-route timing collected in this container."""
+        return {
+            f'{method} {path}': stats.as_dict()
+            for (method, path), stats in self._stats.items()
+            if stats.count
+        }
+
+    def dispatch(self, event, context=None):
+        """Route a Bedrock action-group event and build its response."""
+        self.logger.start_invocation(context)
+        self.logger.event(event)
+        if event.get('source') == 'warming':
+            return self.warm(event)
+
+        metrics.start()
+        tracer.start()
+        caches_before = cache_stats()
+        request = ActionRequest(event, context)
+        key, route = self._match(request.http_method.upper(), _normalize_path(request.api_path))
+        started = time.perf_counter()
+        response = None
+        try:
+            if route is None:
+                response = error_response(event, 'Invalid operation')
+            else:
+                try:
+                    data = request.fields.project(self._call(key, route, request))
+                    if tracer.attach_to_response and isinstance(data, dict):
+                        data = dict(data, awsCalls=tracer.summary())
+                    response = success_response(event, data)
+                except BadRequest as e:
+                    response = error_response(event, str(e))
+        finally:
+            # Runs when a route raises too, so queued writes are not left
+            # in the buffer over the container freeze
+            self._complete(event, request, key, route, response, started, caches_before)
+        return response
+
+    def _complete(self, event, request, key, route, response, started, caches_before):
+        # Writes the route queued go out before the handler returns
+        flush_writes()
+        if response is not None and request._session is not None and request._session.changed:
+            response['sessionAttributes'] = request.session.attributes
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if response is None:
+            # The route raised; Lambda reports the invocation as an error
+            status_code, response_bytes = 500, 0
+        else:
+            status_code = response['response']['httpStatusCode']
+            response_bytes = len(response['response']['responseBody']['application/json']['body'])
+        if route is not None:
+            self._stats[key].record(elapsed_ms, status_code >= 400)
+        self.logger.route_summary(
+            f'{key[0]} {key[1]}',
+            status_code,
+            elapsed_ms,
+            _request_bytes(event),
+            response_bytes,
+            cache=_cache_activity(caches_before, cache_stats())
+        )
+        # Unknown paths share one dimension value to keep metric cardinality bounded
+        metrics.emit(
+            self.function_name,
+            f'{key[0]} {key[1]}' if route is not None else 'unmatched',
+            status_code,
+            elapsed_ms,
+            response_bytes,
+            self.logger.request_id
+        )
+        if tracer.log_calls:
+            self.logger.info('aws calls', route=f'{key[0]} {key[1]}', trace=tracer.calls(), **tracer.summary())
+
+    def _match(self, method, path):
+        # Exact method first, then a route registered for any method
+        route = self._routes.get((method, path))
+        if route is None and (ANY_METHOD, path) in self._routes:
+            return (ANY_METHOD, path), self._routes[(ANY_METHOD, path)]
+        return (method, path), route
+
+    def _call(self, key, route, request):
+        if key in self._idempotent:
+            return self.idempotency.run(request, lambda: route(request))
+        return route(request)
+
+    def _batch(self, request):
+        """
+        Run ``operations`` (each with path, method, parameters and an
+        optional body) concurrently and return one result per operation.
+        The combined response is held to the RESPONSE_MAX_BYTES budget:
+        each operation paginates to an equal share of it, and once it is
+        spent the remaining results are replaced with "response too large"
+        errors (one per operation, or a single summary when those would not
+        fit either).
+        """
+        operations = request.body.get('operations')
+        if not operations or not isinstance(operations, list):
+            raise BadRequest('operations list required')
+        if len(operations) > BATCH_MAX_OPERATIONS:
+            raise BadRequest(f'At most {BATCH_MAX_OPERATIONS} operations per batch')
+
+        started = time.perf_counter()
+        workers = min(BATCH_MAX_WORKERS, len(operations))
+        max_bytes = _operation_budget(len(operations))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(
+                lambda index: self._run_operation(request, index, operations[index], max_bytes),
+                range(len(operations))
+            ))
+
+        results = []
+        for index, (key, result, elapsed_ms) in enumerate(outcomes):
+            if key in self._stats:
+                self._stats[key].record(elapsed_ms, result['status'] >= 400)
+            result['index'] = index
+            results.append(result)
+        results = _within_budget(results)
+        succeeded = sum(1 for r in results if r['status'] < 400)
+
+        return {
+            'operations': results,
+            'succeeded': succeeded,
+            'failed': len(operations) - succeeded,
+            'durationMs': round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    def _run_operation(self, batch_request, index, operation, max_bytes):
+        if not isinstance(operation, dict):
+            return None, {'status': 400, 'error': 'operation must be an object'}, 0.0
+        method = str(operation.get('method', 'GET')).upper()
+        path = _normalize_path(str(operation.get('path', '')))
+        key, route = self._match(method, path)
+        result = {'method': method, 'path': path}
+        if route is None or path == '/batch':
+            result.update(status=400, error='Invalid operation')
+            return None, result, 0.0
+
+        event = _operation_event(batch_request.event, method, path, operation)
+        started = time.perf_counter()
+        try:
+            request = ActionRequest(event, batch_request.context, session=batch_request.session)
+            request.max_response_bytes = max_bytes
+            request.batch_index = index
+            result.update(status=200, result=request.fields.project(self._call(key, route, request)))
+        except BadRequest as e:
+            result.update(status=400, error=str(e))
+        except Exception as e:
+            self.logger.error('batch operation failed', route=f'{method} {path}', error=str(e))
+            result.update(status=500, error=str(e))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        result['latencyMs'] = round(elapsed_ms, 3)
+        return key, result, elapsed_ms
+
+    def preload(self, name):
+        """
+        Register a preload step run by warming pings.
+        The step's return value is reported in the warm response.
+        """
+        def decorator(func):
+            self._preloaders[name] = func
+            return func
+
+        return decorator
+
+    def warm(self, event):
+        """
+        Handle a scheduled warming ping (prevents cold starts).
+
+        Runs the registered preload steps so the first real call finds open
+        connections and primed caches. Steps are chosen by the event's
+        ``preload`` list, else the WARM_PRELOAD environment variable
+        (comma-separated, or ``none``), else all registered steps. The warm
+        log line reports the container's per-route timing, caches, circuit
+        breakers and the calls, retries and throttles of each AWS client.
+        """
+        started = time.perf_counter()
+        preloaded = {}
+        for name in self._preload_steps(event):
+            step = self._preloaders.get(name)
+            if step is None:
+                preloaded[name] = {'status': 'unknown'}
+                continue
+            step_started = time.perf_counter()
+            try:
+                preloaded[name] = {'status': 'ok', 'result': step()}
+            except Exception as e:
+                preloaded[name] = {'status': 'error', 'error': str(e)}
+            preloaded[name]['durationMs'] = round((time.perf_counter() - step_started) * 1000, 3)
+
+        duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        self.logger.info(
+            'warm',
+            durationMs=duration_ms,
+            steps=list(preloaded),
+            routes=self.stats(),
+            caches=cache_stats(),
+            breakers=breaker_stats(),
+            clients=clients.counters(),
+            **({'idempotency': self.idempotency.stats()} if self.idempotency else {})
+        )
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'status': 'warm',
+                'function': self.function_name,
+                'preloaded': preloaded,
+                'durationMs': duration_ms,
+                'timestamp': datetime.now().isoformat()
+            }, default=str)
+        }
+
+    def _preload_steps(self, event):
+        steps = event.get('preload')
+        if steps is None:
+            configured = os.environ.get('WARM_PRELOAD', '').strip()
+            if configured.lower() == 'none':
+                return []
+            steps = configured.split(',') if configured else list(self._preloaders)
+        return [step.strip() for step in steps if step.strip()]
+
+def parse_request_body(request_body):
+    """Parse request body from Bedrock Agent format."""
+    if not request_body:
+        return {}
+    content = request_body.get('content', {})
+    body_str = content.get('application/json', '')
+    if body_str:
+        try:
+            return json.loads(body_str)
+        except json.JSONDecodeError:
+            return {}
+    return {}
+
+def _cache_activity(before, after):
+    """Hits and misses per named cache between two ``cache_stats`` snapshots."""
+    activity = {}
+    for name, stats in after.items():
+        previous = before.get(name, {})
+        hits = stats['hits'] - previous.get('hits', 0)
+        misses = stats['misses'] - previous.get('misses', 0)
+        if hits or misses:
+            activity[name] = {'hits': hits, 'misses': misses, 'entries': stats['entries']}
+    return activity
+
+def _within_budget(results):
+    """
+    ``results`` in order while their encoded size fits the response byte
+    budget, then "response too large" errors for the rest. Room for those
+    errors is reserved as results are kept; when even the errors would not
+    fit, the rest are reported by one summary error instead.
+    """
+    budget = _batch_budget() - 2
+    errors = [_too_large(result) for result in results]
+    # Every element is counted with its ", " separator
+    tail_sizes = [0] * (len(results) + 1)
+    for index in range(len(results) - 1, -1, -1):
+        tail_sizes[index] = tail_sizes[index + 1] + len(encode_body(errors[index])) + 2
+
+    def tail_size(index):
+        if index == len(results):
+            return 0
+        return min(tail_sizes[index], len(encode_body(_summary_too_large(results, index))) + 2)
+
+    kept = []
+    remaining = budget
+    for index, result in enumerate(results):
+        size = len(encode_body(result)) + 2
+        if size + tail_size(index + 1) > remaining:
+            if tail_sizes[index] <= remaining:
+                return kept + errors[index:]
+            return kept + [_summary_too_large(results, index)]
+        kept.append(result)
+        remaining -= size
+    return kept
+
+def _batch_budget():
+    from .pagination import MAX_RESPONSE_BYTES
+
+    return MAX_RESPONSE_BYTES - BATCH_ENVELOPE_BYTES
+
+def _operation_budget(count):
+    """Response byte budget for each of ``count`` batched operations."""
+    share = _batch_budget() // count - BATCH_RESULT_BYTES
+    return max(share, BATCH_MIN_OPERATION_BYTES)
+
+def _too_large(result):
+    error = {key: result[key] for key in ('method', 'path', 'index') if key in result}
+    error.update(status=413, error=TOO_LARGE_MESSAGE)
+    return error
+
+def _summary_too_large(results, index):
+    return {
+        'status': 413,
+        'error': TOO_LARGE_MESSAGE,
+        'count': len(results) - index,
+        'firstIndex': results[index]['index'],
+        'lastIndex': results[-1]['index']
+    }
+
+def _operation_event(batch_event, method, path, operation):
+    """Build the action-group event for one operation of a batch."""
+    parameters = operation.get('parameters') or []
+    if isinstance(parameters, dict):
+        parameters = [{'name': name, 'value': value} for name, value in parameters.items()]
+    event = {
+        'messageVersion': batch_event.get('messageVersion'),
+        'actionGroup': batch_event.get('actionGroup'),
+        'sessionId': batch_event.get('sessionId'),
+        'inputText': batch_event.get('inputText'),
+        'apiPath': path,
+        'httpMethod': method,
+        'parameters': parameters
+    }
+    body = operation.get('body')
+    if body is not None:
+        event['requestBody'] = {'content': {'application/json': json.dumps(body, default=str)}}
+    return event
+
+def _request_bytes(event):
+    content = (event.get('requestBody') or {}).get('content') or {}
+    body = content.get('application/json')
+    return len(body) if isinstance(body, str) else 0
+
+def _normalize_path(path):
+    if len(path) > 1 and path.endswith('/'):
+        return path.rstrip('/')
+    return path
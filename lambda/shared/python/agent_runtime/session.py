@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+
+SESSION_CACHE_VERSION = 1
+SESSION_CACHE_PREFIX = 'cache.'
+
+# Latest-metrics fields other functions read back (see metrics_digest)
+METRICS_DIGEST_FIELDS = ('roas', 'cpa', 'conversions', 'cost')
+
+class SessionCache:
+    """
+    Results carried between turns of one agent session in Bedrock
+    ``sessionAttributes``.
+
+    Each entry is stored under ``cache.<name>`` as compact JSON holding a
+    format version, the time it was written and the data. Entries from
+    another version or older than the TTL are ignored, so a later turn
+    only reuses results that are still fresh. Bedrock shares session
+    attributes across action groups, so one function can reuse what
+    another cached earlier in the conversation.
+
+    Bedrock sends the attributes back with every later event, so the cache
+    is bounded: once ``max_entries`` entries or ``max_bytes`` of them are
+    held, entries that are no longer fresh are dropped and, if that is not
+    enough, further writes are skipped (counted in ``skipped``).
+
+    Configured through the environment:
+      SESSION_CACHE_TTL           seconds an entry stays fresh (default 300, 0 disables)
+      SESSION_CACHE_MAX_ENTRIES   entries kept at most (default 32)
+      SESSION_CACHE_MAX_BYTES     size of the entries kept at most (default 8192)
+    """
+
+    def __init__(self, attributes=None, ttl_seconds=None, max_entries=None, max_bytes=None, clock=time.time):
+        self.attributes = dict(attributes or {})
+        if ttl_seconds is None:
+            ttl_seconds = int(os.environ.get('SESSION_CACHE_TTL', '300'))
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries or int(os.environ.get('SESSION_CACHE_MAX_ENTRIES', '32'))
+        self.max_bytes = max_bytes or int(os.environ.get('SESSION_CACHE_MAX_BYTES', '8192'))
+        self.clock = clock
+        self.changed = False
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def get(self, name, default=None):
+        """Cached data for ``name`` if it is current and fresh."""
+        entry = self._entry(name)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return entry['d']
+
+    def age(self, name):
+        """Seconds since ``name`` was cached, or None when absent or stale."""
+        entry = self._entry(name)
+        return None if entry is None else int(self.clock()) - entry['t']
+
+    def put(self, name, data):
+        """Cache ``data`` as ``name``; returns False when the size budget skipped it."""
+        if self.ttl_seconds <= 0:
+            return False
+        key = SESSION_CACHE_PREFIX + name
+        value = json.dumps(
+            {'v': SESSION_CACHE_VERSION, 't': int(self.clock()), 'd': data},
+            separators=(',', ':'),
+            default=str
+        )
+        with self._lock:
+            if not self._fits(key, value):
+                self._drop_expired()
+                if not self._fits(key, value):
+                    self.skipped += 1
+                    return False
+            self.attributes[key] = value
+            self.changed = True
+        return True
+
+    def invalidate(self, name):
+        with self._lock:
+            if self.attributes.pop(SESSION_CACHE_PREFIX + name, None) is not None:
+                self.changed = True
+
+    def _fits(self, key, value):
+        # Whether the entries stay within budget with ``value`` under ``key``
+        entries = {k: v for k, v in self.attributes.items() if k.startswith(SESSION_CACHE_PREFIX) and k != key}
+        if len(entries) + 1 > self.max_entries:
+            return False
+        size = sum(len(k) + len(str(v)) for k, v in entries.items())
+        return size + len(key) + len(value) <= self.max_bytes
+
+    def _drop_expired(self):
+        for key in [k for k in self.attributes if k.startswith(SESSION_CACHE_PREFIX)]:
+            if self._entry(key[len(SESSION_CACHE_PREFIX):]) is None:
+                del self.attributes[key]
+                self.changed = True
+
+    def _entry(self, name):
+        raw = self.attributes.get(SESSION_CACHE_PREFIX + name)
+        if not raw or self.ttl_seconds <= 0:
+            return None
+        try:
+            entry = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get('v') != SESSION_CACHE_VERSION:
+            return None
+        if int(self.clock()) - entry.get('t', 0) > self.ttl_seconds:
+            return None
+        return entry
+
+def metrics_digest(metrics):
+    """Compact latest-metrics entry for a campaign, cached as ``metrics.<campaignId>``."""
+    return {field: round(float(metrics.get(field) or 0), 4) for field in METRICS_DIGEST_FIELDS}
@@ -0,0 +1,427 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+from .breaker import CircuitOpen, breaker
+from .clients import clients
+from .metrics import metrics
+from .tracing import tracer
+
+# DynamoDB stops a Query page once it has read 1 MB
+QUERY_PAGE_BYTES = 1024 * 1024
+
+BACKENDS = ('aws', 'memory')
+
+class ObjectNotFound(KeyError):
+    """No object is stored under the requested key."""
+
+def _condition_failed(error):
+    return (getattr(error, 'response', None) or {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+
+class DynamoDBTable:
+    """
+    Table with a partition key and an optional numeric sort key, backed by
+    DynamoDB. Calls go through the shared client registry, so they are
+    traced and counted like any other AWS call. Reads go through the
+    table's circuit breaker and raise ``CircuitOpen`` without calling
+    DynamoDB while it is open.
+    """
+
+    def __init__(self, table_name, partition_key, sort_key=None, ttl_attribute=None):
+        self.table_name = table_name
+        self.partition_key = partition_key
+        self.sort_key = sort_key
+        self.ttl_attribute = ttl_attribute
+        self.breaker = breaker(f'dynamodb:{table_name}')
+
+    def query(self, partition_value, since=None, newest_first=False, limit=None, start_key=None):
+        """
+        One Query page: items under ``partition_value`` whose sort key is at
+        least ``since``, in sort key order (newest first if asked). Returns
+        ``(items, last_key)``; pass ``last_key`` back as ``start_key`` for the
+        next page until it is None.
+        """
+        from boto3.dynamodb.conditions import Key
+
+        condition = Key(self.partition_key).eq(partition_value)
+        if since is not None:
+            condition = condition & Key(self.sort_key).gte(since)
+        kwargs = {'KeyConditionExpression': condition}
+        if newest_first:
+            kwargs['ScanIndexForward'] = False
+        if limit:
+            kwargs['Limit'] = limit
+        if start_key:
+            kwargs['ExclusiveStartKey'] = start_key
+        with self.breaker.guard():
+            response = clients.table(self.table_name).query(**kwargs)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+    def latest(self, partition_value):
+        """Item with the highest sort key under ``partition_value``, or None."""
+        items, _ = self.query(partition_value, newest_first=True, limit=1)
+        return items[0] if items else None
+
+    def get(self, partition_value, sort_value=None):
+        """Item stored under the key, or None (strongly consistent read)."""
+        with self.breaker.guard():
+            response = clients.table(self.table_name).get_item(
+                Key=self._key(partition_value, sort_value), ConsistentRead=True
+            )
+        return response.get('Item')
+
+    def put(self, item):
+        clients.table(self.table_name).put_item(Item=item)
+
+    def put_many(self, items):
+        """
+        Write up to 25 items with one BatchWriteItem call. Returns the items
+        DynamoDB left unprocessed, for the caller to retry.
+        """
+        response = clients.resource('dynamodb').meta.client.batch_write_item(
+            RequestItems={self.table_name: [{'PutRequest': {'Item': item}} for item in items]}
+        )
+        unprocessed = (response.get('UnprocessedItems') or {}).get(self.table_name, [])
+        return [request['PutRequest']['Item'] for request in unprocessed]
+
+    def put_if_absent(self, item):
+        """
+        Write ``item`` unless an item with its key exists (an item whose TTL
+        has passed counts as absent). Returns whether it was written.
+        """
+        condition = 'attribute_not_exists(#pk)'
+        kwargs = {'ExpressionAttributeNames': {'#pk': self.partition_key}}
+        if self.ttl_attribute:
+            # DynamoDB deletes expired items lazily, so they can still be read
+            condition += ' OR #ttl < :now'
+            kwargs['ExpressionAttributeNames']['#ttl'] = self.ttl_attribute
+            kwargs['ExpressionAttributeValues'] = {':now': int(time.time())}
+        try:
+            clients.table(self.table_name).put_item(Item=item, ConditionExpression=condition, **kwargs)
+        except Exception as e:
+            if _condition_failed(e):
+                return False
+            raise
+        return True
+
+    def delete(self, partition_value, sort_value=None):
+        clients.table(self.table_name).delete_item(Key=self._key(partition_value, sort_value))
+
+    def warm(self):
+        return clients.warm_table(self.table_name)
+
+    def _key(self, partition_value, sort_value=None):
+        key = {self.partition_key: partition_value}
+        if self.sort_key:
+            key[self.sort_key] = sort_value
+        return key
+
+class MemoryTable:
+    """
+    In-process stand-in for ``DynamoDBTable`` that behaves like DynamoDB:
+
+    - items are kept in sort key order per partition; a put with an
+      existing key replaces the item
+    - queries read in either direction and stop at ``Limit`` items or at
+      ``page_bytes`` of data, returning a LastEvaluatedKey to continue from
+      (also when Limit is hit exactly, as DynamoDB does)
+    - items whose TTL attribute is in the past are never returned and are
+      dropped as they are passed over
+    - ``put_if_absent`` fails while a live item holds the key, like a
+      conditional PutItem
+    - items are copied on the way in and out, as a network round trip would
+    - reads go through the same circuit breaker as ``DynamoDBTable``
+
+    Each call is recorded in the invocation metrics and the call tracer as
+    a DynamoDB call, after an optional simulated ``latency_ms``.
+    """
+
+    def __init__(self, table_name, partition_key, sort_key=None, ttl_attribute=None,
+                 page_bytes=QUERY_PAGE_BYTES, latency_ms=0, clock=time.time):
+        self.table_name = table_name
+        self.partition_key = partition_key
+        self.sort_key = sort_key
+        self.ttl_attribute = ttl_attribute
+        self.page_bytes = page_bytes
+        self.latency_ms = latency_ms
+        self.clock = clock
+        self.breaker = breaker(f'dynamodb:{table_name}')
+        self._partitions = {}
+        self._lock = threading.Lock()
+
+    def query(self, partition_value, since=None, newest_first=False, limit=None, start_key=None):
+        with self.breaker.guard():
+            return self._query(partition_value, since, newest_first, limit, start_key)
+
+    def _query(self, partition_value, since, newest_first, limit, start_key):
+        started = time.perf_counter()
+        now = self.clock()
+        with self._lock:
+            partition = self._partitions.get(partition_value, ([], []))
+            keys, items = partition
+            low = 0 if since is None else bisect.bisect_left(keys, since)
+            high = len(keys)
+            if start_key and self.sort_key:
+                # Continue past the key the previous page stopped at
+                if newest_first:
+                    high = bisect.bisect_left(keys, start_key[self.sort_key])
+                else:
+                    low = max(low, bisect.bisect_right(keys, start_key[self.sort_key]))
+            positions = range(low, high)
+            if newest_first:
+                positions = reversed(positions)
+
+            page, size, expired, last_key = [], 0, [], None
+            for position in positions:
+                item = items[position]
+                if self._expired(item, now):
+                    expired.append(keys[position])
+                    continue
+                page.append(dict(item))
+                size += _item_bytes(item)
+                if (limit and len(page) >= limit) or size >= self.page_bytes:
+                    last_key = self._key(item)
+                    break
+            for key in expired:
+                self._remove(partition, key)
+
+        self._record('Query', started, {'Items': page, 'Count': len(page)})
+        return page, last_key
+
+    def latest(self, partition_value):
+        items, _ = self.query(partition_value, newest_first=True, limit=1)
+        return items[0] if items else None
+
+    def get(self, partition_value, sort_value=None):
+        with self.breaker.guard():
+            started = time.perf_counter()
+            with self._lock:
+                item = self._find(partition_value, sort_value)
+            self._record('GetItem', started, {'Item': item} if item else {})
+            return item
+
+    def put(self, item):
+        started = time.perf_counter()
+        self.load([item])
+        self._record('PutItem', started, {})
+
+    def put_many(self, items):
+        started = time.perf_counter()
+        self.load(items)
+        self._record('BatchWriteItem', started, {'UnprocessedItems': {}})
+        return []
+
+    def put_if_absent(self, item):
+        started = time.perf_counter()
+        with self._lock:
+            sort_value = item[self.sort_key] if self.sort_key else None
+            written = self._find(item[self.partition_key], sort_value) is None
+            if written:
+                self._store(item)
+        self._record('PutItem', started, {} if written else {'Error': {'Code': 'ConditionalCheckFailedException'}})
+        return written
+
+    def delete(self, partition_value, sort_value=None):
+        started = time.perf_counter()
+        with self._lock:
+            partition = self._partitions.get(partition_value)
+            sort_value = sort_value if self.sort_key else 0
+            if partition and sort_value in partition[0]:
+                self._remove(partition, sort_value)
+        self._record('DeleteItem', started, {})
+
+    def load(self, items):
+        """Insert items directly, without recording calls (seeding)."""
+        with self._lock:
+            for item in items:
+                self._store(item)
+
+    def _store(self, item):
+        keys, stored = self._partitions.setdefault(item[self.partition_key], ([], []))
+        sort_value = item[self.sort_key] if self.sort_key else 0
+        position = bisect.bisect_left(keys, sort_value)
+        if position < len(keys) and keys[position] == sort_value:
+            stored[position] = dict(item)
+        else:
+            keys.insert(position, sort_value)
+            stored.insert(position, dict(item))
+
+    def _find(self, partition_value, sort_value=None):
+        # Copy of the live (unexpired) item under the key, or None
+        keys, items = self._partitions.get(partition_value, ([], []))
+        sort_value = sort_value if self.sort_key else 0
+        position = bisect.bisect_left(keys, sort_value)
+        if position == len(keys) or keys[position] != sort_value:
+            return None
+        item = items[position]
+        return None if self._expired(item, self.clock()) else dict(item)
+
+    def warm(self):
+        return {'table': self.table_name, 'status': 'ACTIVE'}
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(keys) for keys, _ in self._partitions.values())
+
+    def _expired(self, item, now):
+        expires_at = item.get(self.ttl_attribute) if self.ttl_attribute else None
+        return expires_at is not None and float(expires_at) <= now
+
+    def _remove(self, partition, sort_value):
+        keys, items = partition
+        position = bisect.bisect_left(keys, sort_value)
+        del keys[position]
+        del items[position]
+
+    def _key(self, item):
+        key = {self.partition_key: item[self.partition_key]}
+        if self.sort_key:
+            key[self.sort_key] = item[self.sort_key]
+        return key
+
+    def _record(self, operation, started, parsed):
+        _simulate_latency(self.latency_ms, started)
+        _record_call('dynamodb', operation, started, parsed)
+
+class S3Bucket:
+    """Object store backed by an S3 bucket, through the shared client registry."""
+
+    def __init__(self, bucket_name):
+        self.bucket_name = bucket_name
+
+    def put(self, key, body, content_type=None, metadata=None):
+        kwargs = {'Bucket': self.bucket_name, 'Key': key, 'Body': body}
+        if content_type:
+            kwargs['ContentType'] = content_type
+        if metadata:
+            kwargs['Metadata'] = metadata
+        clients.client('s3').put_object(**kwargs)
+
+    def get(self, key):
+        """Object body as bytes; raises ObjectNotFound for a missing key."""
+        s3_client = clients.client('s3')
+        try:
+            response = s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        except s3_client.exceptions.NoSuchKey:
+            raise ObjectNotFound(key)
+        return response['Body'].read()
+
+class MemoryBucket:
+    """In-process stand-in for ``S3Bucket``; calls are recorded as S3 calls."""
+
+    def __init__(self, bucket_name, latency_ms=0):
+        self.bucket_name = bucket_name
+        self.latency_ms = latency_ms
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def put(self, key, body, content_type=None, metadata=None):
+        started = time.perf_counter()
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        with self._lock:
+            self._objects[key] = {'body': bytes(body), 'contentType': content_type, 'metadata': dict(metadata or {})}
+        _simulate_latency(self.latency_ms, started)
+        _record_call('s3', 'PutObject', started, {})
+
+    def get(self, key):
+        started = time.perf_counter()
+        with self._lock:
+            stored = self._objects.get(key)
+        _simulate_latency(self.latency_ms, started)
+        if stored is None:
+            _record_call('s3', 'GetObject', started, {'Error': {'Code': 'NoSuchKey'}})
+            raise ObjectNotFound(key)
+        _record_call('s3', 'GetObject', started, {})
+        return stored['body']
+
+    def keys(self, prefix=''):
+        with self._lock:
+            return sorted(key for key in self._objects if key.startswith(prefix))
+
+class StorageRegistry:
+    """
+    Per-container registry of the tables and buckets the functions read
+    and write, so handlers never call boto3 directly.
+
+    The ``aws`` backend (default) uses DynamoDB and S3. The ``memory``
+    backend keeps everything in process, so handlers, load tests and
+    benchmarks run offline at realistic data sizes; its data lives as long
+    as the container or until ``use`` switches backend.
+
+    Configured through the environment:
+      STORAGE_BACKEND             ``aws`` or ``memory`` (default aws)
+      STORAGE_MEMORY_LATENCY_MS   simulated round trip per memory call (default 0)
+    """
+
+    def __init__(self, backend=None):
+        self._tables = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.use(backend or os.environ.get('STORAGE_BACKEND', 'aws'))
+
+    def use(self, backend, latency_ms=None):
+        """Switch backend, dropping every table and bucket opened so far."""
+        backend = backend.lower()
+        if backend not in BACKENDS:
+            raise ValueError(f'Unknown storage backend: {backend}')
+        if latency_ms is None:
+            latency_ms = float(os.environ.get('STORAGE_MEMORY_LATENCY_MS', '0'))
+        with self._lock:
+            self.backend = backend
+            self.latency_ms = latency_ms
+            self._tables.clear()
+            self._buckets.clear()
+
+    @property
+    def offline(self):
+        return self.backend == 'memory'
+
+    def read_errors(self):
+        """
+        Exceptions a failed table or bucket read raises: ``CircuitOpen``, and
+        with the ``aws`` backend botocore's client and transport errors.
+        Callers that degrade to cached data catch these and nothing else.
+        """
+        if self.offline:
+            return (CircuitOpen,)
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        return (CircuitOpen, BotoCoreError, ClientError)
+
+    def table(self, table_name, partition_key='campaignId', sort_key='timestamp', ttl_attribute='ttl'):
+        """Table handle; the default key schema is the campaign metrics table's."""
+        with self._lock:
+            table = self._tables.get(table_name)
+            if table is None:
+                if self.offline:
+                    table = MemoryTable(table_name, partition_key, sort_key, ttl_attribute, latency_ms=self.latency_ms)
+                else:
+                    table = DynamoDBTable(table_name, partition_key, sort_key, ttl_attribute)
+                self._tables[table_name] = table
+            return table
+
+    def bucket(self, bucket_name):
+        with self._lock:
+            bucket = self._buckets.get(bucket_name)
+            if bucket is None:
+                bucket = MemoryBucket(bucket_name, self.latency_ms) if self.offline else S3Bucket(bucket_name)
+                self._buckets[bucket_name] = bucket
+            return bucket
+
+def _item_bytes(item):
+    # Rough DynamoDB item size: attribute names plus values as text
+    return len(json.dumps(item, default=str))
+
+def _simulate_latency(latency_ms, started):
+    remaining = latency_ms / 1000 - (time.perf_counter() - started)
+    if remaining > 0:
+        time.sleep(remaining)
+
+def _record_call(service_name, operation, started, parsed):
+    tracer.record(service_name, operation, (time.perf_counter() - started) * 1000, parsed=parsed)
+    metrics.record_call(service_name, parsed)
+
+storage = StorageRegistry()
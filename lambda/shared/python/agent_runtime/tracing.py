@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+
+# Calls kept per invocation; further calls are still counted in the summary
+MAX_TRACED_CALLS = 200
+
+class CallTracer:
+    """
+    Record of every AWS call made during the current invocation.
+
+    Fed by botocore ``before-call``/``after-call`` hooks that the client
+    registry installs, so each call is captured with its operation, latency,
+    DynamoDB consumed capacity, item count and response bytes without any
+    change at the call sites. While an output is configured, DynamoDB calls
+    are also asked to return their consumed capacity.
+
+    Configured through the environment:
+      TRACE_AWS_CALLS        comma-separated outputs: ``log`` writes the calls
+                             to the logs, ``response`` attaches a summary to the
+                             response body as ``awsCalls`` (default: neither)
+      TRACE_REPEAT_THRESHOLD calls to one operation in a single invocation that
+                             flag it as repeated, e.g. N+1 queries (default 3)
+    """
+
+    def __init__(self, outputs=None, repeat_threshold=None):
+        if outputs is None:
+            outputs = os.environ.get('TRACE_AWS_CALLS', '').split(',')
+        self.outputs = {output.strip().lower() for output in outputs if output.strip()}
+        if repeat_threshold is None:
+            repeat_threshold = int(os.environ.get('TRACE_REPEAT_THRESHOLD', '3'))
+        self.repeat_threshold = repeat_threshold
+        self._calls = []
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def log_calls(self):
+        return 'log' in self.outputs
+
+    @property
+    def attach_to_response(self):
+        return 'response' in self.outputs
+
+    def start(self):
+        """Forget the previous invocation's calls."""
+        with self._lock:
+            self._calls = []
+            self._dropped = 0
+
+    def record(self, service_name, operation, latency_ms, parsed=None, http_response=None, error=None):
+        call = {
+            'operation': f'{service_name}.{operation}',
+            'latencyMs': round(latency_ms, 3),
+            'items': _item_count(parsed),
+            'bytes': _response_bytes(http_response)
+        }
+        capacity = _consumed_capacity(parsed)
+        if capacity is not None:
+            call['consumedCapacity'] = capacity
+        if error is not None:
+            call['error'] = type(error).__name__
+        elif isinstance(parsed, dict) and 'Error' in parsed:
+            call['error'] = parsed['Error'].get('Code', 'Error')
+        with self._lock:
+            if len(self._calls) < MAX_TRACED_CALLS:
+                self._calls.append(call)
+            else:
+                self._dropped += 1
+        return call
+
+    def calls(self):
+        with self._lock:
+            return list(self._calls)
+
+    def summary(self):
+        """Totals for the invocation, per operation, with repeated operations flagged."""
+        calls = self.calls()
+        operations = {}
+        for call in calls:
+            entry = operations.setdefault(call['operation'], {'calls': 0, 'totalMs': 0.0, 'items': 0})
+            entry['calls'] += 1
+            entry['totalMs'] = round(entry['totalMs'] + call['latencyMs'], 3)
+            entry['items'] += call['items']
+        capacity = [call['consumedCapacity'] for call in calls if 'consumedCapacity' in call]
+        summary = {
+            'calls': len(calls) + self._dropped,
+            'totalMs': round(sum(call['latencyMs'] for call in calls), 3),
+            'items': sum(call['items'] for call in calls),
+            'bytes': sum(call['bytes'] for call in calls),
+            'errors': sum(1 for call in calls if 'error' in call),
+            'operations': operations,
+            'repeated': sorted(
+                name for name, entry in operations.items() if entry['calls'] >= self.repeat_threshold
+            )
+        }
+        if capacity:
+            summary['consumedCapacity'] = round(sum(capacity), 3)
+        return summary
+
+def install_hooks(client, service_name, on_call=None):
+    """
+    Register the tracing hooks on a botocore client.
+    ``on_call(service_name, parsed)`` is also invoked after every call.
+    """
+    events = client.meta.events
+
+    def before_call(context=None, **kwargs):
+        if context is not None:
+            context['trace_started'] = time.perf_counter()
+
+    def after_call(parsed=None, model=None, context=None, http_response=None, **kwargs):
+        _finish(service_name, model, context, parsed=parsed, http_response=http_response)
+        if on_call:
+            on_call(service_name, parsed)
+
+    def after_call_error(exception=None, model=None, context=None, **kwargs):
+        _finish(service_name, model, context, error=exception)
+
+    events.register('before-call', before_call)
+    events.register('after-call', after_call)
+    events.register('after-call-error', after_call_error)
+    if service_name == 'dynamodb':
+        events.register('before-parameter-build.dynamodb', _request_consumed_capacity)
+
+def _finish(service_name, model, context, **kwargs):
+    started = (context or {}).get('trace_started')
+    latency_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+    tracer.record(service_name, getattr(model, 'name', 'unknown'), latency_ms, **kwargs)
+
+def _request_consumed_capacity(params, model=None, **kwargs):
+    if not tracer.outputs:
+        return
+    members = getattr(getattr(model, 'input_shape', None), 'members', {})
+    if 'ReturnConsumedCapacity' in members:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+def _item_count(parsed):
+    if not isinstance(parsed, dict):
+        return 0
+    if 'Count' in parsed:
+        return parsed['Count']
+    if 'Item' in parsed:
+        return 1
+    if 'Responses' in parsed:
+        return sum(len(items) for items in parsed['Responses'].values())
+    return len(parsed.get('Items', []))
+
+def _response_bytes(http_response):
+    headers = getattr(http_response, 'headers', None) or {}
+    try:
+        return int(headers.get('content-length', 0))
+    except (TypeError, ValueError):
+        return 0
+
+def _consumed_capacity(parsed):
+    if not isinstance(parsed, dict) or 'ConsumedCapacity' not in parsed:
+        return None
+    capacity = parsed['ConsumedCapacity']
+    if isinstance(capacity, dict):
+        capacity = [capacity]
+    return sum(float(entry.get('CapacityUnits', 0)) for entry in capacity)
+
+tracer = CallTracer()
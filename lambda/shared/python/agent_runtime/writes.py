@@ -0,0 +1,138 @@
+import os
+import random
+import threading
+import time
+
+from .concurrency import _shared_executor
+from .logs import StructuredLogger
+from .metrics import metrics
+from .storage import storage
+
+# BatchWriteItem accepts at most 25 put requests
+BATCH_SIZE = 25
+
+# Write buffers in this container, flushed by ``flush_writes``
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+_logger = StructuredLogger('write-behind')
+
+class WriteBuffer:
+    """
+    Per-container write-behind buffer for one table.
+
+    ``add`` only queues the item, so a route never waits on a DynamoDB
+    write. Every full batch of 25 items is written in the background with
+    BatchWriteItem; the rest goes out when the router calls
+    ``flush_writes`` before the handler returns, which also waits for the
+    background batches, so nothing is left queued when Lambda freezes the
+    container. Items with the same key are coalesced (last one wins), as
+    BatchWriteItem rejects duplicate keys in one batch.
+
+    Items DynamoDB leaves unprocessed, and batches whose call fails, are
+    retried with jittered exponential backoff; items still unwritten after
+    the last attempt are logged and counted as WritesDropped.
+
+    Configured through the environment:
+      WRITE_BEHIND          set to ``false`` to write each item when it is added
+      WRITE_MAX_ATTEMPTS    attempts per batch (default 5)
+      WRITE_BACKOFF_MS      backoff before the first retry (default 50)
+    """
+
+    def __init__(self, table_name, enabled=None, max_attempts=None, backoff_ms=None):
+        self.table_name = table_name
+        if enabled is None:
+            enabled = os.environ.get('WRITE_BEHIND', 'true').lower() != 'false'
+        self.enabled = enabled
+        self.max_attempts = max_attempts or int(os.environ.get('WRITE_MAX_ATTEMPTS', '5'))
+        self.backoff_ms = backoff_ms if backoff_ms is not None else float(os.environ.get('WRITE_BACKOFF_MS', '50'))
+        self._pending = {}
+        self._futures = []
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    def add(self, item):
+        """Queue ``item`` for the next batch write."""
+        table = storage.table(self.table_name)
+        if not self.enabled:
+            table.put(item)
+            return
+        key = tuple(item.get(name) for name in (table.partition_key, table.sort_key) if name)
+        with self._lock:
+            self._pending.pop(key, None)
+            self._pending[key] = item
+            if len(self._pending) < BATCH_SIZE:
+                return
+            batch = list(self._pending.values())
+            self._pending.clear()
+            self._futures.append(_shared_executor().submit(self._write, batch))
+
+    def flush(self):
+        """Write everything queued and wait for background batches; returns items written."""
+        with self._lock:
+            batch = list(self._pending.values())
+            self._pending.clear()
+            futures, self._futures = self._futures, []
+        written = self._write(batch) if batch else 0
+        for future in futures:
+            written += future.result()
+        return written
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self):
+        with self._lock:
+            return {'pending': len(self._pending), 'written': self.written, 'dropped': self.dropped}
+
+    def _write(self, items):
+        # One BatchWriteItem per 25 items, retrying what is left unprocessed
+        table = storage.table(self.table_name)
+        written = 0
+        for start in range(0, len(items), BATCH_SIZE):
+            remaining = items[start:start + BATCH_SIZE]
+            for attempt in range(self.max_attempts):
+                if attempt:
+                    _backoff(self.backoff_ms, attempt)
+                    metrics.add('WriteRetries')
+                try:
+                    unprocessed = table.put_many(remaining)
+                except Exception as e:
+                    _logger.warning('batch write failed', table=self.table_name, items=len(remaining),
+                                    attempt=attempt + 1, error=str(e))
+                    continue
+                written += len(remaining) - len(unprocessed)
+                remaining = unprocessed
+                if not remaining:
+                    break
+            if remaining:
+                _logger.error('batch write gave up', table=self.table_name, items=len(remaining),
+                              attempts=self.max_attempts)
+                metrics.add('WritesDropped', len(remaining))
+                with self._lock:
+                    self.dropped += len(remaining)
+        metrics.add('BufferedWrites', written)
+        with self._lock:
+            self.written += written
+        return written
+
+def write_buffer(table_name):
+    """The container's write buffer for ``table_name``, created on first use."""
+    with _buffers_lock:
+        buffer = _buffers.get(table_name)
+        if buffer is None:
+            buffer = _buffers[table_name] = WriteBuffer(table_name)
+        return buffer
+
+def flush_writes():
+    """Flush every write buffer in the container; returns items written by table."""
+    with _buffers_lock:
+        buffers = list(_buffers.values())
+    written = {buffer.table_name: buffer.flush() for buffer in buffers}
+    return {table_name: count for table_name, count in written.items() if count}
+
+def _backoff(base_ms, attempt):
+    # Full jitter: up to base * 2^(attempt - 1)
+    time.sleep(random.uniform(0, base_ms * 2 ** (attempt - 1)) / 1000)
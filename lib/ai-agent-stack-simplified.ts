@@ -43,6 +43,16 @@ export class AIAgentStack extends cdk.Stack {
       pointInTimeRecovery: true,
     });
 
+    // DynamoDB table of idempotency records for mutation routes that
+    // Bedrock may retry (see agent_runtime/idempotency.py)
+    const idempotencyTable = new dynamodb.Table(this, 'IdempotencyTable', {
+      tableName: 'ad-optimizer-idempotency',
+      partitionKey: { name: 'idempotencyKey', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+      timeToLiveAttribute: 'ttl',
+    });
+
     // Secrets Manager for API keys
     const apiKeysSecret = new secretsmanager.Secret(this, 'AdPlatformAPIKeys', {
       secretName: 'ad-optimizer/api-keys',
@@ -60,46 +70,60 @@ export class AIAgentStack extends cdk.Stack {
       },
     });
 
+    // Shared action-group runtime (routing, request parsing, responses)
+    const agentRuntimeLayer = new lambda.LayerVersion(this, 'AgentRuntimeLayer', {
+      code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/shared')),
+      compatibleRuntimes: [lambda.Runtime.PYTHON_3_12],
+      description: 'Shared runtime for the ad optimizer action-group functions',
+    });
+
     // Lambda function for Google Ads integration
     const googleAdsFunction = new lambda.Function(this, 'GoogleAdsFunction', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'index.handler',
+      layers: [agentRuntimeLayer],
       code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/google-ads')),
       timeout: cdk.Duration.seconds(60),
       memorySize: 512,
       environment: {
         BUCKET_NAME: campaignDataBucket.bucketName,
         METRICS_TABLE: metricsTable.tableName,
+        IDEMPOTENCY_TABLE: idempotencyTable.tableName,
         SECRETS_ARN: apiKeysSecret.secretArn,
       },
     });
 
     campaignDataBucket.grantReadWrite(googleAdsFunction);
     metricsTable.grantReadWriteData(googleAdsFunction);
+    idempotencyTable.grantReadWriteData(googleAdsFunction);
     apiKeysSecret.grantRead(googleAdsFunction);
 
     // Lambda function for Meta Ads integration
     const metaAdsFunction = new lambda.Function(this, 'MetaAdsFunction', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'index.handler',
+      layers: [agentRuntimeLayer],
       code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/meta-ads')),
       timeout: cdk.Duration.seconds(60),
       memorySize: 512,
       environment: {
         BUCKET_NAME: campaignDataBucket.bucketName,
         METRICS_TABLE: metricsTable.tableName,
+        IDEMPOTENCY_TABLE: idempotencyTable.tableName,
         SECRETS_ARN: apiKeysSecret.secretArn,
       },
     });
 
     campaignDataBucket.grantReadWrite(metaAdsFunction);
     metricsTable.grantReadWriteData(metaAdsFunction);
+    idempotencyTable.grantReadWriteData(metaAdsFunction);
     apiKeysSecret.grantRead(metaAdsFunction);
 
     // Lambda function for performance analytics
     const analyticsFunction = new lambda.Function(this, 'AnalyticsFunction', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'index.handler',
+      layers: [agentRuntimeLayer],
       code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/analytics')),
       timeout: cdk.Duration.seconds(90),
       memorySize: 1024,
@@ -116,32 +140,68 @@ export class AIAgentStack extends cdk.Stack {
     const budgetOptimizerFunction = new lambda.Function(this, 'BudgetOptimizerFunction', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'index.handler',
+      layers: [agentRuntimeLayer],
       code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/budget-optimizer')),
       timeout: cdk.Duration.seconds(60),
       memorySize: 512,
       environment: {
         BUCKET_NAME: campaignDataBucket.bucketName,
         METRICS_TABLE: metricsTable.tableName,
+        IDEMPOTENCY_TABLE: idempotencyTable.tableName,
       },
     });
 
     campaignDataBucket.grantReadWrite(budgetOptimizerFunction);
     metricsTable.grantReadWriteData(budgetOptimizerFunction);
+    idempotencyTable.grantReadWriteData(budgetOptimizerFunction);
 
     // Lambda function for campaign data storage
     const storageFunction = new lambda.Function(this, 'StorageFunction', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'index.handler',
+      layers: [agentRuntimeLayer],
       code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/storage')),
       timeout: cdk.Duration.seconds(30),
       environment: {
         BUCKET_NAME: campaignDataBucket.bucketName,
         METRICS_TABLE: metricsTable.tableName,
+        IDEMPOTENCY_TABLE: idempotencyTable.tableName,
       },
     });
 
     campaignDataBucket.grantReadWrite(storageFunction);
     metricsTable.grantReadWriteData(storageFunction);
+    idempotencyTable.grantReadWriteData(storageFunction);
+
+    // Optional single function hosting every action group (cdk deploy -c consolidatedActionGroups=true).
+    // lambda/consolidated routes each event by actionGroup to the handlers above, so one turn
+    // touching several action groups shares warm containers, connections and caches.
+    const consolidatedActionGroups = String(this.node.tryGetContext('consolidatedActionGroups')) === 'true';
+    const consolidatedFunction = consolidatedActionGroups
+      ? new lambda.Function(this, 'ConsolidatedFunction', {
+          runtime: lambda.Runtime.PYTHON_3_12,
+          handler: 'consolidated/index.handler',
+          layers: [agentRuntimeLayer],
+          code: lambda.Code.fromAsset(path.join(__dirname, '../lambda'), {
+            exclude: ['shared', '**/__pycache__'],
+          }),
+          timeout: cdk.Duration.seconds(90),
+          memorySize: 1024,
+          environment: {
+            BUCKET_NAME: campaignDataBucket.bucketName,
+            METRICS_TABLE: metricsTable.tableName,
+            IDEMPOTENCY_TABLE: idempotencyTable.tableName,
+            SECRETS_ARN: apiKeysSecret.secretArn,
+          },
+        })
+      : undefined;
+
+    if (consolidatedFunction) {
+      campaignDataBucket.grantReadWrite(consolidatedFunction);
+      metricsTable.grantReadWriteData(consolidatedFunction);
+      idempotencyTable.grantReadWriteData(consolidatedFunction);
+      apiKeysSecret.grantRead(consolidatedFunction);
+    }
 
     // IAM role for Bedrock Agent
     const agentRole = new iam.Role(this, 'BedrockAgentRole', {
@@ -157,6 +217,7 @@ export class AIAgentStack extends cdk.Stack {
     analyticsFunction.grantInvoke(agentRole);
     budgetOptimizerFunction.grantInvoke(agentRole);
     storageFunction.grantInvoke(agentRole);
+    consolidatedFunction?.grantInvoke(agentRole);
 
     // Create Bedrock Agent with Nova model
     const agent = new bedrock.CfnAgent(this, 'AdOptimizerAgent', {
@@ -249,6 +310,13 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
       description: 'Storage Lambda Function ARN',
     });
 
+    if (consolidatedFunction) {
+      new cdk.CfnOutput(this, 'ConsolidatedFunctionArn', {
+        value: consolidatedFunction.functionArn,
+        description: 'Single Lambda Function ARN - use it as the executor of every action group',
+      });
+    }
+
     new cdk.CfnOutput(this, 'NextSteps', {
       value: 'After deployment, add action groups in AWS Console: https://console.aws.amazon.com/bedrock/home#/agents',
       description: 'Manual steps required',
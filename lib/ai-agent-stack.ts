@@ -8,6 +8,67 @@ import * as secretsmanager from 'aws-cdk-lib/aws-secretsmanager';
 import { Construct } from 'constructs';
 import * as path from 'path';
 
+// OpenAPI path for the POST /batch route that every action-group Lambda serves
+function batchPathSchema(operationId: string) {
+  return {
+    post: {
+      summary: 'Run several operations in one call',
+      description: 'Run several operations of this action group concurrently in one invocation, e.g. get metrics for every campaign at once',
+      operationId,
+      requestBody: {
+        required: true,
+        content: {
+          'application/json': {
+            schema: {
+              type: 'object',
+              properties: {
+                operations: {
+                  type: 'array',
+                  description: 'Operations to run, each with path, method, parameters and optional body',
+                  items: {
+                    type: 'object',
+                    properties: {
+                      path: { type: 'string', description: 'API path, e.g. /metrics' },
+                      method: { type: 'string', description: 'GET or POST' },
+                      parameters: { type: 'object', description: 'Query parameters by name' },
+                      body: { type: 'object', description: 'Request body for POST operations' },
+                    },
+                    required: ['path', 'method'],
+                  },
+                },
+              },
+              required: ['operations'],
+            },
+          },
+        },
+      },
+      responses: {
+        '200': { description: 'Per-operation status and results' },
+      },
+    },
+  };
+}
+
+// Optional response projection accepted by every google-ads, meta-ads,
+// analytics and budget-optimizer operation
+const fieldsParameter = {
+  name: 'fields',
+  in: 'query',
+  required: false,
+  schema: { type: 'string' },
+  description: 'Comma-separated fields to return, e.g. aggregateMetrics.roas,issues. Omit for all fields.',
+};
+
+// Optional caller-chosen key accepted by every mutation operation; a request
+// repeating a key gets the first request's result instead of running again
+const idempotencyKeyParameter = {
+  name: 'idempotencyKey',
+  in: 'query',
+  required: false,
+  schema: { type: 'string' },
+  description: 'Unique key for this change, e.g. a UUID. Repeat it only when retrying the same change. Omit to use the default retry protection.',
+};
+
 export class AIAgentStack extends cdk.Stack {
   constructor(scope: Construct, id: string, props?: cdk.StackProps) {
     super(scope, id, props);
@@ -43,6 +104,16 @@ export class AIAgentStack extends cdk.Stack {
       pointInTimeRecovery: true,
     });
 
+    // DynamoDB table of idempotency records for mutation routes that
+    // Bedrock may retry (see agent_runtime/idempotency.py)
+    const idempotencyTable = new dynamodb.Table(this, 'IdempotencyTable', {
+      tableName: 'ad-optimizer-idempotency',
+      partitionKey: { name: 'idempotencyKey', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+      timeToLiveAttribute: 'ttl',
+    });
+
     // Secrets Manager for API keys
     const apiKeysSecret = new secretsmanager.Secret(this, 'AdPlatformAPIKeys', {
       secretName: 'ad-optimizer/api-keys',
@@ -60,46 +131,60 @@ export class AIAgentStack extends cdk.Stack {
       },
     });
 
+    // Shared action-group runtime (routing, request parsing, responses)
+    const agentRuntimeLayer = new lambda.LayerVersion(this, 'AgentRuntimeLayer', {
+      code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/shared')),
+      compatibleRuntimes: [lambda.Runtime.PYTHON_3_12],
+      description: 'Shared runtime for the ad optimizer action-group functions',
+    });
+
     // Lambda function for Google Ads integration
     const googleAdsFunction = new lambda.Function(this, 'GoogleAdsFunction', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'index.handler',
+      layers: [agentRuntimeLayer],
       code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/google-ads')),
       timeout: cdk.Duration.seconds(120), // Increased for Nova Pro compatibility
       memorySize: 1024, // Increased to reduce cold starts
       environment: {
         BUCKET_NAME: campaignDataBucket.bucketName,
         METRICS_TABLE: metricsTable.tableName,
+        IDEMPOTENCY_TABLE: idempotencyTable.tableName,
         SECRETS_ARN: apiKeysSecret.secretArn,
       },
     });
 
     campaignDataBucket.grantReadWrite(googleAdsFunction);
     metricsTable.grantReadWriteData(googleAdsFunction);
+    idempotencyTable.grantReadWriteData(googleAdsFunction);
     apiKeysSecret.grantRead(googleAdsFunction);
 
     // Lambda function for Meta Ads integration
     const metaAdsFunction = new lambda.Function(this, 'MetaAdsFunction', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'index.handler',
+      layers: [agentRuntimeLayer],
       code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/meta-ads')),
       timeout: cdk.Duration.seconds(120), // Increased for Nova Pro compatibility
       memorySize: 1024, // Increased to reduce cold starts
       environment: {
         BUCKET_NAME: campaignDataBucket.bucketName,
         METRICS_TABLE: metricsTable.tableName,
+        IDEMPOTENCY_TABLE: idempotencyTable.tableName,
         SECRETS_ARN: apiKeysSecret.secretArn,
       },
     });
 
     campaignDataBucket.grantReadWrite(metaAdsFunction);
     metricsTable.grantReadWriteData(metaAdsFunction);
+    idempotencyTable.grantReadWriteData(metaAdsFunction);
     apiKeysSecret.grantRead(metaAdsFunction);
 
     // Lambda function for performance analytics
     const analyticsFunction = new lambda.Function(this, 'AnalyticsFunction', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'index.handler',
+      layers: [agentRuntimeLayer],
       code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/analytics')),
       timeout: cdk.Duration.seconds(90),
       memorySize: 1024,
@@ -116,32 +201,68 @@ export class AIAgentStack extends cdk.Stack {
     const budgetOptimizerFunction = new lambda.Function(this, 'BudgetOptimizerFunction', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'index.handler',
+      layers: [agentRuntimeLayer],
       code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/budget-optimizer')),
       timeout: cdk.Duration.seconds(120), // Increased for Nova Pro compatibility
       memorySize: 1024, // Increased to reduce cold starts
       environment: {
         BUCKET_NAME: campaignDataBucket.bucketName,
         METRICS_TABLE: metricsTable.tableName,
+        IDEMPOTENCY_TABLE: idempotencyTable.tableName,
       },
     });
 
     campaignDataBucket.grantReadWrite(budgetOptimizerFunction);
     metricsTable.grantReadWriteData(budgetOptimizerFunction);
+    idempotencyTable.grantReadWriteData(budgetOptimizerFunction);
 
     // Lambda function for campaign data storage
     const storageFunction = new lambda.Function(this, 'StorageFunction', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'index.handler',
+      layers: [agentRuntimeLayer],
       code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/storage')),
       timeout: cdk.Duration.seconds(30),
       environment: {
         BUCKET_NAME: campaignDataBucket.bucketName,
         METRICS_TABLE: metricsTable.tableName,
+        IDEMPOTENCY_TABLE: idempotencyTable.tableName,
       },
     });
 
     campaignDataBucket.grantReadWrite(storageFunction);
     metricsTable.grantReadWriteData(storageFunction);
+    idempotencyTable.grantReadWriteData(storageFunction);
+
+    // Optional single function hosting every action group (cdk deploy -c consolidatedActionGroups=true).
+    // lambda/consolidated routes each event by actionGroup to the handlers above, so one turn
+    // touching several action groups shares warm containers, connections and caches.
+    const consolidatedActionGroups = String(this.node.tryGetContext('consolidatedActionGroups')) === 'true';
+    const consolidatedFunction = consolidatedActionGroups
+      ? new lambda.Function(this, 'ConsolidatedFunction', {
+          runtime: lambda.Runtime.PYTHON_3_12,
+          handler: 'consolidated/index.handler',
+          layers: [agentRuntimeLayer],
+          code: lambda.Code.fromAsset(path.join(__dirname, '../lambda'), {
+            exclude: ['shared', '**/__pycache__'],
+          }),
+          timeout: cdk.Duration.seconds(120),
+          memorySize: 1024,
+          environment: {
+            BUCKET_NAME: campaignDataBucket.bucketName,
+            METRICS_TABLE: metricsTable.tableName,
+            IDEMPOTENCY_TABLE: idempotencyTable.tableName,
+            SECRETS_ARN: apiKeysSecret.secretArn,
+          },
+        })
+      : undefined;
+
+    if (consolidatedFunction) {
+      campaignDataBucket.grantReadWrite(consolidatedFunction);
+      metricsTable.grantReadWriteData(consolidatedFunction);
+      idempotencyTable.grantReadWriteData(consolidatedFunction);
+      apiKeysSecret.grantRead(consolidatedFunction);
+    }
 
     // IAM role for Bedrock Agent
     const agentRole = new iam.Role(this, 'BedrockAgentRole', {
@@ -157,6 +278,10 @@ export class AIAgentStack extends cdk.Stack {
     analyticsFunction.grantInvoke(agentRole);
     budgetOptimizerFunction.grantInvoke(agentRole);
     storageFunction.grantInvoke(agentRole);
+    consolidatedFunction?.grantInvoke(agentRole);
+
+    // Action groups run on their own function, or all on the consolidated one
+    const executorFor = (fn: lambda.Function) => consolidatedFunction ?? fn;
 
     // Create Bedrock Agent with Claude 3.5 Sonnet v2 (more reliable than Nova Pro)
     const agent = new bedrock.CfnAgent(this, 'AdOptimizerAgent', {
@@ -190,6 +315,8 @@ Use your reasoning capabilities to:
 - Balance short-term performance with long-term strategy
 - Explain your decisions clearly to business owners
 
+When you need the same data for several campaigns, use the tool's /batch operation to get it in a single call.
+
 Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategically before taking action.`,
       idleSessionTtlInSeconds: 3600, // Increased timeout for better stability
       description: 'AI Advertisement Optimization Agent for Small Businesses - Using Claude 3.5 Sonnet v2',
@@ -201,7 +328,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
       agentVersion: 'DRAFT',
       actionGroupName: 'google-ads-actions',
       actionGroupExecutor: {
-        lambda: googleAdsFunction.functionArn,
+        lambda: executorFor(googleAdsFunction).functionArn,
       },
       apiSchema: {
         payload: JSON.stringify({
@@ -217,6 +344,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 summary: 'Get list of Google Ads campaigns',
                 description: 'Retrieve all active Google Ads campaigns',
                 operationId: 'getGoogleCampaigns',
+                parameters: [fieldsParameter],
                 responses: {
                   '200': {
                     description: 'List of campaigns',
@@ -251,6 +379,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 description: 'Retrieve performance metrics for a specific campaign',
                 operationId: 'getGoogleMetrics',
                 parameters: [
+                  fieldsParameter,
                   {
                     name: 'campaignId',
                     in: 'query',
@@ -271,6 +400,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 summary: 'Adjust campaign bid',
                 description: 'Adjust bid for a campaign by percentage',
                 operationId: 'adjustGoogleBid',
+                parameters: [fieldsParameter, idempotencyKeyParameter],
                 requestBody: {
                   required: true,
                   content: {
@@ -296,6 +426,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 summary: 'Update campaign budget',
                 description: 'Update daily budget for a campaign',
                 operationId: 'updateGoogleBudget',
+                parameters: [fieldsParameter, idempotencyKeyParameter],
                 requestBody: {
                   required: true,
                   content: {
@@ -321,6 +452,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 summary: 'Pause or activate campaign',
                 description: 'Change campaign status to PAUSED or ENABLED',
                 operationId: 'toggleGoogleStatus',
+                parameters: [fieldsParameter, idempotencyKeyParameter],
                 requestBody: {
                   required: true,
                   content: {
@@ -341,6 +473,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 },
               },
             },
+            '/batch': batchPathSchema('runGoogleBatch'),
           },
         }),
       },
@@ -352,7 +485,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
       agentVersion: 'DRAFT',
       actionGroupName: 'meta-ads-actions',
       actionGroupExecutor: {
-        lambda: metaAdsFunction.functionArn,
+        lambda: executorFor(metaAdsFunction).functionArn,
       },
       apiSchema: {
         payload: JSON.stringify({
@@ -367,6 +500,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
               get: {
                 summary: 'Get list of Meta Ads campaigns',
                 operationId: 'getMetaCampaigns',
+                parameters: [fieldsParameter],
                 responses: {
                   '200': { description: 'List of campaigns' },
                 },
@@ -377,6 +511,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 summary: 'Get campaign performance metrics',
                 operationId: 'getMetaMetrics',
                 parameters: [
+                  fieldsParameter,
                   {
                     name: 'campaignId',
                     in: 'query',
@@ -393,6 +528,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
               post: {
                 summary: 'Adjust campaign bid',
                 operationId: 'adjustMetaBid',
+                parameters: [fieldsParameter, idempotencyKeyParameter],
                 requestBody: {
                   required: true,
                   content: {
@@ -416,6 +552,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
               post: {
                 summary: 'Update campaign budget',
                 operationId: 'updateMetaBudget',
+                parameters: [fieldsParameter, idempotencyKeyParameter],
                 requestBody: {
                   required: true,
                   content: {
@@ -439,6 +576,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
               post: {
                 summary: 'Pause or activate campaign',
                 operationId: 'toggleMetaStatus',
+                parameters: [fieldsParameter, idempotencyKeyParameter],
                 requestBody: {
                   required: true,
                   content: {
@@ -462,6 +600,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
               post: {
                 summary: 'Test creative variants',
                 operationId: 'testMetaCreative',
+                parameters: [fieldsParameter],
                 requestBody: {
                   required: true,
                   content: {
@@ -481,6 +620,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 },
               },
             },
+            '/batch': batchPathSchema('runMetaBatch'),
           },
         }),
       },
@@ -492,7 +632,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
       agentVersion: 'DRAFT',
       actionGroupName: 'analytics-actions',
       actionGroupExecutor: {
-        lambda: analyticsFunction.functionArn,
+        lambda: executorFor(analyticsFunction).functionArn,
       },
       apiSchema: {
         payload: JSON.stringify({
@@ -508,6 +648,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 summary: 'Analyze campaign performance',
                 operationId: 'analyzePerformance',
                 parameters: [
+                  fieldsParameter,
                   {
                     name: 'campaignId',
                     in: 'query',
@@ -531,6 +672,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 summary: 'Detect performance trends',
                 operationId: 'detectTrends',
                 parameters: [
+                  fieldsParameter,
                   {
                     name: 'campaignId',
                     in: 'query',
@@ -547,6 +689,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
               post: {
                 summary: 'Compare multiple campaigns',
                 operationId: 'compareCampaigns',
+                parameters: [fieldsParameter],
                 requestBody: {
                   required: true,
                   content: {
@@ -555,6 +698,12 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                         type: 'object',
                         properties: {
                           campaignIds: { type: 'array', items: { type: 'string' } },
+                          cursor: { type: 'string', description: 'nextCursor from a previous page' },
+                          pageSize: { type: 'integer', description: 'Maximum items per page' },
+                          continuationToken: {
+                            type: 'string',
+                            description: 'continuationToken from a partial response; resend the same request with it to finish the rest',
+                          },
                         },
                       },
                     },
@@ -570,6 +719,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 summary: 'Get optimization recommendations',
                 operationId: 'getRecommendations',
                 parameters: [
+                  fieldsParameter,
                   {
                     name: 'campaignId',
                     in: 'query',
@@ -586,11 +736,13 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
               get: {
                 summary: 'Analyze cross-platform performance',
                 operationId: 'crossPlatformAnalysis',
+                parameters: [fieldsParameter],
                 responses: {
                   '200': { description: 'Cross-platform analysis' },
                 },
               },
             },
+            '/batch': batchPathSchema('runAnalyticsBatch'),
           },
         }),
       },
@@ -602,7 +754,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
       agentVersion: 'DRAFT',
       actionGroupName: 'budget-optimizer-actions',
       actionGroupExecutor: {
-        lambda: budgetOptimizerFunction.functionArn,
+        lambda: executorFor(budgetOptimizerFunction).functionArn,
       },
       apiSchema: {
         payload: JSON.stringify({
@@ -617,6 +769,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
               post: {
                 summary: 'Optimize budget allocation',
                 operationId: 'optimizeBudget',
+                parameters: [fieldsParameter],
                 requestBody: {
                   required: true,
                   content: {
@@ -627,6 +780,8 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                           totalBudget: { type: 'number' },
                           campaignIds: { type: 'array', items: { type: 'string' } },
                           goal: { type: 'string', enum: ['maximize_roas', 'minimize_cpa', 'maximize_conversions'] },
+                          cursor: { type: 'string', description: 'nextCursor from a previous page' },
+                          pageSize: { type: 'integer', description: 'Maximum items per page' },
                         },
                       },
                     },
@@ -641,6 +796,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
               post: {
                 summary: 'Reallocate budget between campaigns',
                 operationId: 'reallocateBudget',
+                parameters: [fieldsParameter, idempotencyKeyParameter],
                 requestBody: {
                   required: true,
                   content: {
@@ -666,6 +822,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 summary: 'Get budget recommendations',
                 operationId: 'getBudgetRecommendations',
                 parameters: [
+                  fieldsParameter,
                   {
                     name: 'totalBudget',
                     in: 'query',
@@ -682,6 +839,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
               post: {
                 summary: 'Simulate budget scenarios',
                 operationId: 'simulateScenarios',
+                parameters: [fieldsParameter],
                 requestBody: {
                   required: true,
                   content: {
@@ -690,6 +848,12 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                         type: 'object',
                         properties: {
                           scenarios: { type: 'array' },
+                          cursor: { type: 'string', description: 'nextCursor from a previous page' },
+                          pageSize: { type: 'integer', description: 'Maximum items per page' },
+                          continuationToken: {
+                            type: 'string',
+                            description: 'continuationToken from a partial response; resend the same request with it to finish the rest',
+                          },
                         },
                       },
                     },
@@ -700,6 +864,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 },
               },
             },
+            '/batch': batchPathSchema('runBudgetBatch'),
           },
         }),
       },
@@ -711,7 +876,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
       agentVersion: 'DRAFT',
       actionGroupName: 'storage-actions',
       actionGroupExecutor: {
-        lambda: storageFunction.functionArn,
+        lambda: executorFor(storageFunction).functionArn,
       },
       apiSchema: {
         payload: JSON.stringify({
@@ -726,6 +891,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
               post: {
                 summary: 'Store campaign insight',
                 operationId: 'storeInsight',
+                parameters: [idempotencyKeyParameter],
                 requestBody: {
                   required: true,
                   content: {
@@ -764,6 +930,7 @@ Always prioritize ROI, cost-efficiency, and sustainable growth. Think strategica
                 },
               },
             },
+            '/batch': batchPathSchema('runStorageBatch'),
           },
         }),
       },